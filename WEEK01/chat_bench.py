@@ -0,0 +1,449 @@
+"""채팅 서버 부하 테스트 도구
+
+가상 클라이언트 N개가 닉네임 입력까지 마친 뒤, 그중 일부(송신자)가 정해진 속도로
+메시지를 보낸다. 메시지 본문에 보낸 시각을 넣어 두고, 모든 수신자가 받은 시각과의
+차이로 브로드캐스트 전달 지연을 잰다. 모든 클라이언트가 한 프로세스의 이벤트 루프에서
+돌기 때문에 같은 시계(time.perf_counter)를 쓴다. 클라이언트 수가 많으면 측정하는
+쪽이 먼저 CPU를 다 쓸 수 있으므로, 서버와 다른 코어에서 실행하는 것이 좋다.
+
+결과(접속 시간, 전달 지연 p50/p95/p99, 초당 전달 메시지 수, 서버 RSS)는 화면에 출력하고
+--output을 주면 JSON 파일로 저장해 엔진이나 프로토콜 변경 전후를 비교할 수 있다.
+
+실행 예:
+- python chat_bench.py --clients 500 --senders 10 --rate 20 --duration 10
+- python chat_bench.py --spawn asyncio --clients 2000 --output asyncio.json
+- python chat_bench.py --spawn asyncio --korean --compress  (압축 전후의 전송량과 CPU 비교)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import chat_compress
+from chat_protocol import PING, PONG, RECV_SIZE, FrameDecoder, encode_frame
+
+BENCH_TAG = 'bench'
+# --korean일 때 본문으로 섞어 쓰는 문장 (실제 대화처럼 비슷하지만 매번 다른 메시지)
+KOREAN_PHRASES = [
+    '안녕하세요 반갑습니다', '오늘 회의는 몇 시에 시작하나요?', '점심 메뉴 추천해 주세요',
+    '방금 보낸 자료 확인 부탁드립니다', 'ㅋㅋㅋㅋ 진짜 웃기네요', '네 알겠습니다 감사합니다',
+    '배포는 내일 오전에 진행하겠습니다', '서버 응답이 조금 느린 것 같아요', '퇴근하겠습니다 수고하셨어요',
+    '그 부분은 제가 다시 확인해 볼게요', '혹시 지금 통화 가능하신가요?', '좋은 아침입니다!',
+]
+
+
+def percentile(sorted_values, pct):
+    """정렬된 값에서 pct 백분위수 (nearest-rank)"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values, scale=1.0):
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50': round(percentile(values, 50) * scale, 3),
+        'p95': round(percentile(values, 95) * scale, 3),
+        'p99': round(percentile(values, 99) * scale, 3),
+        'max': round(values[-1] * scale, 3),
+    }
+
+
+def _process_tree(pid):
+    """pid와 그 자식 프로세스 번호 목록 (여러 워커로 실행한 서버도 함께 측정)"""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+def read_cpu_seconds(pid):
+    """리눅스 /proc에서 프로세스와 자식 프로세스가 쓴 CPU 시간(user + system) 합계를 읽음"""
+    total = 0
+    for target in _process_tree(pid):
+        try:
+            with open(f'/proc/{target}/stat') as f:
+                # 프로세스 이름에 공백이 있을 수 있으므로 ')' 뒤부터 나눔
+                fields = f.read().rsplit(')', 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / os.sysconf('SC_CLK_TCK') if total else None
+
+
+def read_rss_kb(pid):
+    """리눅스 /proc에서 프로세스와 자식 프로세스의 RSS(KB) 합계를 읽음"""
+    total = 0
+    for target in _process_tree(pid):
+        try:
+            with open(f'/proc/{target}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total or None
+
+
+class BenchClient:
+    """가상 클라이언트 하나"""
+
+    def __init__(self, bench, index):
+        self.bench = bench
+        self.nickname = f'{bench.prefix}{index}'
+        self.reader = None
+        self.writer = None
+        self.decoder = FrameDecoder()
+        self.compressor = None
+        self.decompressor = None
+        self._pending = []
+        self.joined = False
+
+    async def connect(self):
+        """접속부터 자신의 입장 알림을 받을 때까지 걸린 시간을 반환"""
+        started = time.perf_counter()
+        self.reader, self.writer = await asyncio.open_connection(self.bench.host, self.bench.port)
+        if self.bench.args.compress:
+            await self._negotiate_compression()
+        else:
+            await self._next_message()
+        self._write([encode_frame(self.nickname)])
+        joined = f"'{self.nickname}'님이 입장하셨습니다."
+        while True:
+            message = await self._next_message()
+            if message == joined:
+                self.joined = True
+                return time.perf_counter() - started
+            if message.startswith('닉네임이 비어있거나'):
+                raise RuntimeError(f'닉네임 {self.nickname}을 사용할 수 없습니다.')
+
+    async def _negotiate_compression(self):
+        self.writer.write(chat_compress.REQUEST_FRAME)
+        handshake = chat_compress.ClientHandshake()
+        while not handshake.done:
+            data = await self.reader.read(RECV_SIZE)
+            if not data:
+                raise ConnectionError('서버가 연결을 끊었습니다.')
+            handshake.feed(data)
+        if not handshake.accepted:
+            raise RuntimeError('서버가 압축을 지원하지 않습니다.')
+        self.compressor = chat_compress.StreamCompressor()
+        self.decompressor = chat_compress.StreamDecompressor()
+        self._pending = self.decoder.feed(self.decompressor.decompress(handshake.rest))
+
+    def _write(self, buffers):
+        if self.compressor is not None:
+            data = self.compressor.compress(buffers)
+            self.writer.write(data)
+            self.bench.wire_bytes_out += len(data)
+        else:
+            self.writer.writelines(buffers)
+            self.bench.wire_bytes_out += sum(map(len, buffers))
+
+    def _receive(self, data):
+        """받은 바이트 수를 세고 (압축을 풀어) 메시지 목록으로 반환"""
+        bench = self.bench
+        bench.wire_bytes_in += len(data)
+        if self.decompressor is not None:
+            data = self.decompressor.decompress(data)
+        bench.payload_bytes_in += len(data)
+        return self.decoder.feed(data)
+
+    async def _next_message(self):
+        while True:
+            if self._pending:
+                return self._pending.pop(0)
+            data = await self.reader.read(RECV_SIZE)
+            if not data:
+                raise ConnectionError('서버가 연결을 끊었습니다.')
+            self._pending = self._receive(data)
+
+    async def receive_loop(self):
+        """벤치마크 메시지를 받을 때마다 전달 지연을 기록"""
+        bench = self.bench
+        marker = f'> {BENCH_TAG} '
+        pong = [encode_frame(PONG)]
+        for message in self._pending:
+            bench.record(message, marker)
+        self._pending = []
+        try:
+            while True:
+                data = await self.reader.read(RECV_SIZE)
+                if not data:
+                    break
+                for message in self._receive(data):
+                    if message == PING:
+                        # 측정이 길어져도 유휴 연결로 끊기지 않도록 응답
+                        self._write(pong)
+                        continue
+                    bench.record(message, marker)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def send_loop(self, rate, duration):
+        interval = 1.0 / rate
+        deadline = time.perf_counter() + duration
+        next_send = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_send:
+                await asyncio.sleep(next_send - now)
+            self._write([encode_frame(f'{BENCH_TAG} {time.perf_counter():.6f} {self.bench.make_payload()}')])
+            self.bench.sent += 1
+            next_send += interval
+            await self.writer.drain()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ChatBench:
+    def __init__(self, args):
+        self.host = args.host
+        self.port = args.port
+        self.prefix = args.prefix
+        self.payload = 'x' * max(0, args.size)
+        self.args = args
+        # 클라이언트 쪽에서 센 바이트 수 (압축했다면 압축된 크기가 wire, 푼 크기가 payload)
+        self.wire_bytes_in = 0
+        self.payload_bytes_in = 0
+        self.wire_bytes_out = 0
+        self.sent = 0
+        self.delivered = 0
+        self.latencies = []
+        self.measuring = False
+        self.last_delivery = None
+
+    def make_payload(self):
+        if not self.args.korean:
+            return self.payload
+        # 문장을 무작위로 이어 붙여 size 바이트 정도로 맞춤
+        parts = []
+        size = 0
+        while size < self.args.size:
+            phrase = random.choice(KOREAN_PHRASES)
+            parts.append(phrase)
+            size += len(phrase.encode('utf-8')) + 1
+        return ' '.join(parts)
+
+    def record(self, message, marker):
+        pos = message.find(marker)
+        if pos < 0 or not self.measuring:
+            return
+        sent_at = float(message[pos + len(marker):].split(' ', 1)[0])
+        now = time.perf_counter()
+        self.latencies.append(now - sent_at)
+        self.delivered += 1
+        self.last_delivery = now
+
+    async def connect_all(self, clients):
+        """concurrency개씩 나누어 접속 (한꺼번에 접속하면 listen 백로그가 넘칠 수 있음)"""
+        times = []
+        failures = 0
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def connect(client):
+            nonlocal failures
+            async with semaphore:
+                try:
+                    times.append(await client.connect())
+                except (OSError, RuntimeError, ConnectionError) as e:
+                    failures += 1
+                    if failures <= 5:
+                        print(f'접속 실패 ({client.nickname}): {e}')
+
+        await asyncio.gather(*(connect(client) for client in clients))
+        return times, failures
+
+    async def run(self, server_pid=None):
+        args = self.args
+        clients = [BenchClient(self, i) for i in range(args.clients)]
+        rss_samples = []
+
+        async def sample_rss():
+            while True:
+                rss = read_rss_kb(server_pid)
+                if rss:
+                    rss_samples.append(rss)
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample_rss()) if server_pid else None
+        rss_idle = read_rss_kb(server_pid) if server_pid else None
+
+        connect_started = time.perf_counter()
+        connect_times, failures = await self.connect_all(clients)
+        connect_total = time.perf_counter() - connect_started
+        connected = [client for client in clients if client.joined]
+        print(f'접속 완료: {len(connect_times)}/{args.clients}개, {connect_total:.2f}초')
+        rss_connected = read_rss_kb(server_pid) if server_pid else None
+
+        receivers = [asyncio.create_task(client.receive_loop()) for client in connected]
+        # 입장 알림이 모두 지나간 뒤부터 측정
+        await asyncio.sleep(args.settle)
+        self.measuring = True
+        senders = connected[:args.senders]
+        traffic_before = (self.wire_bytes_in, self.payload_bytes_in, self.wire_bytes_out)
+        cpu_before = (read_cpu_seconds(server_pid) if server_pid else None, time.process_time())
+        started = time.perf_counter()
+        await asyncio.gather(*(client.send_loop(args.rate, args.duration) for client in senders))
+        # 마지막 메시지가 모두에게 도착할 시간을 줌
+        await asyncio.sleep(args.drain)
+        self.measuring = False
+        cpu_after = (read_cpu_seconds(server_pid) if server_pid else None, time.process_time())
+        wire_in = self.wire_bytes_in - traffic_before[0]
+        payload_in = self.payload_bytes_in - traffic_before[1]
+        wire_out = self.wire_bytes_out - traffic_before[2]
+        server_cpu = cpu_after[0] - cpu_before[0] if cpu_before[0] is not None and cpu_after[0] is not None else None
+        bench_cpu = cpu_after[1] - cpu_before[1]
+        # 기다린 시간은 빼고 마지막 메시지가 도착한 시각까지를 측정 구간으로 봄
+        elapsed = (self.last_delivery or time.perf_counter()) - started
+
+        if sampler is not None:
+            sampler.cancel()
+        for task in receivers:
+            task.cancel()
+        for client in connected:
+            client.close()
+
+        expected = self.sent * len(connected)
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'config': {
+                'host': args.host, 'port': args.port, 'clients': args.clients,
+                'senders': len(senders), 'rate_per_sender': args.rate,
+                'duration': args.duration, 'payload_bytes': args.size,
+                'engine': args.spawn, 'compress': args.compress, 'korean': args.korean,
+            },
+            'connect': {
+                'connected': len(connect_times),
+                'failed': failures,
+                'total_seconds': round(connect_total, 3),
+                'per_client_ms': summarize(connect_times, 1000),
+            },
+            'messages': {
+                'sent': self.sent,
+                'expected_deliveries': expected,
+                'delivered': self.delivered,
+                'delivery_ratio': round(self.delivered / expected, 4) if expected else None,
+                'delivered_per_second': round(self.delivered / elapsed, 1) if elapsed else None,
+            },
+            'fanout_latency_ms': summarize(self.latencies, 1000),
+            # 측정 구간 동안 가상 클라이언트들이 주고받은 바이트 수
+            'traffic_bytes': {
+                'received_on_wire': wire_in,
+                'received_payload': payload_in,
+                'sent_on_wire': wire_out,
+                'wire_ratio': round(wire_in / payload_in, 4) if payload_in else None,
+            },
+            'cpu_seconds': {
+                'server': round(server_cpu, 3) if server_cpu is not None else None,
+                'bench': round(bench_cpu, 3),
+                'server_us_per_delivery': (round(server_cpu / self.delivered * 1_000_000, 2)
+                                           if server_cpu is not None and self.delivered else None),
+            },
+            'server_rss_kb': {
+                'idle': rss_idle,
+                'connected': rss_connected,
+                'peak': max(rss_samples) if rss_samples else None,
+            },
+        }
+
+
+def spawn_server(engine, port, extra):
+    """벤치마크용 서버를 자식 프로세스로 실행"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chat_server.py')
+    # 전송량 제한은 끄고 순수한 전달 성능을 잼 (extra로 다시 켤 수 있음)
+    command = [sys.executable, script, '--engine', engine, '--port', str(port), '--replay', '0',
+               '--msg-rate', '0', '--byte-rate', '0', '--room-msg-rate', '0', '--room-byte-rate', '0'] + extra
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    if process.poll() is not None:
+        raise RuntimeError('서버를 시작하지 못했습니다.')
+    return process
+
+
+def print_report(result):
+    connect = result['connect']
+    messages = result['messages']
+    latency = result['fanout_latency_ms']
+    rss = result['server_rss_kb']
+    traffic = result['traffic_bytes']
+    cpu = result['cpu_seconds']
+    print('--- 결과 ---')
+    print(f"접속: {connect['connected']}개 성공, {connect['failed']}개 실패, "
+          f"p50 {connect['per_client_ms'].get('p50')}ms / p99 {connect['per_client_ms'].get('p99')}ms")
+    print(f"메시지: 보냄 {messages['sent']}, 전달 {messages['delivered']}/{messages['expected_deliveries']} "
+          f"({messages['delivered_per_second']}건/초)")
+    print(f"전달 지연: p50 {latency.get('p50')}ms, p95 {latency.get('p95')}ms, "
+          f"p99 {latency.get('p99')}ms, 최대 {latency.get('max')}ms")
+    print(f"수신 바이트: 회선 {traffic['received_on_wire']}, 본문 {traffic['received_payload']} "
+          f"(회선/본문 {traffic['wire_ratio']})")
+    if cpu['server'] is not None:
+        print(f"CPU: 서버 {cpu['server']}초 (전달 1건당 {cpu['server_us_per_delivery']}us), 측정 도구 {cpu['bench']}초")
+    if rss['peak']:
+        print(f"서버 RSS: 대기 {rss['idle']}KB, 접속 후 {rss['connected']}KB, 최대 {rss['peak']}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='채팅 서버 부하 테스트')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9999)
+    parser.add_argument('--clients', type=int, default=100, help='가상 클라이언트 수 (기본값: 100)')
+    parser.add_argument('--senders', type=int, default=5, help='메시지를 보내는 클라이언트 수 (기본값: 5)')
+    parser.add_argument('--rate', type=float, default=10.0, help='송신자 한 명이 초당 보내는 메시지 수 (기본값: 10)')
+    parser.add_argument('--duration', type=float, default=10.0, help='메시지를 보내는 시간(초) (기본값: 10)')
+    parser.add_argument('--size', type=int, default=32, help='메시지에 덧붙일 본문 크기(바이트) (기본값: 32)')
+    parser.add_argument('--concurrency', type=int, default=200, help='동시에 진행할 접속 수 (기본값: 200)')
+    parser.add_argument('--settle', type=float, default=1.0, help='접속 후 측정 시작까지 기다리는 시간(초)')
+    parser.add_argument('--drain', type=float, default=2.0, help='송신이 끝난 뒤 도착을 기다리는 시간(초)')
+    parser.add_argument('--korean', action='store_true',
+                        help='본문을 x 대신 무작위 한국어 문장으로 채움 (압축률을 현실적으로 측정)')
+    parser.add_argument('--compress', action='store_true', help='모든 가상 클라이언트가 zlib 스트림 압축을 요청')
+    parser.add_argument('--prefix', default='bench', help='가상 클라이언트 닉네임 접두사')
+    parser.add_argument('--server-pid', type=int, default=None, help='RSS를 측정할 서버 프로세스 번호')
+    parser.add_argument('--spawn', choices=['thread', 'asyncio'], default=None,
+                        help='지정한 엔진으로 서버를 직접 실행해 측정')
+    parser.add_argument('--server-args', default='', help='--spawn으로 실행할 서버에 넘길 추가 인자')
+    parser.add_argument('--output', default=None, help='결과를 저장할 JSON 파일 경로')
+    args = parser.parse_args()
+
+    process = None
+    server_pid = args.server_pid
+    if args.spawn:
+        process = spawn_server(args.spawn, args.port, args.server_args.split())
+        server_pid = process.pid
+
+    try:
+        result = asyncio.run(ChatBench(args).run(server_pid))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'결과를 {args.output}에 저장했습니다.')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,107 @@
+import argparse
 import socket
 import threading
 
-def receive_messages(sock):
+import chat_compress
+import chat_files
+from chat_protocol import PING, PONG, RECV_SIZE, FrameDecoder, ProtocolError, encode_frame
+
+PONG_FRAME = encode_frame(PONG)
+# 입력 스레드와 수신 스레드(PONG 응답)가 동시에 보내도 프레임이 섞이지 않도록 함
+send_lock = threading.Lock()
+# 압축을 협상하면 보내는 프레임을 압축할 스트림 (chat_compress.StreamCompressor)
+compressor = None
+
+
+def send_frame(sock, data):
+    with send_lock:
+        if compressor is not None:
+            data = compressor.compress([data])
+        sock.sendall(data)
+
+
+def negotiate_compression(sock):
+    """닉네임을 입력하기 전에 압축을 요청
+
+    반환: (압축 해제기 또는 None, 응답 뒤에 이미 받은 데이터를 평문으로 바꾼 것)
+    """
+    global compressor
+    sock.sendall(chat_compress.REQUEST_FRAME)
+    handshake = chat_compress.ClientHandshake()
+    while not handshake.done:
+        data = sock.recv(RECV_SIZE)
+        if not data:
+            raise ConnectionError('압축 협상 중에 연결이 종료되었습니다.')
+        for message in handshake.feed(data):
+            if message != PING:
+                print(message)
+    if not handshake.accepted:
+        print('[SYSTEM] 서버가 압축을 지원하지 않아 압축 없이 접속합니다.')
+        return None, handshake.rest
+    compressor = chat_compress.StreamCompressor()
+    decompressor = chat_compress.StreamDecompressor()
+    return decompressor, decompressor.decompress(handshake.rest)
+
+
+def receive_messages(sock, decompressor=None, initial=b''):
     """서버로부터 메시지를 수신하여 출력"""
+    decoder = FrameDecoder()
+    pending = initial
     while True:
         try:
-            message = sock.recv(1024).decode('utf-8')
-            if not message:
-                print('서버로부터 연결이 종료되었습니다.')
-                break
-            print(message)
+            if pending:
+                data, pending = pending, b''
+            else:
+                data = sock.recv(RECV_SIZE)
+                if not data:
+                    print('서버로부터 연결이 종료되었습니다.')
+                    break
+                if decompressor is not None:
+                    data = decompressor.decompress(data)
+            messages = decoder.feed(data)
+        except (ProtocolError, UnicodeDecodeError) as e:
+            print(f'[SYSTEM] 잘못된 메시지를 받았습니다: {e}')
+            break
         except:
             break
+        for message in messages:
+            if message == PING:
+                # 서버의 연결 확인에 응답
+                try:
+                    send_frame(sock, PONG_FRAME)
+                except OSError:
+                    pass
+                continue
+            if message.startswith('/file offer '):
+                # 파일 받기는 asyncio 클라이언트에서만 지원하므로 바로 거절
+                parts = message.split(' ', 4)
+                if len(parts) >= 4:
+                    print(f"[SYSTEM] '{parts[2]}'님이 파일을 보내려 했지만 거절했습니다. (--engine asyncio로 받을 수 있습니다)")
+                    try:
+                        send_frame(sock, encode_frame(f'/file reject {parts[2]} {parts[3]}'))
+                    except OSError:
+                        pass
+                continue
+            if message.startswith('/file '):
+                continue
+            print(message)
     sock.close()
 
 
-def start_client():
-    """클라이언트를 시작하고 서버에 연결"""
-    host = '127.0.0.1'
-    port = 9999
-
+def start_client(host='127.0.0.1', port=9999, compress=False):
+    """클라이언트를 시작하고 서버에 연결 (입력은 메인 스레드, 수신은 별도 스레드)"""
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    decompressor, initial = None, b''
     try:
         client_socket.connect((host, port))
+        if compress:
+            decompressor, initial = negotiate_compression(client_socket)
     except Exception as e:
         print(f'서버 연결 오류: {e}')
+        client_socket.close()
         return
 
-    thread = threading.Thread(target=receive_messages, args=(client_socket,))
+    thread = threading.Thread(target=receive_messages, args=(client_socket, decompressor, initial))
     thread.daemon = True
     thread.start()
     
@@ -38,7 +112,7 @@ def start_client():
             message = input()
             try:
                 # 인코딩 오류가 발생해도 프로그램이 충돌하지 않도록 예외 처리
-                client_socket.send(message.encode('utf-8'))
+                send_frame(client_socket, encode_frame(message))
             except UnicodeEncodeError:
                 print("[SYSTEM] 전송할 수 없는 문자가 포함되어 있습니다.")
 
@@ -47,5 +121,42 @@ def start_client():
     finally:
         client_socket.close()
 
+
+def main():
+    """명령행 인자에 따라 클라이언트 엔진을 선택해 실행"""
+    parser = argparse.ArgumentParser(description='채팅 클라이언트')
+    parser.add_argument('--engine', choices=['thread', 'asyncio'], default='thread',
+                        help='thread: 입력/수신 스레드, asyncio: 재접속과 송신 대기열 지원 (기본값: thread)')
+    parser.add_argument('--host', default='127.0.0.1', help='서버 주소 (기본값: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=9999, help='포트 번호 (기본값: 9999)')
+    parser.add_argument('--nickname', default=None,
+                        help='접속할 때 자동으로 보낼 닉네임 (asyncio 엔진)')
+    parser.add_argument('--script', default=None,
+                        help='각 줄을 메시지로 초당 --rate개씩 보내고 종료할 파일 (asyncio 엔진으로 실행)')
+    parser.add_argument('--rate', type=float, default=10.0,
+                        help='--script를 보낼 초당 메시지 수, 0이면 최대 속도. 서버의 --msg-rate보다 빠르면 '
+                             '경고가 쌓여 연결이 끊기므로 서버 설정도 함께 바꿔야 함 (기본값: 10)')
+    parser.add_argument('--quiet', action='store_true', help='받은 메시지를 출력하지 않음 (asyncio 엔진)')
+    parser.add_argument('--compress', action='store_true',
+                        help='서버에 zlib 스트림 압축을 요청 (느린 회선에서 전송량을 줄임)')
+    parser.add_argument('--download-dir', default='downloads',
+                        help='/send로 받은 파일을 저장할 폴더 (asyncio 엔진, 기본값: downloads)')
+    parser.add_argument('--max-file-size', type=int, default=chat_files.MAX_FILE_SIZE,
+                        help=f'이보다 큰 파일(바이트)은 묻지 않고 거절 (asyncio 엔진, 기본값: {chat_files.MAX_FILE_SIZE})')
+    parser.add_argument('--auto-accept', action='store_true',
+                        help='/accept 없이 받는 파일을 모두 수락 (asyncio 엔진)')
+    args = parser.parse_args()
+
+    if args.script is not None or args.engine == 'asyncio':
+        if args.script is not None and not args.nickname:
+            parser.error('--script는 --nickname과 함께 사용해야 합니다.')
+        import chat_client_async
+        chat_client_async.start_client(args.host, args.port, args.nickname, args.script, args.quiet,
+                                       args.compress, args.download_dir, args.max_file_size, args.auto_accept,
+                                       args.rate)
+    else:
+        start_client(args.host, args.port, args.compress)
+
+
 if __name__ == '__main__':
-    start_client()
\ No newline at end of file
+    main()
@@ -0,0 +1,388 @@
+"""asyncio 이벤트 루프 기반 채팅 클라이언트
+
+표준 입력과 소켓을 하나의 이벤트 루프에서 처리한다.
+- 서버와 연결이 끊기면 지터를 섞은 지수 백오프로 다시 접속하고, 닉네임도 다시 보낸다.
+- 입력한 메시지는 송신 대기열에 넣고, 접속해 있는 동안 쌓인 만큼 한 번에 보낸다.
+  연결이 끊겨 있는 동안 입력한 메시지는 다시 접속한 뒤에 보낸다.
+- --script 파일의 각 줄을 초당 --rate개씩 보낸 뒤 종료한다. (대량 재전송, 부하 테스트용)
+  기본값은 서버의 기본 --msg-rate(10)와 같으며, 0이면 최대 속도로 보낸다.
+  (서버 제한보다 빠르게 보내면 경고가 쌓여 연결이 끊기므로 서버의 --msg-rate도 함께 올려야 함)
+- /send 닉네임 경로 로 파일을 보내고, 받은 파일은 --download-dir에 저장한다. (chat_files.py)
+  받을 파일은 /accept 닉네임 으로 수락해야 하며(--auto-accept이면 바로 받음),
+  --max-file-size보다 크면 묻지 않고 거절한다.
+
+실행:
+- python chat_client.py --engine asyncio
+- python chat_client.py --script messages.txt --nickname bot --quiet
+"""
+
+import asyncio
+import collections
+import random
+import sys
+import threading
+
+import chat_compress
+import chat_files
+from chat_protocol import MAX_FRAME_SIZE, PING, PONG, RECV_SIZE, FrameDecoder, ProtocolError, encode_frame
+
+PONG_FRAME = encode_frame(PONG)
+EXIT_COMMAND = '/종료'
+# 서버가 닉네임을 거절할 때 보내는 안내 문구의 앞부분
+NICKNAME_REJECTED = '닉네임이 비어있거나'
+
+# 다시 접속할 때 기다리는 시간(초): 실패할 때마다 두 배, 최대 MAX_BACKOFF
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# writelines 한 번에 보내는 최대 메시지 수
+SEND_BATCH = 512
+SEND_USAGE = '[SYSTEM] 사용법: /send 상대닉네임 파일경로'
+# --script로 보낼 때 초당 메시지 수 (서버의 기본 --msg-rate와 같음)
+SCRIPT_RATE = 10.0
+
+
+def backoff_delay(attempt):
+    """attempt번째 재시도 전에 기다릴 시간
+
+    여러 클라이언트가 서버 재시작 직후 한꺼번에 다시 접속하지 않도록
+    상한의 절반은 고정, 나머지 절반은 무작위로 정한다.
+    """
+    cap = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt)
+    return cap / 2 + random.uniform(0, cap / 2)
+
+
+class AsyncChatClient:
+    """끊기면 다시 접속하고, 그동안 보낼 메시지는 대기열에 보관하는 클라이언트"""
+
+    def __init__(self, host, port, nickname=None, queue_size=1000, quiet=False, interactive=True,
+                 compress=False, download_dir='downloads', max_file_size=chat_files.MAX_FILE_SIZE,
+                 auto_accept=False):
+        self.host = host
+        self.port = port
+        # 접속할 때마다 zlib 스트림 압축을 요청
+        self.compress = compress
+        self._compressor = None
+        self.nickname = nickname
+        self.queue_size = queue_size
+        self.quiet = quiet
+        # False이면 닉네임이 거절되었을 때 새로 입력받지 않고 끝냄
+        self.interactive = interactive
+        # 보낼 프레임 대기열 (연결이 끊겨 있는 동안에도 보관)
+        self.outbox = collections.deque()
+        self.sent = 0
+        self.received = 0
+        self._writer = None
+        # 닉네임 등록을 마쳐 대기열의 메시지를 보내도 됨
+        self._ready = asyncio.Event()
+        # 대기열에 메시지가 들어옴 / 대기열에 자리가 남
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        # /종료를 보냈거나 입력이 끝나 다시 접속하지 않음
+        self._closing = False
+        # 파일 전송: 제어 프레임은 바로 보내고, 조각은 송신 루프가 채팅 사이사이에 보냄
+        self.files = chat_files.FileTransfers(self._send_control, self._wakeup.set, download_dir,
+                                              max_file_size, auto_accept)
+
+    async def submit(self, message):
+        """입력 한 줄을 처리 (대기열이 가득 차 있으면 자리가 날 때까지 기다림)"""
+        try:
+            data = encode_frame(message)
+        except UnicodeEncodeError:
+            print('[SYSTEM] 전송할 수 없는 문자가 포함되어 있습니다.')
+            return
+
+        if self.nickname is None:
+            # 닉네임이 정해지지 않았으면 이번 줄이 닉네임 (접속 전이면 접속하면서 보냄)
+            self.nickname = message.strip()
+            if self._writer is not None:
+                self._write(self._writer, [data])
+            return
+
+        if message == '/send' or message.startswith('/send '):
+            parts = message.split(' ', 2)
+            if len(parts) == 3 and parts[1] and parts[2]:
+                self.files.start(parts[1], parts[2])
+            else:
+                print(SEND_USAGE)
+            return
+        command, _, peer = message.partition(' ')
+        if command in ('/accept', '/reject'):
+            if peer.strip():
+                self.files.answer(peer.strip(), command == '/accept')
+            else:
+                print(chat_files.ACCEPT_USAGE)
+            return
+
+        while len(self.outbox) >= self.queue_size:
+            self._space.clear()
+            await self._space.wait()
+        self.outbox.append(data)
+        self._wakeup.set()
+        if message == EXIT_COMMAND:
+            self._closing = True
+
+    def finish(self):
+        """더 보낼 입력이 없음: 대기열을 비운 뒤 /종료를 보내고 끝냄"""
+        if not self._closing:
+            self.outbox.append(encode_frame(EXIT_COMMAND))
+            self._wakeup.set()
+            self._closing = True
+
+    async def run(self):
+        """서버에 접속하고, 끊기면 /종료 전까지 다시 접속"""
+        attempt = 0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                if self._closing:
+                    break
+                delay = backoff_delay(attempt)
+                attempt += 1
+                print(f'[SYSTEM] 서버 연결 오류: {e} ({delay:.1f}초 후 다시 시도합니다.)')
+                await asyncio.sleep(delay)
+                continue
+
+            print('서버에 연결되었습니다. 메시지를 입력하세요.')
+            self._compressor = None
+            decompressor, initial = None, b''
+            try:
+                if self.compress:
+                    decompressor, initial = await self._negotiate_compression(reader, writer)
+            except (ConnectionError, ProtocolError, UnicodeDecodeError) as e:
+                print(f'[SYSTEM] 압축 협상 실패: {e}')
+                writer.close()
+                if self._closing:
+                    break
+                delay = backoff_delay(attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self._writer = writer
+            if self.nickname:
+                self._write(writer, [encode_frame(self.nickname)])
+            sender = asyncio.create_task(self._send_loop(writer))
+            watcher = asyncio.create_task(self._watch_transfers())
+            try:
+                registered = await self._receive_loop(reader, writer, decompressor, initial)
+            finally:
+                sender.cancel()
+                watcher.cancel()
+                self._ready.clear()
+                self._writer = None
+                writer.close()
+
+            if self._closing:
+                break
+            if registered:
+                attempt = 0
+            delay = backoff_delay(attempt)
+            attempt += 1
+            print(f'[SYSTEM] 서버와 연결이 끊어졌습니다. {delay:.1f}초 후 다시 접속합니다.')
+            await asyncio.sleep(delay)
+
+        if self.outbox:
+            print(f'[SYSTEM] 보내지 못한 메시지 {len(self.outbox)}개를 버립니다.')
+        if self.files.outgoing or self.files.incoming:
+            print('[SYSTEM] 끝나지 않은 파일 전송을 중단합니다. (받던 파일은 다음에 이어 받습니다)')
+        self.files.close()
+
+    def _write(self, writer, buffers):
+        if self._compressor is not None:
+            writer.write(self._compressor.compress(buffers))
+        else:
+            writer.writelines(buffers)
+
+    def _send_control(self, data):
+        """파일 전송 제어 프레임을 대기열을 거치지 않고 보냄
+
+        끊겨 있는 동안의 프레임은 버린다. 다시 접속하면 resume_all로 전송을 다시 요청한다.
+        """
+        if self._writer is not None and self._ready.is_set():
+            self._write(self._writer, [data])
+
+    async def _watch_transfers(self):
+        while True:
+            await asyncio.sleep(chat_files.BUSY_PAUSE / 2)
+            self.files.check_stalled()
+
+    async def _negotiate_compression(self, reader, writer):
+        """압축을 요청하고 (압축 해제기 또는 None, 응답 뒤에 이미 받은 평문)을 반환"""
+        writer.write(chat_compress.REQUEST_FRAME)
+        handshake = chat_compress.ClientHandshake()
+        while not handshake.done:
+            data = await reader.read(RECV_SIZE)
+            if not data:
+                raise ConnectionError('압축 협상 중에 연결이 종료되었습니다.')
+            for message in handshake.feed(data):
+                if message != PING and not self.quiet:
+                    print(message)
+        if not handshake.accepted:
+            print('[SYSTEM] 서버가 압축을 지원하지 않아 압축 없이 접속합니다.')
+            return None, handshake.rest
+        self._compressor = chat_compress.StreamCompressor()
+        decompressor = chat_compress.StreamDecompressor()
+        return decompressor, decompressor.decompress(handshake.rest)
+
+    async def _receive_loop(self, reader, writer, decompressor=None, initial=b''):
+        """연결이 끊길 때까지 메시지를 받아 출력하고, 닉네임 등록에 성공했는지 반환"""
+        decoder = FrameDecoder()
+        registered = False
+        pending = initial
+        while True:
+            try:
+                if pending:
+                    data, pending = pending, b''
+                else:
+                    data = await reader.read(RECV_SIZE)
+                    if not data:
+                        return registered
+                    if decompressor is not None:
+                        data = decompressor.decompress(data)
+                messages = decoder.feed(data)
+            except (ProtocolError, UnicodeDecodeError) as e:
+                print(f'[SYSTEM] 잘못된 메시지를 받았습니다: {e}')
+                return registered
+            except OSError:
+                return registered
+
+            for message in messages:
+                if message == PING:
+                    # 서버의 연결 확인에 응답 (대기열을 거치지 않음)
+                    self._write(writer, [PONG_FRAME])
+                    continue
+                if message.startswith(chat_files.PREFIX):
+                    self.files.handle(message)
+                    continue
+                self.received += 1
+                if not self._ready.is_set():
+                    if message == f"'{self.nickname}'님이 입장하셨습니다.":
+                        registered = True
+                        self._ready.set()
+                        # 끊기기 전에 보내던 파일은 받는 쪽이 받은 위치부터 이어서 보냄
+                        self.files.resume_all()
+                    elif message.startswith(NICKNAME_REJECTED):
+                        if not self.interactive:
+                            print(f"[SYSTEM] 닉네임 '{self.nickname}'을 사용할 수 없어 종료합니다.")
+                            self._closing = True
+                            return registered
+                        # 다음 입력을 새 닉네임으로 받음
+                        self.nickname = None
+                if not self.quiet:
+                    print(message)
+
+    async def _send_loop(self, writer):
+        """등록을 마치면 대기열에 쌓인 메시지를 묶어서 보냄
+
+        채팅 메시지를 먼저 보내고, 대기열이 비어 있을 때만 파일 조각을 하나씩 보낸다.
+        """
+        await self._ready.wait()
+        outbox = self.outbox
+        while True:
+            if not outbox:
+                chunk = self.files.next_chunk()
+                if chunk is not None:
+                    self._write(writer, [chunk])
+                    await writer.drain()
+                    continue
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            count = min(len(outbox), SEND_BATCH)
+            # 보내기 전에 꺼내므로 전송 중에 끊기면 그 묶음은 다시 보내지 않음 (중복 방지)
+            batch = [outbox.popleft() for _ in range(count)]
+            self._space.set()
+            self._write(writer, batch)
+            self.sent += count
+            await writer.drain()
+
+
+async def read_stdin(client):
+    """표준 입력을 이벤트 루프를 막지 않고 한 줄씩 읽어 client에 넘김"""
+    loop = asyncio.get_running_loop()
+    reader = None
+    if not sys.stdin.isatty():
+        # 파이프로 들어오는 입력은 이벤트 루프에서 직접 읽음
+        # (터미널은 논블로킹 모드로 바뀌면 종료 후 셸에 영향을 주므로 제외)
+        reader = asyncio.StreamReader(limit=MAX_FRAME_SIZE)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except (NotImplementedError, ValueError, OSError):
+            # 윈도우나 일반 파일로 리디렉션한 경우
+            reader = None
+
+    if reader is not None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            await client.submit(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+    else:
+        lines = asyncio.Queue()
+
+        def pump():
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(lines.put_nowait, line.rstrip('\r\n'))
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+
+        # 터미널 입력은 별도 스레드에서 읽어 이벤트 루프로 넘김
+        threading.Thread(target=pump, daemon=True).start()
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            await client.submit(line)
+    client.finish()
+
+
+async def play_script(client, f, rate=SCRIPT_RATE):
+    """파일의 각 줄을 초당 rate개씩 메시지로 보내고 종료 (빈 줄은 건너뜀, rate가 0이면 최대 속도)"""
+    loop = asyncio.get_running_loop()
+    next_send = loop.time()
+    with f:
+        for line in f:
+            message = line.rstrip('\r\n')
+            if not message:
+                continue
+            if rate > 0:
+                # 서버의 연결별 메시지 제한을 넘지 않도록 일정한 간격으로 보냄
+                delay = next_send - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_send = max(next_send, loop.time()) + 1.0 / rate
+            await client.submit(message)
+    client.finish()
+
+
+async def run_client(host, port, nickname=None, script=None, quiet=False, compress=False,
+                     download_dir='downloads', max_file_size=chat_files.MAX_FILE_SIZE, auto_accept=False,
+                     rate=SCRIPT_RATE):
+    client = AsyncChatClient(host, port, nickname, quiet=quiet, interactive=script is None,
+                             compress=compress, download_dir=download_dir,
+                             max_file_size=max_file_size, auto_accept=auto_accept)
+    if script is None:
+        feeder = asyncio.create_task(read_stdin(client))
+    else:
+        # 파일을 열 수 없으면 접속하기 전에 실패
+        feeder = asyncio.create_task(play_script(client, open(script, encoding='utf-8'), rate))
+    try:
+        await client.run()
+    finally:
+        feeder.cancel()
+    if script is not None:
+        print(f'[SYSTEM] 보낸 메시지 {client.sent}개, 받은 메시지 {client.received}개')
+
+
+def start_client(host='127.0.0.1', port=9999, nickname=None, script=None, quiet=False, compress=False,
+                 download_dir='downloads', max_file_size=chat_files.MAX_FILE_SIZE, auto_accept=False,
+                 rate=SCRIPT_RATE):
+    """이벤트 루프 클라이언트를 시작"""
+    try:
+        asyncio.run(run_client(host, port, nickname, script, quiet, compress, download_dir,
+                               max_file_size, auto_accept, rate))
+    except KeyboardInterrupt:
+        print('\n프로그램을 종료합니다.')
+    except OSError as e:
+        print(f'스크립트 파일을 열 수 없습니다: {e}')
@@ -0,0 +1,256 @@
+"""여러 프로세스로 나누어 실행하는 채팅 서버 (리눅스 전용)
+
+하나의 CPython 프로세스는 GIL 때문에 코어 하나만 쓰므로, 부모 프로세스가
+asyncio 엔진을 실행하는 워커 N개를 fork하고 모든 워커가 SO_REUSEPORT로 같은
+포트를 연다. 커널이 새 연결을 워커들에게 나누어 준다.
+
+워커끼리는 부모 프로세스가 여는 유닉스 도메인 소켓 버스(BusHub)로 연결된다.
+버스 메시지는 chat_protocol의 프레임을 그대로 쓰고, 본문은 [종류 1바이트][JSON]이다.
+
+- R (방 메시지): 다른 모든 워커에 그대로 전달 (허브는 본문을 해석하지 않음)
+- C/c (닉네임 요청/응답): 허브가 전체 닉네임 목록으로 중복을 확인
+- X (닉네임 반납): 퇴장한 닉네임을 목록에서 지움
+- W/w (귓속말/결과): 허브가 닉네임의 주인 워커로 보내고, 보낸 워커에 결과를 알림
+
+/rooms의 인원 수는 각 워커에 접속한 사람만 센다. 대화 기록은 워커마다 따로 보관한다.
+버스 연결이 끊기면(부모 프로세스 종료) 워커도 연결을 닫고 종료한다.
+
+실행: python chat_server.py --engine asyncio --workers 4
+"""
+
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+
+import chat_history
+import chat_metrics
+import chat_server
+import chat_server_async
+from chat_protocol import RECV_SIZE, FrameDecoder, encode_frame
+
+OP_HELLO = b'H'
+OP_ROOM = b'R'
+OP_CLAIM = b'C'
+OP_CLAIMED = b'c'
+OP_RELEASE = b'X'
+OP_WHISPER = b'W'
+OP_WHISPER_RESULT = b'w'
+
+
+def encode_bus(op, body):
+    """버스 메시지 하나를 프레임으로 변환"""
+    return encode_frame(op + json.dumps(body, ensure_ascii=False).encode('utf-8'))
+
+
+def decode_bus(payload):
+    return payload[:1], json.loads(payload[1:])
+
+
+class BusHub:
+    """워커 사이의 메시지를 중계하고 전체 닉네임 목록을 관리 (부모 프로세스)"""
+
+    def __init__(self):
+        # 워커 번호 -> StreamWriter
+        self.workers = {}
+        # 닉네임 -> 닉네임을 가진 워커 번호
+        self.owners = {}
+
+    async def handle_worker(self, reader, writer):
+        decoder = FrameDecoder()
+        worker_id = None
+        try:
+            while True:
+                data = await reader.read(RECV_SIZE)
+                if not data:
+                    break
+                for payload in decoder.feed_bytes(data):
+                    op = payload[:1]
+                    if op == OP_ROOM:
+                        # 받은 프레임을 다시 인코딩하지 않고 나머지 워커에 전달
+                        frame = encode_frame(payload)
+                        for other_id, other in self.workers.items():
+                            if other_id != worker_id:
+                                other.write(frame)
+                        continue
+                    _, body = decode_bus(payload)
+                    if op == OP_HELLO:
+                        worker_id = body['worker']
+                        self.workers[worker_id] = writer
+                    elif op == OP_CLAIM:
+                        ok = body['nick'] not in self.owners
+                        if ok:
+                            self.owners[body['nick']] = worker_id
+                        writer.write(encode_bus(OP_CLAIMED, {'id': body['id'], 'ok': ok}))
+                    elif op == OP_RELEASE:
+                        if self.owners.get(body['nick']) == worker_id:
+                            del self.owners[body['nick']]
+                    elif op == OP_WHISPER:
+                        owner = self.workers.get(self.owners.get(body['to']))
+                        if owner is not None:
+                            owner.write(encode_bus(OP_WHISPER, body))
+                        body['ok'] = owner is not None
+                        writer.write(encode_bus(OP_WHISPER_RESULT, body))
+        except (ConnectionError, ValueError) as e:
+            print(f'버스 워커 {worker_id} 처리 중 오류: {e}')
+        except asyncio.CancelledError:
+            # 서버 종료 중
+            pass
+        finally:
+            # 종료된 워커의 닉네임은 모두 반납
+            self.workers.pop(worker_id, None)
+            for nick in [n for n, owner in self.owners.items() if owner == worker_id]:
+                del self.owners[nick]
+            writer.close()
+
+    async def serve(self, bus_socket):
+        server = await asyncio.start_unix_server(self.handle_worker, sock=bus_socket)
+        async with server:
+            await server.serve_forever()
+
+
+class BusClient:
+    """워커 프로세스에서 버스에 메시지를 보내고 받은 메시지를 chat_server에 전달"""
+
+    def __init__(self, worker_id, path):
+        self.worker_id = worker_id
+        self.path = path
+        self.writer = None
+        self._pending = {}
+        self._ids = itertools.count()
+
+    async def connect(self):
+        reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.writer.write(encode_bus(OP_HELLO, {'worker': self.worker_id}))
+        self.reader_task = asyncio.create_task(self._read_loop(reader))
+
+    def publish_message(self, message, room, record=False):
+        """방 메시지를 다른 워커에 알림"""
+        self.writer.write(encode_bus(OP_ROOM, {'room': room, 'msg': message, 'record': record}))
+
+    async def claim(self, nickname):
+        """닉네임이 모든 워커를 통틀어 비어 있으면 선점하고 True를 반환"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.writer.write(encode_bus(OP_CLAIM, {'id': request_id, 'nick': nickname}))
+        return await future
+
+    def release(self, nickname):
+        self.writer.write(encode_bus(OP_RELEASE, {'nick': nickname}))
+
+    def send_whisper(self, sender_nickname, target_nickname, message):
+        self.writer.write(encode_bus(OP_WHISPER, {
+            'from': sender_nickname, 'to': target_nickname, 'msg': message,
+        }))
+
+    async def _read_loop(self, reader):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = await reader.read(RECV_SIZE)
+                if not data:
+                    break
+                for payload in decoder.feed_bytes(data):
+                    op, body = decode_bus(payload)
+                    if op == OP_ROOM:
+                        chat_server.deliver_message(body['msg'], body['room'], body.get('record', False))
+                    elif op == OP_CLAIMED:
+                        future = self._pending.pop(body['id'], None)
+                        if future is not None and not future.done():
+                            future.set_result(body['ok'])
+                    elif op == OP_WHISPER:
+                        chat_server.deliver_whisper(body['to'], body['from'], body['msg'])
+                    elif op == OP_WHISPER_RESULT:
+                        if body['ok']:
+                            chat_server.deliver_whisper(body['from'], body['from'], body['msg'])
+                        else:
+                            chat_server.deliver_whisper_error(body['from'], body['to'], body['msg'])
+        except (ConnectionError, ValueError) as e:
+            print(f'[워커 {self.worker_id}] 버스 오류: {e}')
+        finally:
+            print(f'[워커 {self.worker_id}] 버스 연결이 끊어져 워커를 종료합니다.')
+            chat_server.bus = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_result(False)
+            self._pending.clear()
+
+
+async def serve_worker(worker_id, host, port, bus_path):
+    bus = BusClient(worker_id, bus_path)
+    await bus.connect()
+    chat_server.bus = bus
+    server = asyncio.create_task(chat_server_async.serve(host, port, reuse_port=True))
+    # 부모 프로세스가 강제로 종료되어도 워커만 남아 포트를 잡고 있지 않도록 버스가 끊기면 함께 끝냄
+    await asyncio.wait((server, bus.reader_task), return_when=asyncio.FIRST_COMPLETED)
+    server.cancel()
+    try:
+        await server
+    except asyncio.CancelledError:
+        pass
+
+
+def run_worker(worker_id, host, port, bus_path):
+    """워커 프로세스의 진입점"""
+    chat_server_async.raise_open_file_limit()
+    if chat_history.settings['directory']:
+        # 모든 워커가 모든 방 메시지를 받으므로, 파일이 겹치지 않게 워커마다 따로 기록
+        chat_history.configure(directory=os.path.join(chat_history.settings['directory'], f'worker-{worker_id}'))
+    if chat_metrics.settings['admin_port'] is not None:
+        # 워커마다 관리 포트를 따로 엶
+        chat_metrics.configure(admin_port=chat_metrics.settings['admin_port'] + worker_id)
+    try:
+        asyncio.run(serve_worker(worker_id, host, port, bus_path))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f'[워커 {worker_id}] 서버 시작 오류: {e}')
+
+
+def start_cluster(host='127.0.0.1', port=9999, workers=None):
+    """워커 프로세스 workers개와 버스를 실행 (기본값: CPU 코어 수)"""
+    if not hasattr(socket, 'SO_REUSEPORT') or not hasattr(socket, 'AF_UNIX'):
+        print('이 운영체제는 SO_REUSEPORT 또는 유닉스 도메인 소켓을 지원하지 않습니다.')
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f'워커 수는 1 이상이어야 합니다: {workers}')
+
+    bus_dir = tempfile.mkdtemp(prefix='chat-bus-')
+    bus_path = os.path.join(bus_dir, 'bus.sock')
+    # 워커가 접속하기 전에 버스 소켓부터 열어 둠
+    bus_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    bus_socket.bind(bus_path)
+    bus_socket.listen(workers)
+
+    context = multiprocessing.get_context('fork')
+    processes = []
+    for worker_id in range(workers):
+        process = context.Process(target=run_worker, args=(worker_id, host, port, bus_path))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+    print(f'워커 {workers}개로 서버를 시작합니다.')
+
+    async def run_hub():
+        # SIGTERM으로 종료할 때도 아래 finally에서 워커와 버스 소켓을 정리
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await BusHub().serve(bus_socket)
+
+    try:
+        asyncio.run(run_hub())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print("\n서버를 종료합니다.")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+        bus_socket.close()
+        os.unlink(bus_path)
+        os.rmdir(bus_dir)
@@ -0,0 +1,131 @@
+"""연결별 zlib 스트림 압축
+
+채팅 메시지는 짧고 비슷한 한글 문장이 반복되므로, 연결이 끝날 때까지 하나의 zlib
+스트림(압축 사전)을 유지하면 메시지마다 따로 압축하는 것보다 훨씬 많이 줄어든다.
+
+협상 (닉네임 입력 단계):
+1. 클라이언트가 닉네임 대신 REQUEST('/compress zlib')를 보내고 응답을 기다린다.
+2. 서버는 ACCEPT('/compress on') 또는 REJECT('/compress off')를 평문 프레임으로 보낸다.
+3. ACCEPT이면 양쪽 모두 그 프레임 바로 다음 바이트부터 압축 스트림으로 주고받는다.
+   (클라이언트 -> 서버는 REQUEST 다음부터, 서버 -> 클라이언트는 ACCEPT 다음부터)
+
+송신할 때마다 Z_SYNC_FLUSH로 끝내므로 받은 쪽은 지금까지 받은 바이트만으로 모두 풀 수 있다.
+압축은 연결마다 하므로 브로드캐스트에서 공유하던 bytes를 연결 수만큼 다시 압축하는
+CPU 비용이 들고, 연결마다 zlib 압축 상태(기본 설정에서 약 256KB)를 메모리에 둔다.
+(chat_bench.py --korean --compress로 비교)
+"""
+
+import zlib
+
+from chat_protocol import MAX_FRAME_SIZE, ProtocolError, decode_varint, encode_frame
+
+REQUEST = '/compress zlib'
+ACCEPT = '/compress on'
+REJECT = '/compress off'
+REQUEST_FRAME = encode_frame(REQUEST)
+ACCEPT_FRAME = encode_frame(ACCEPT)
+REJECT_FRAME = encode_frame(REJECT)
+
+# recv 한 번에 받은 데이터를 풀었을 때 허용하는 최대 크기 (압축 폭탄 방지)
+MAX_INFLATE = 4 * MAX_FRAME_SIZE
+
+# 서버 시작 시 configure로 변경
+settings = {
+    'enabled': True,
+    'level': 6,
+}
+
+
+class StreamCompressor:
+    """연결 하나의 송신 방향 압축 스트림"""
+
+    def __init__(self, level=None):
+        self._zlib = zlib.compressobj(settings['level'] if level is None else level)
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+
+    def compress(self, buffers):
+        """버퍼 목록을 압축해 바로 보낼 수 있는 바이트열로 반환"""
+        raw = b''.join(buffers)
+        data = self._zlib.compress(raw) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+        self.raw_bytes += len(raw)
+        self.wire_bytes += len(data)
+        return data
+
+
+class StreamDecompressor:
+    """연결 하나의 수신 방향 압축 스트림"""
+
+    def __init__(self):
+        self._zlib = zlib.decompressobj()
+
+    def decompress(self, data):
+        try:
+            out = self._zlib.decompress(data, MAX_INFLATE)
+        except zlib.error as e:
+            raise ProtocolError(f'압축 데이터가 잘못되었습니다: {e}') from None
+        if self._zlib.unconsumed_tail:
+            raise ProtocolError('압축을 푼 데이터가 너무 큽니다.')
+        return out
+
+
+class ClientHandshake:
+    """클라이언트 쪽 협상: 서버의 응답 프레임까지는 평문으로 읽고 나머지는 남겨 둠
+
+    FrameDecoder는 받은 바이트를 한꺼번에 프레임으로 풀어 버리므로, 응답 뒤에 이어 온
+    압축 데이터를 건드리지 않도록 협상하는 동안에는 프레임을 하나씩 직접 읽는다.
+    """
+
+    def __init__(self):
+        self.done = False
+        self.accepted = False
+        # 응답 프레임 다음에 받은 (압축된) 바이트
+        self.rest = b''
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """받은 바이트를 넣고 응답 전에 온 평문 메시지 목록을 반환"""
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        pos = 0
+        while not self.done:
+            try:
+                length, start = decode_varint(buffer, pos)
+            except ProtocolError:
+                if len(buffer) - pos >= 5:
+                    raise
+                # 길이 값이 아직 다 도착하지 않음
+                break
+            end = start + length
+            if end > len(buffer):
+                break
+            message = bytes(buffer[start:end]).decode('utf-8')
+            pos = end
+            if message in (ACCEPT, REJECT):
+                self.done = True
+                self.accepted = message == ACCEPT
+                self.rest = bytes(buffer[pos:])
+            else:
+                messages.append(message)
+        del buffer[:pos]
+        return messages
+
+
+def split_at_accept(batch):
+    """송신 묶음을 ACCEPT_FRAME까지(평문)와 그 뒤(압축할 부분)로 나눔
+
+    ACCEPT_FRAME이 없으면 (batch, None)을 반환한다. 같은 bytes 객체인지로 찾으므로
+    다른 사람이 같은 내용의 메시지를 보내도 구분된다.
+    """
+    for i, data in enumerate(batch):
+        if data is ACCEPT_FRAME:
+            return batch[:i + 1], batch[i + 1:]
+    return batch, None
+
+
+def configure(enabled=None, level=None):
+    if enabled is not None:
+        settings['enabled'] = enabled
+    if level is not None:
+        settings['level'] = level
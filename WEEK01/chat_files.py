@@ -0,0 +1,384 @@
+"""채팅 연결로 주고받는 파일 전송 (클라이언트 쪽)
+
+/send 닉네임 경로 로 시작하며, 서버는 '/file 동작 상대 전송ID ...' 프레임을 상대에게
+그대로 전달(상대 닉네임 자리를 보낸 사람 닉네임으로 바꿈)할 뿐 파일 내용을 모아 두지 않는다.
+
+    보내는 쪽                                    받는 쪽
+    /file offer 받는쪽 ID 크기 SHA256 이름 ->
+                                                 (/accept 보낸쪽 으로 받기로 함)
+                                         <-      /file accept 보낸쪽 ID 시작위치
+    /file chunk 받는쪽 ID 위치 base64    ->      (받은 만큼 .part 파일에 이어 씀)
+                                         <-      /file ack 보낸쪽 ID 다음위치
+    ...
+                                         <-      /file done 보낸쪽 ID
+
+- 조각은 CHUNK_SIZE 바이트씩 파일에서 그때그때 읽고, 응답을 받지 못한 조각이 WINDOW개를
+  넘지 않게 보낸다. 송신 루프는 채팅 메시지를 먼저 보내고 남는 차례에 조각을 하나씩 보내므로
+  큰 파일을 보내는 중에도 채팅이 밀리지 않는다.
+- 받는 쪽은 제안을 받으면 사용자가 /accept 또는 /reject 할 때까지 기다린다. (auto_accept이면
+  바로 받음) max_size보다 큰 파일은 묻지 않고 거절한다.
+- 받는 쪽은 '이름.키.part' 파일에 이어 쓰고, 같은 파일을 다시 받으면 그 크기부터 이어 받는다.
+  키는 보낸 사람 닉네임과 파일 내용의 SHA-256으로 만들므로, 다른 사람이 보냈거나 내용이 다른
+  파일은 이름과 크기가 같아도 이어 붙이지 않는다. 이미 받기로 한 파일을 이어 받을 때는 다시
+  묻지 않는다. 다 받으면 SHA-256을 확인하고, 다르면 .part 파일을 지우고 전송을 실패로 알린다.
+  (연결이 끊겨도 다시 /send 하면 이어서 전송)
+- 서버가 전송량 제한으로 조각을 버리면 보낸 쪽에 '/file busy 상대 ID 위치'를 알려 주고,
+  보낸 쪽은 BUSY_PAUSE초 쉬었다가 그 위치부터 다시 보낸다.
+- 그 밖의 이유로(받는 쪽 송신 대기열 초과 등) 조각이 빠지면 받는 쪽이 accept로 기다리던
+  위치를 다시 알려 주고, STALL_TIMEOUT초 동안 응답이 없으면 보내는 쪽이 마지막 ack부터 다시 보낸다.
+"""
+
+import base64
+import hashlib
+import itertools
+import re
+import os
+import secrets
+import time
+
+from chat_protocol import encode_frame
+from chat_ratelimit import TokenBucketLimit
+
+PREFIX = '/file '
+# 조각 하나의 원본 크기 (base64로 보내므로 프레임은 약 4/3배)
+CHUNK_SIZE = 16 * 1024
+# ack를 받지 못한 채 보낼 수 있는 조각 수
+WINDOW = 4
+STALL_TIMEOUT = 5.0
+# 서버가 조각을 버렸을 때 다시 보내기 전에 쉬는 시간(초)
+BUSY_PAUSE = 0.2
+# 받는 쪽이 묻지 않고 거절하는 파일 크기 (기본값)
+MAX_FILE_SIZE = 100 * 1024 * 1024
+# 파일 내용의 지문을 계산할 때 한 번에 읽는 크기
+HASH_BLOCK = 1024 * 1024
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+ACCEPT_USAGE = '[SYSTEM] 사용법: /accept 상대닉네임, /reject 상대닉네임'
+
+# 서버 시작 시 configure로 변경 (byte_rate가 0이면 제한하지 않음)
+settings = {
+    'byte_rate': 1024 * 1024,
+    'byte_burst': 2 * 1024 * 1024,
+}
+
+
+def file_frame(op, peer, transfer_id, *fields):
+    return encode_frame(' '.join(('/file', op, peer, transfer_id) + tuple(str(f) for f in fields)))
+
+
+def file_digest(path):
+    """파일 내용의 SHA-256 (16진수)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def part_key(peer, digest):
+    """보낸 사람과 내용으로 이어 받을 .part 파일을 구분하는 키 (닉네임을 파일 이름에 넣지 않음)"""
+    return hashlib.sha256(f'{peer}\0{digest}'.encode('utf-8')).hexdigest()[:16]
+
+
+class OutgoingTransfer:
+    def __init__(self, peer, path, size):
+        self.id = secrets.token_hex(4)
+        self.peer = peer
+        self.path = path
+        self.name = os.path.basename(path)
+        self.size = size
+        self.file = open(path, 'rb')
+        # 보내는 도중 파일이 바뀌면 받는 쪽이 지문으로 알아챔
+        self.digest = file_digest(path)
+        self.accepted = False
+        self.sent = 0
+        self.acked = 0
+        self.last_progress = time.monotonic()
+        # 이 시각까지는 조각을 보내지 않음 (서버가 busy를 알려 옴)
+        self.resume_at = 0.0
+
+    def can_send(self, now):
+        return (self.accepted and self.sent < self.size and now >= self.resume_at
+                and self.sent - self.acked < WINDOW * CHUNK_SIZE)
+
+    def next_chunk(self):
+        """다음 조각을 파일에서 읽어 프레임으로 만듦"""
+        self.file.seek(self.sent)
+        data = self.file.read(CHUNK_SIZE)
+        frame = file_frame('chunk', self.peer, self.id, self.sent, base64.b64encode(data).decode('ascii'))
+        self.sent += len(data)
+        return frame
+
+    def close(self):
+        self.file.close()
+
+
+class IncomingOffer:
+    """받는 쪽이 아직 수락하지 않은 파일 전송 제안"""
+
+    def __init__(self, peer, transfer_id, size, digest, name, directory):
+        self.peer = peer
+        self.id = transfer_id
+        self.size = size
+        self.digest = digest
+        self.name = name
+        self.directory = directory
+        self.part_path = os.path.join(directory, f'{name}.{part_key(peer, digest)}.part')
+
+
+class IncomingTransfer:
+    def __init__(self, offer):
+        self.peer = offer.peer
+        self.id = offer.id
+        self.size = offer.size
+        self.digest = offer.digest
+        self.name = offer.name
+        self.directory = offer.directory
+        self.part_path = offer.part_path
+        # 이전에 받다 만 파일이 있으면 그 뒤부터 이어 받음
+        exists = os.path.exists(self.part_path)
+        self.offset = min(os.path.getsize(self.part_path), self.size) if exists else 0
+        self.file = open(self.part_path, 'r+b' if exists else 'wb')
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+        # 빠진 조각을 이미 다시 요청했는지 (같은 요청을 반복하지 않도록)
+        self.requested = False
+
+    def finish(self):
+        """.part 파일을 원래 이름으로 바꿔 저장하고 경로를 반환 (같은 이름이 있으면 번호를 붙임)
+
+        내용이 제안의 SHA-256과 다르면 .part 파일을 지우고 ValueError를 일으킨다.
+        """
+        self.file.close()
+        if file_digest(self.part_path) != self.digest:
+            os.remove(self.part_path)
+            raise ValueError('받은 파일의 SHA-256이 다릅니다.')
+        base, ext = os.path.splitext(self.name)
+        target = os.path.join(self.directory, self.name)
+        for n in itertools.count(1):
+            if not os.path.exists(target):
+                break
+            target = os.path.join(self.directory, f'{base} ({n}){ext}')
+        os.replace(self.part_path, target)
+        return target
+
+    def close(self):
+        self.file.close()
+
+
+class FileTransfers:
+    """한 클라이언트의 보내는/받는 파일 전송 목록
+
+    send는 제어 프레임(accept, ack 등)을 바로 보내는 함수, wakeup은 보낼 조각이
+    생겼을 때 송신 루프를 깨우는 함수다.
+    """
+
+    def __init__(self, send, wakeup, directory='downloads', max_size=MAX_FILE_SIZE, auto_accept=False):
+        self.send = send
+        self.wakeup = wakeup
+        self.directory = directory
+        self.max_size = max_size
+        self.auto_accept = auto_accept
+        self.outgoing = {}
+        self.incoming = {}
+        # (보낸 사람, 전송ID) -> 수락을 기다리는 IncomingOffer
+        self.offers = {}
+        self._turn = 0
+
+    def start(self, peer, path):
+        """/send 명령: 파일 정보를 상대에게 알림"""
+        try:
+            size = os.path.getsize(path)
+            transfer = OutgoingTransfer(peer, path, size)
+        except OSError as e:
+            print(f'[SYSTEM] 파일을 열 수 없습니다: {e}')
+            return
+        if ' ' in transfer.name or not transfer.name:
+            # 이름은 프레임의 마지막 필드지만, 받는 쪽 파일 이름으로 쓰기 쉽게 공백은 바꿈
+            transfer.name = transfer.name.replace(' ', '_') or 'file'
+        self.outgoing[transfer.id] = transfer
+        self.offer(transfer)
+        print(f"[SYSTEM] '{peer}'님에게 {transfer.name}({size}바이트) 전송을 요청했습니다.")
+
+    def offer(self, transfer):
+        transfer.accepted = False
+        self.send(file_frame('offer', transfer.peer, transfer.id, transfer.size, transfer.digest, transfer.name))
+
+    def resume_all(self):
+        """다시 접속한 뒤 진행 중이던 전송을 다시 요청 (받는 쪽이 받은 위치부터 이어 감)"""
+        for transfer in self.outgoing.values():
+            self.offer(transfer)
+
+    def next_chunk(self):
+        """보낼 수 있는 전송들을 돌아가며 조각 하나를 만듦 (없으면 None)"""
+        transfers = list(self.outgoing.values())
+        now = time.monotonic()
+        for i in range(len(transfers)):
+            transfer = transfers[(self._turn + i) % len(transfers)]
+            if transfer.can_send(now):
+                self._turn = (self._turn + i + 1) % len(transfers)
+                return transfer.next_chunk()
+        return None
+
+    def check_stalled(self, now=None):
+        """쉬는 시간이 끝난 전송을 깨우고, 응답이 끊긴 전송은 마지막 ack 위치부터 다시 보냄"""
+        now = time.monotonic() if now is None else now
+        for transfer in self.outgoing.values():
+            if transfer.resume_at and now >= transfer.resume_at:
+                transfer.resume_at = 0.0
+                transfer.last_progress = now
+                self.wakeup()
+            elif transfer.accepted and transfer.acked < transfer.sent and now - transfer.last_progress > STALL_TIMEOUT:
+                transfer.sent = transfer.acked
+                transfer.last_progress = now
+                self.wakeup()
+
+    def handle(self, message):
+        """'/file ...' 프레임을 처리"""
+        parts = message.split(' ', 4)
+        if len(parts) < 4:
+            return
+        op, peer, transfer_id = parts[1], parts[2], parts[3]
+        rest = parts[4] if len(parts) > 4 else ''
+        try:
+            if op in ('offer', 'chunk'):
+                self._handle_incoming(op, peer, transfer_id, rest)
+            else:
+                self._handle_outgoing(op, peer, transfer_id, rest)
+        except (ValueError, OSError) as e:
+            print(f'[SYSTEM] 파일 전송 오류 ({peer}, {transfer_id}): {e}')
+
+    def _handle_incoming(self, op, peer, transfer_id, rest):
+        key = (peer, transfer_id)
+        if op == 'offer':
+            size_text, _, rest = rest.partition(' ')
+            digest, _, name = rest.partition(' ')
+            size = int(size_text)
+            if size < 0 or not DIGEST_PATTERN.fullmatch(digest):
+                raise ValueError('잘못된 전송 제안입니다.')
+            if size > self.max_size:
+                self.send(file_frame('reject', peer, transfer_id, f'파일이 너무 큽니다 (최대 {self.max_size}바이트)'))
+                print(f"[SYSTEM] '{peer}'님이 보낸 {size}바이트 파일을 크기 제한으로 거절했습니다.")
+                return
+            # 경로가 섞인 이름으로 다른 폴더에 쓰지 않도록 파일 이름만 사용
+            name = os.path.basename(name.replace('\\', '/')) or 'file'
+            offer = IncomingOffer(peer, transfer_id, size, digest, name, self.directory)
+            # 이미 받기로 했던 파일(받다 만 .part가 있음)이면 다시 묻지 않고 이어 받음
+            if self.auto_accept or os.path.exists(offer.part_path):
+                self._accept(offer)
+            else:
+                self.offers[key] = offer
+                print(f"[SYSTEM] '{peer}'님이 {name}({size}바이트)을 보내려고 합니다. "
+                      f"/accept {peer} 또는 /reject {peer}")
+            return
+
+        transfer = self.incoming.get(key)
+        if transfer is None:
+            return
+        offset_text, _, encoded = rest.partition(' ')
+        offset = int(offset_text)
+        if offset != transfer.offset:
+            if offset > transfer.offset and not transfer.requested:
+                # 앞 조각이 빠짐: 기다리던 위치부터 다시 보내 달라고 요청
+                transfer.requested = True
+                self.send(file_frame('accept', peer, transfer_id, transfer.offset))
+            return
+        data = base64.b64decode(encoded)
+        if transfer.offset + len(data) > transfer.size:
+            raise ValueError('알린 크기보다 많은 데이터를 받았습니다.')
+        transfer.file.write(data)
+        transfer.offset += len(data)
+        transfer.requested = False
+        self.send(file_frame('ack', peer, transfer_id, transfer.offset))
+        if transfer.offset >= transfer.size:
+            self._complete(key, transfer)
+
+    def _accept(self, offer):
+        """제안을 받아 .part 파일을 열고 보낸 쪽에 받을 위치를 알림"""
+        key = (offer.peer, offer.id)
+        os.makedirs(self.directory, exist_ok=True)
+        for other_key, other in list(self.incoming.items()):
+            if other_key == key or other.part_path == offer.part_path:
+                # 같은 전송을 다시 요청받았거나 같은 파일을 새로 받음: 쓴 데이터를 저장하고 이어 받음
+                del self.incoming[other_key]
+                other.close()
+        transfer = IncomingTransfer(offer)
+        if transfer.offset:
+            print(f"[SYSTEM] '{offer.peer}'님의 {offer.name}을 {transfer.offset}바이트부터 이어 받습니다.")
+        else:
+            print(f"[SYSTEM] '{offer.peer}'님이 보내는 {offer.name}({offer.size}바이트)을 받습니다.")
+        self.incoming[key] = transfer
+        self.send(file_frame('accept', offer.peer, offer.id, transfer.offset))
+        if transfer.offset >= transfer.size:
+            self._complete(key, transfer)
+
+    def answer(self, peer, accept):
+        """/accept, /reject 명령: peer가 보낸 제안을 모두 받거나 거절"""
+        keys = [key for key in self.offers if key[0] == peer]
+        if not keys:
+            print(f"[SYSTEM] '{peer}'님이 보낸 파일 전송 요청이 없습니다.")
+            return
+        for key in keys:
+            offer = self.offers.pop(key)
+            try:
+                if accept:
+                    self._accept(offer)
+                else:
+                    self.send(file_frame('reject', offer.peer, offer.id, '상대가 거절했습니다'))
+                    print(f"[SYSTEM] '{peer}'님의 {offer.name} 전송을 거절했습니다.")
+            except (ValueError, OSError) as e:
+                print(f'[SYSTEM] 파일 전송 오류 ({peer}, {offer.id}): {e}')
+
+    def _complete(self, key, transfer):
+        del self.incoming[key]
+        try:
+            path = transfer.finish()
+        except ValueError as e:
+            self.send(file_frame('error', transfer.peer, transfer.id, '받은 파일이 원본과 다릅니다'))
+            print(f"[SYSTEM] '{transfer.peer}'님이 보낸 {transfer.name}을 저장하지 못했습니다: {e}")
+            return
+        self.send(file_frame('done', transfer.peer, transfer.id))
+        print(f"[SYSTEM] '{transfer.peer}'님이 보낸 파일을 {path}에 저장했습니다.")
+
+    def _handle_outgoing(self, op, peer, transfer_id, rest):
+        transfer = self.outgoing.get(transfer_id)
+        if transfer is None or transfer.peer != peer:
+            return
+        if op == 'accept':
+            # 처음 수락이거나, 받는 쪽이 이 위치부터 다시 보내 달라고 요청
+            transfer.accepted = True
+            transfer.sent = transfer.acked = int(rest.split(' ', 1)[0])
+            transfer.last_progress = time.monotonic()
+            self.wakeup()
+        elif op == 'busy':
+            transfer.sent = min(transfer.sent, int(rest.split(' ', 1)[0]))
+            transfer.resume_at = time.monotonic() + BUSY_PAUSE
+        elif op == 'ack':
+            transfer.acked = max(transfer.acked, int(rest.split(' ', 1)[0]))
+            transfer.last_progress = time.monotonic()
+            self.wakeup()
+        elif op == 'done':
+            del self.outgoing[transfer_id]
+            transfer.close()
+            print(f"[SYSTEM] '{peer}'님에게 {transfer.name} 전송을 마쳤습니다.")
+        elif op in ('reject', 'cancel', 'error'):
+            del self.outgoing[transfer_id]
+            transfer.close()
+            reason = f' ({rest})' if rest else ''
+            print(f"[SYSTEM] '{peer}'님에게 {transfer.name}을 보내지 못했습니다.{reason}")
+
+    def close(self):
+        for transfer in itertools.chain(self.outgoing.values(), self.incoming.values()):
+            transfer.close()
+
+
+limit = TokenBucketLimit(0, 0, settings['byte_rate'], settings['byte_burst'])
+
+
+def configure(byte_rate=None, byte_burst=None):
+    """서버의 연결별 파일 전송량 제한을 바꿈 (연결을 받기 전에 호출)"""
+    global limit
+    if byte_rate is not None:
+        settings['byte_rate'] = byte_rate
+    if byte_burst is not None:
+        settings['byte_burst'] = byte_burst
+    limit = TokenBucketLimit(0, 0, settings['byte_rate'], settings['byte_burst'])
@@ -0,0 +1,128 @@
+"""하트비트와 유휴 연결 정리
+
+상대가 아무 말 없이 사라지면(전원 차단, 네트워크 단절 등) TCP 연결은 send가 실패할
+때까지 살아 있는 것처럼 보인다. 연결마다 마지막으로 프레임을 받은 시각을 기록해 두고,
+interval초 동안 조용하면 PING을 보낸 뒤 timeout초 안에 아무 프레임(PONG 포함)도 오지
+않으면 연결을 끊는다. 연결이 끊기면 수신 쪽에서 평소처럼 퇴장 처리를 한다.
+
+확인 시점은 TimerWheel로 관리하므로 tick마다 만료된 연결만 확인한다. 프레임을 받을 때는
+시각만 기록하고, 타이머가 만료되었을 때 남은 시간만큼 다시 예약한다.
+"""
+
+import asyncio
+import threading
+import time
+
+from chat_protocol import PING, encode_frame
+from timer_wheel import TimerWheel
+
+PING_FRAME = encode_frame(PING)
+
+# 서버 시작 시 configure로 변경 (interval이 0이면 사용하지 않음)
+settings = {
+    'interval': 30.0,
+    'timeout': 10.0,
+    'tick': 1.0,
+}
+
+
+def touch(conn):
+    """conn에서 프레임을 받았음을 기록"""
+    conn.last_seen = time.monotonic()
+
+
+class HeartbeatMonitor:
+    """연결들의 유휴 시간을 감시하고 응답 없는 연결을 끊음"""
+
+    def __init__(self, interval=30.0, timeout=10.0, tick=1.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.tick = tick
+        self.reaped = 0
+        self._wheel = TimerWheel(tick, start=time.monotonic())
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._wheel)
+
+    def watch(self, conn):
+        now = time.monotonic()
+        conn.last_seen = now
+        conn.ping_sent = None
+        if self.interval > 0:
+            with self._lock:
+                self._wheel.schedule(conn, now + self.interval)
+
+    def unwatch(self, conn):
+        with self._lock:
+            self._wheel.cancel(conn)
+
+    def check(self, now=None):
+        """만료된 타이머만 꺼내 PING을 보내거나 연결을 끊음"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = self._wheel.advance(now)
+        for conn in expired:
+            self._check_one(conn, now)
+
+    def _check_one(self, conn, now):
+        if conn.ping_sent is not None and conn.last_seen >= conn.ping_sent:
+            # PING 이후에 프레임을 받았음
+            conn.ping_sent = None
+
+        if conn.ping_sent is None:
+            if now - conn.last_seen < self.interval:
+                when = conn.last_seen + self.interval
+            else:
+                conn.ping_sent = now
+                when = now + self.timeout
+                try:
+                    conn.enqueue(PING_FRAME)
+                except Exception as e:
+                    print(f'하트비트 전송 오류: {e}')
+            with self._lock:
+                self._wheel.schedule(conn, when)
+            return
+
+        if now - conn.ping_sent < self.timeout:
+            with self._lock:
+                self._wheel.schedule(conn, conn.ping_sent + self.timeout)
+            return
+
+        self.reaped += 1
+        print(f'{conn.addr}에서 {self.interval + self.timeout:.0f}초 동안 응답이 없어 연결을 끊습니다.')
+        conn.abort()
+
+    def run_in_thread(self):
+        """스레드 엔진용: tick마다 확인하는 데몬 스레드를 시작"""
+        def loop():
+            while True:
+                time.sleep(self.tick)
+                self.check()
+
+        if self.interval > 0:
+            thread = threading.Thread(target=loop, daemon=True)
+            thread.start()
+
+    async def run_async(self):
+        """asyncio 엔진용: tick마다 확인하는 코루틴"""
+        if self.interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.tick)
+            self.check()
+
+
+monitor = HeartbeatMonitor(settings['interval'], settings['timeout'], settings['tick'])
+
+
+def configure(interval=None, timeout=None, tick=None):
+    """설정을 바꾸고 감시자를 다시 만듦 (연결을 받기 전에 호출)"""
+    global monitor
+    if interval is not None:
+        settings['interval'] = interval
+    if timeout is not None:
+        settings['timeout'] = timeout
+    if tick is not None:
+        settings['tick'] = tick
+    monitor = HeartbeatMonitor(settings['interval'], settings['timeout'], settings['tick'])
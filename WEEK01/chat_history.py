@@ -0,0 +1,306 @@
+"""방별 대화 기록 저장소
+
+방마다 최근 메시지 ring_size개를 메모리(링 버퍼)에 두고, directory가 주어지면
+디스크에도 추가 전용(append-only) 로그로 남긴다.
+
+디스크 구조 (방 하나당 'r-방이름' 폴더 하나):
+- 00000000000000000000.log: 세그먼트 파일. 파일 이름은 첫 메시지의 번호이고,
+  메시지를 전송할 때와 같은 프레임([varint 길이][본문])을 그대로 이어 붙인다.
+- 00000000000000000000.idx: 세그먼트 안에서 각 메시지가 시작하는 위치(4바이트 정수)
+
+세그먼트가 segment_size를 넘으면 새 세그먼트를 만들고, max_segments개를 넘는
+오래된 세그먼트는 지운다. 프레임을 그대로 저장하므로 연속된 메시지 N개는
+mmap 한 조각을 잘라 클라이언트 송신 대기열에 바로 넣을 수 있다.
+"""
+
+import array
+import bisect
+import collections
+import itertools
+import mmap
+import os
+import struct
+import threading
+from urllib.parse import quote
+
+from chat_protocol import FrameDecoder, ProtocolError, decode_varint, encode_frame
+
+_OFFSET = struct.Struct('<I')
+
+# /history 명령에서 개수를 생략했을 때와 최대로 요청할 수 있는 개수
+DEFAULT_REQUEST = 50
+MAX_REQUEST = 5000
+
+# 서버 시작 시 configure로 변경
+settings = {
+    'directory': None,
+    'ring_size': 1000,
+    'segment_size': 16 * 1024 * 1024,
+    'max_segments': 16,
+    # 방에 들어갈 때 보여 줄 최근 메시지 수
+    'replay': 20,
+    # 동시에 열어 두는 방 기록 수 (넘으면 가장 오래 쓰지 않은 방을 닫음)
+    'max_open_rooms': 256,
+}
+
+
+class RoomHistory:
+    """방 하나의 대화 기록 (링 버퍼 + 세그먼트 로그)"""
+
+    def __init__(self, directory=None, ring_size=1000,
+                 segment_size=16 * 1024 * 1024, max_segments=16):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.ring = collections.deque(maxlen=ring_size)
+        # 다음에 기록할 메시지 번호
+        self.next_seq = 0
+        # 세그먼트 첫 메시지 번호 목록 (오름차순)
+        self._segments = []
+        # 세그먼트 첫 메시지 번호 -> 메시지 시작 위치 목록
+        self._indexes = {}
+        # 닫힌 세그먼트의 mmap
+        self._maps = {}
+        self._log = None
+        self._idx = None
+        self._log_size = 0
+        # HistoryStore가 내보낸(닫은) 기록은 다시 쓰지 않음
+        self.closed = False
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _path(self, base, ext):
+        return os.path.join(self.directory, f'{base:020d}.{ext}')
+
+    def _load(self):
+        """디스크의 세그먼트와 색인을 읽어 이어서 기록할 수 있게 준비"""
+        bases = sorted(int(name[:-4]) for name in os.listdir(self.directory)
+                       if name.endswith('.log') and name[:-4].isdigit())
+        for base in bases:
+            with open(self._path(base, 'idx'), 'a+b') as f:
+                f.seek(0)
+                data = f.read()
+            usable = len(data) - len(data) % _OFFSET.size
+            offsets = array.array('I', (value for (value,) in _OFFSET.iter_unpack(data[:usable])))
+            self._segments.append(base)
+            self._indexes[base] = offsets
+
+        if not self._segments:
+            return
+        last = self._segments[-1]
+        self._log_size = self._repair(last)
+        self.next_seq = last + len(self._indexes[last])
+        self._open_active(last)
+
+        # 링 버퍼를 디스크의 마지막 메시지들로 채움
+        _, buffers = self._read_disk(max(self.next_seq - self.ring.maxlen, self._segments[0]))
+        decoder = FrameDecoder()
+        for data in buffers:
+            for payload in decoder.feed_bytes(data):
+                self.ring.append(encode_frame(payload))
+
+    def _repair(self, base):
+        """비정상 종료로 잘린 마지막 기록을 정리하고 유효한 데이터 길이를 반환"""
+        path = self._path(base, 'log')
+        offsets = self._indexes[base]
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            # 색인에는 있지만 데이터가 끝까지 쓰이지 않은 기록은 버림
+            while offsets:
+                f.seek(offsets[-1])
+                head = f.read(5)
+                try:
+                    length, header = decode_varint(head)
+                except ProtocolError:
+                    length, header = None, 0
+                end = offsets[-1] + header + (length or 0)
+                if length is not None and end <= size:
+                    break
+                offsets.pop()
+        valid = end if offsets else 0
+        if valid < size:
+            os.truncate(path, valid)
+        with open(self._path(base, 'idx'), 'r+b') as f:
+            f.truncate(len(offsets) * _OFFSET.size)
+        return valid
+
+    def _open_active(self, base):
+        self._log = open(self._path(base, 'log'), 'a+b')
+        self._idx = open(self._path(base, 'idx'), 'ab')
+
+    def _roll(self):
+        """새 세그먼트를 시작하고 오래된 세그먼트를 정리"""
+        if self._log is not None:
+            self._log.close()
+            self._idx.close()
+        base = self.next_seq
+        self._segments.append(base)
+        self._indexes[base] = array.array('I')
+        self._log_size = 0
+        self._open_active(base)
+
+        while len(self._segments) > self.max_segments:
+            old = self._segments.pop(0)
+            del self._indexes[old]
+            old_map = self._maps.pop(old, None)
+            if old_map is not None:
+                old_map.close()
+            for ext in ('log', 'idx'):
+                try:
+                    os.remove(self._path(old, ext))
+                except OSError:
+                    pass
+
+    def append(self, frame):
+        """인코딩된 프레임 하나를 기록. 이미 닫힌 기록이면 False를 반환"""
+        with self._lock:
+            if self.closed:
+                return False
+            self.ring.append(frame)
+            if self.directory:
+                if self._log is None or (self._log_size and self._log_size + len(frame) > self.segment_size):
+                    self._roll()
+                self._log.write(frame)
+                self._log.flush()
+                # 데이터를 먼저 쓰고 색인을 기록해야 색인이 없는 데이터를 가리키지 않음
+                self._idx.write(_OFFSET.pack(self._log_size))
+                self._idx.flush()
+                self._indexes[self._segments[-1]].append(self._log_size)
+                self._log_size += len(frame)
+            self.next_seq += 1
+            return True
+
+    def read_last(self, count):
+        """최근 메시지 count개를 (실제 개수, 프레임이 이어 붙은 버퍼 목록)으로 반환. 이미 닫힌 기록이면 None"""
+        with self._lock:
+            if self.closed:
+                return None
+            first = self._segments[0] if self._segments else self.next_seq - len(self.ring)
+            count = max(0, min(count, self.next_seq - first))
+            if count <= len(self.ring):
+                # 메모리에서 바로 처리
+                if count == 0:
+                    return 0, []
+                start = len(self.ring) - count
+                return count, [b''.join(itertools.islice(self.ring, start, None))]
+            return self._read_disk(self.next_seq - count)
+
+    def _read_disk(self, start):
+        """start번 메시지부터 끝까지를 세그먼트마다 mmap 한 조각씩 잘라 반환"""
+        buffers = []
+        first = bisect.bisect_right(self._segments, start) - 1
+        for base in self._segments[max(first, 0):]:
+            offsets = self._indexes[base]
+            if not offsets:
+                continue
+            begin = offsets[start - base] if start > base else 0
+            if base == self._segments[-1]:
+                end = self._log_size
+                with mmap.mmap(self._log.fileno(), end, access=mmap.ACCESS_READ) as mapped:
+                    buffers.append(mapped[begin:end])
+            else:
+                mapped = self._maps.get(base)
+                if mapped is None:
+                    with open(self._path(base, 'log'), 'rb') as f:
+                        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps[base] = mapped
+                buffers.append(mapped[begin:])
+        return self.next_seq - start, buffers
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            if self._log is not None:
+                self._log.close()
+                self._idx.close()
+                self._log = None
+                self._idx = None
+
+
+class HistoryStore:
+    """방 이름별 RoomHistory를 필요할 때 만들어 관리
+
+    여러 워커로 실행하면 다른 워커에만 있는 방의 메시지도 기록하므로, 사라진 방을 알 수 없는
+    경우를 위해 열어 두는 방 수를 max_open_rooms개로 제한한다. 닫힌 방은 다시 쓸 때
+    디스크에서 읽어 오고, directory가 없으면 그 방의 기록은 사라진다.
+
+    room()으로 받은 RoomHistory는 다른 스레드가 그 사이에 내보내 닫을 수 있으므로,
+    append와 read_last는 닫힌 기록을 만나면 room()으로 새 기록을 받아 다시 시도한다.
+    닫기는 _lock을 잡은 채로 하므로, 같은 폴더의 새 RoomHistory는 이전 기록이 파일을
+    모두 닫은 뒤에야 만들어진다.
+    """
+
+    def __init__(self, directory=None, ring_size=1000,
+                 segment_size=16 * 1024 * 1024, max_segments=16, max_open_rooms=256):
+        self.directory = directory
+        self.ring_size = ring_size
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.max_open_rooms = max_open_rooms
+        # 최근에 쓴 방이 뒤쪽
+        self._rooms = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def room(self, room_name):
+        with self._lock:
+            history = self._rooms.get(room_name)
+            if history is not None:
+                self._rooms.move_to_end(room_name)
+            else:
+                directory = None
+                if self.directory:
+                    # 한글이나 특수 문자가 들어간 방 이름도 폴더 이름으로 쓸 수 있게 변환
+                    # ('.'과 '..'은 quote로 바뀌지 않으므로 앞에 r-을 붙여 상위 폴더를 가리키지 않게 함)
+                    directory = os.path.join(self.directory, 'r-' + quote(room_name, safe=''))
+                history = RoomHistory(directory, self.ring_size, self.segment_size, self.max_segments)
+                self._rooms[room_name] = history
+                while len(self._rooms) > self.max_open_rooms:
+                    _, oldest = self._rooms.popitem(last=False)
+                    oldest.close()
+            return history
+
+    def forget(self, room_name):
+        """빈 방이 사라질 때 메모리의 기록과 열린 파일을 정리 (디스크 기록은 남아 다시 만들면 읽어 옴)"""
+        with self._lock:
+            history = self._rooms.pop(room_name, None)
+            if history is not None:
+                history.close()
+
+    def append(self, room_name, frame):
+        if self.ring_size:
+            while not self.room(room_name).append(frame):
+                pass
+
+    def read_last(self, room_name, count):
+        if not self.ring_size:
+            return 0, []
+        while True:
+            result = self.room(room_name).read_last(count)
+            if result is not None:
+                return result
+
+    def close(self):
+        with self._lock:
+            for history in self._rooms.values():
+                history.close()
+            self._rooms.clear()
+
+
+store = HistoryStore(ring_size=settings['ring_size'])
+
+
+def configure(**changes):
+    """설정을 바꾸고 새 설정으로 저장소를 다시 만듦"""
+    global store
+    unknown = set(changes) - set(settings)
+    if unknown:
+        raise ValueError(f'알 수 없는 설정입니다: {", ".join(sorted(unknown))}')
+    settings.update(changes)
+    store.close()
+    store = HistoryStore(settings['directory'], settings['ring_size'],
+                         settings['segment_size'], settings['max_segments'], settings['max_open_rooms'])
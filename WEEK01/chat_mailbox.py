@@ -0,0 +1,193 @@
+"""접속하지 않은 사용자에게 보낸 귓속말 보관함
+
+상대가 접속해 있지 않으면 귓속말을 받는 사람별 파일에 보관했다가, 그 닉네임으로
+다음에 접속할 때 한 번에 전달한다. 한 번이라도 접속한 적이 있는 닉네임에게만 보관하므로,
+닉네임을 잘못 쓰면 보관하지 않고 찾을 수 없다고 알린다.
+
+디스크 구조 (받는 사람 한 명당 파일 하나, 'm-닉네임.q'):
+- [보관 시각 8바이트 float][프레임 길이 4바이트][프레임] 기록을 이어 붙인다.
+- 프레임은 전달할 때 그대로 송신 대기열에 넣을 수 있도록 인코딩된 상태로 저장한다.
+- 보관은 파일 끝에 기록 하나를 쓰는 것뿐이라 보관된 양과 관계없이 O(1)이다.
+  파일은 기록할 때마다 열고 닫으므로 받는 사람이 많아도 열린 파일이 늘지 않는다.
+- 접속한 적이 있는 닉네임은 'known' 파일에 한 줄씩 덧붙여 기록한다.
+- 여러 워커로 실행하면 워커들이 같은 폴더를 쓴다. 크기 제한은 워커마다 따로 센다.
+  다른 워커에서 처음 접속한 닉네임은 모르는 닉네임에게 보낼 때 known 파일을 다시 읽어 확인한다.
+
+메모리에는 받는 사람별로 (개수, 바이트 수, 가장 오래된 보관 시각)만 두고, 보관할 때
+max_messages/max_bytes를 넘으면 거절한다. 보관함 수도 max_mailboxes개로 제한한다.
+ttl초가 지난 기록은 전달하지 않고 버리며, 가득 찬 보관함에 만료된 기록이 있으면
+만료된 기록을 뺀 나머지로 파일을 다시 써서 자리를 만든다.
+"""
+
+import os
+import struct
+import threading
+import time
+from urllib.parse import quote, unquote
+
+_RECORD = struct.Struct('<dI')
+_PREFIX = 'm-'
+_SUFFIX = '.q'
+_KNOWN = 'known'
+
+# 보관 결과
+STORED = 0
+FULL = 1
+DISABLED = 2
+UNKNOWN = 3
+
+# 서버 시작 시 configure로 변경 (directory가 None이면 보관하지 않음, configure 전에는 보관하지 않음)
+settings = {
+    'directory': 'mailbox',
+    'max_messages': 100,
+    'max_bytes': 64 * 1024,
+    'max_mailboxes': 10000,
+    'ttl': 7 * 24 * 3600,
+}
+
+
+class MailboxStore:
+    """받는 사람별 귓속말 보관 파일과 크기 정보"""
+
+    def __init__(self, directory=None, max_messages=100, max_bytes=64 * 1024,
+                 max_mailboxes=10000, ttl=7 * 24 * 3600):
+        self.directory = directory
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_mailboxes = max_mailboxes
+        self.ttl = ttl
+        # 닉네임 -> [개수, 바이트 수, 가장 오래된 보관 시각]
+        self._sizes = {}
+        # 접속한 적이 있는 닉네임
+        self._known = set()
+        self._lock = threading.Lock()
+        if directory and os.path.isdir(directory):
+            self._load()
+
+    def _path(self, nickname):
+        # 한글이나 '/'가 들어간 닉네임도 파일 이름으로 쓸 수 있게 변환
+        return os.path.join(self.directory, _PREFIX + quote(nickname, safe='') + _SUFFIX)
+
+    def _load(self):
+        """서버를 다시 시작했을 때 디스크에 남은 보관함의 크기 정보와 접속한 적이 있는 닉네임을 읽음"""
+        self._read_known()
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not (name.startswith(_PREFIX) and name.endswith(_SUFFIX)):
+                continue
+            nickname = unquote(name[len(_PREFIX):-len(_SUFFIX)])
+            records = self._read(self._path(nickname), now)
+            self._rewrite(nickname, records)
+
+    def _read_known(self):
+        try:
+            with open(os.path.join(self.directory, _KNOWN), encoding='utf-8') as f:
+                self._known.update(unquote(line.rstrip('\n')) for line in f if line.strip())
+        except FileNotFoundError:
+            pass
+
+    def remember(self, nickname):
+        """접속한 닉네임을 기록 (이후 이 닉네임에게 보낸 귓속말을 보관)"""
+        if not self.directory or nickname in self._known:
+            return
+        with self._lock:
+            if nickname in self._known:
+                return
+            self._known.add(nickname)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, _KNOWN), 'a', encoding='utf-8') as f:
+                f.write(quote(nickname, safe='') + '\n')
+
+    def _read(self, path, now):
+        """파일의 기록 중 만료되지 않은 (보관 시각, 프레임) 목록 (잘린 마지막 기록은 버림)"""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        records = []
+        pos = 0
+        while pos + _RECORD.size <= len(data):
+            stamp, length = _RECORD.unpack_from(data, pos)
+            start = pos + _RECORD.size
+            if start + length > len(data):
+                break
+            if now - stamp <= self.ttl:
+                records.append((stamp, data[start:start + length]))
+            pos = start + length
+        return records
+
+    def _rewrite(self, nickname, records):
+        """남길 기록만으로 파일을 다시 쓰고 크기 정보를 갱신 (잠금을 잡은 상태에서 호출)"""
+        path = self._path(nickname)
+        if not records:
+            self._sizes.pop(nickname, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return
+        temp = path + '.tmp'
+        with open(temp, 'wb') as f:
+            for stamp, frame in records:
+                f.write(_RECORD.pack(stamp, len(frame)))
+                f.write(frame)
+        os.replace(temp, path)
+        self._sizes[nickname] = [len(records), sum(len(frame) for _, frame in records), records[0][0]]
+
+    def store(self, nickname, frame):
+        """프레임 하나를 보관하고 STORED, FULL, DISABLED, UNKNOWN 중 하나를 반환"""
+        if not self.directory:
+            return DISABLED
+        now = time.time()
+        with self._lock:
+            if nickname not in self._known:
+                # 다른 워커에서 접속한 닉네임일 수 있으므로 파일을 다시 확인
+                self._read_known()
+                if nickname not in self._known:
+                    return UNKNOWN
+            size = self._sizes.get(nickname)
+            if size is None:
+                if len(self._sizes) >= self.max_mailboxes:
+                    return FULL
+                os.makedirs(self.directory, exist_ok=True)
+                size = self._sizes[nickname] = [0, 0, now]
+            elif (size[0] >= self.max_messages or size[1] + len(frame) > self.max_bytes) \
+                    and now - size[2] > self.ttl:
+                # 만료된 기록이 자리를 차지하고 있으면 정리한 뒤 다시 확인
+                self._rewrite(nickname, self._read(self._path(nickname), now))
+                size = self._sizes.setdefault(nickname, [0, 0, now])
+            if size[0] >= self.max_messages or size[1] + len(frame) > self.max_bytes:
+                return FULL
+            with open(self._path(nickname), 'ab') as f:
+                f.write(_RECORD.pack(now, len(frame)) + frame)
+            if not size[0]:
+                size[2] = now
+            size[0] += 1
+            size[1] += len(frame)
+            return STORED
+
+    def take(self, nickname):
+        """보관된 프레임을 모두 꺼내 (개수, 이어 붙인 버퍼)로 반환하고 보관함을 비움"""
+        if not self.directory:
+            return 0, b''
+        with self._lock:
+            # 여러 워커로 실행하면 다른 워커가 보관했을 수 있으므로 메모리의 크기 정보 대신 파일을 확인
+            records = self._read(self._path(nickname), time.time())
+            self._rewrite(nickname, [])
+        return len(records), b''.join(frame for _, frame in records)
+
+
+# import만 해도 폴더를 읽고 파일을 다시 쓰지 않도록, configure 전에는 보관하지 않는 저장소를 둠
+store = MailboxStore()
+
+
+def configure(**changes):
+    """설정을 바꾸고 새 설정으로 보관함을 다시 만듦 (연결을 받기 전에 호출)"""
+    global store
+    unknown = set(changes) - set(settings)
+    if unknown:
+        raise ValueError(f'알 수 없는 설정입니다: {", ".join(sorted(unknown))}')
+    settings.update(changes)
+    store = MailboxStore(settings['directory'], settings['max_messages'], settings['max_bytes'],
+                         settings['max_mailboxes'], settings['ttl'])
@@ -0,0 +1,277 @@
+"""채팅 서버 실행 중 지표 수집
+
+- 연결마다 송수신 메시지 수와 바이트 수를 직접 센다. 각 값은 그 연결의 수신 쪽이나
+  송신 쪽 한 곳에서만 바꾸므로 잠금이 필요 없고, 1초마다 전체를 합쳐 표본으로 남긴다.
+  초당 처리량은 최근 window개 표본의 차이로 계산한다.
+- clients_lock은 TimedLock으로 감싸 잠금을 기다린 시간과 잡고 있던 시간을 잰다.
+- 브로드캐스트 지연(메시지 하나를 인코딩해 방 안의 모든 송신 대기열에 넣는 데 걸린
+  시간)은 2의 거듭제곱 마이크로초 구간 히스토그램으로 모은다.
+
+확인 방법:
+- 채팅 중 /stats: 접속 수와 초당 처리량 요약
+- --admin-port를 주면 해당 포트(기본 127.0.0.1)로 전체 지표를 JSON으로 응답
+  (예: curl http://127.0.0.1:9998/)
+"""
+
+import collections
+import json
+import socket
+import threading
+import time
+
+# 서버 시작 시 configure로 변경 (admin_port가 None이면 관리 포트를 열지 않음)
+settings = {
+    'admin_host': '127.0.0.1',
+    'admin_port': None,
+    # 초당 처리량을 계산할 구간(초)
+    'window': 10,
+}
+
+# 연결마다 세는 값
+COUNTERS = ('messages_in', 'bytes_in', 'messages_out', 'bytes_out')
+
+
+class Histogram:
+    """2의 거듭제곱 마이크로초 구간별 개수 (기록 한 번이 O(1))"""
+
+    BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = int(seconds * 1_000_000)
+        # i번 구간에는 [2^(i-1), 2^i) 마이크로초가 들어감
+        self.counts[min(micros.bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """pct 백분위수가 들어 있는 구간의 상한(마이크로초)"""
+        if not self.count:
+            return 0
+        rank = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return 2 ** i
+        return 2 ** (self.BUCKETS - 1)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'avg_us': round(self.total / self.count * 1_000_000, 1) if self.count else 0,
+            'p50_us': self.percentile(50),
+            'p99_us': self.percentile(99),
+            'max_us': round(self.max * 1_000_000, 1),
+            'buckets': {f'<{2 ** i}us': n for i, n in enumerate(self.counts) if n},
+        }
+
+
+class TimedLock:
+    """RLock처럼 쓰면서 기다린 시간과 잡고 있던 시간을 재는 잠금
+
+    재진입한 경우에는 가장 바깥쪽 획득부터 해제까지를 한 번으로 센다.
+    통계 값은 잠금을 잡은 상태에서만 바꾸므로 따로 보호할 필요가 없다.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._since = 0.0
+        self.acquired = 0
+        self.waited = 0.0
+        self.held = 0.0
+        self.hold_times = Histogram()
+
+    def __enter__(self):
+        start = time.perf_counter()
+        self._lock.acquire()
+        if self._depth == 0:
+            self._since = time.perf_counter()
+            self.waited += self._since - start
+            self.acquired += 1
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            held = time.perf_counter() - self._since
+            self.held += held
+            self.hold_times.record(held)
+        self._lock.release()
+
+
+class Metrics:
+    """연결별 값을 주기적으로 합쳐 초당 처리량을 계산"""
+
+    def __init__(self, window=10):
+        self.started = time.time()
+        self.fanout = Histogram()
+        # 살아 있는 연결과, 닫힌 연결들이 남긴 합계
+        self._live = set()
+        self._retired = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+        # (시각, 합계, 잠금 통계, 방별 메시지 수) 표본
+        self._samples = collections.deque(maxlen=window + 1)
+        self._collect = None
+        self._clients_lock = None
+        self._room_counts = None
+
+    def track(self, conn):
+        for name in COUNTERS:
+            setattr(conn, name, 0)
+        with self._lock:
+            self._live.add(conn)
+
+    def retire(self, conn):
+        with self._lock:
+            if conn in self._live:
+                self._live.discard(conn)
+                for name in COUNTERS:
+                    self._retired[name] += getattr(conn, name)
+
+    def connections(self):
+        return len(self._live)
+
+    def totals(self):
+        with self._lock:
+            live = list(self._live)
+            totals = dict(self._retired)
+        for conn in live:
+            for name in COUNTERS:
+                totals[name] += getattr(conn, name)
+        return totals
+
+    def sample(self):
+        lock = self._clients_lock
+        lock_state = (lock.acquired, lock.waited, lock.held) if lock is not None else (0, 0.0, 0.0)
+        rooms = self._room_counts() if self._room_counts is not None else {}
+        self._samples.append((time.monotonic(), self.totals(), lock_state, rooms))
+
+    def rates(self):
+        """최근 구간의 초당 처리량과 잠금 통계"""
+        if len(self._samples) < 2:
+            return dict.fromkeys(f'{name}_per_s' for name in COUNTERS), {}
+        (t0, first, lock0, _), (t1, last, lock1, _) = self._samples[0], self._samples[-1]
+        elapsed = t1 - t0
+        rates = {f'{name}_per_s': round((last[name] - first[name]) / elapsed, 1) for name in COUNTERS}
+        acquired = lock1[0] - lock0[0]
+        lock = {
+            'acquired_per_s': round(acquired / elapsed, 1),
+            'avg_wait_us': round((lock1[1] - lock0[1]) / acquired * 1_000_000, 1) if acquired else 0,
+            'avg_hold_us': round((lock1[2] - lock0[2]) / acquired * 1_000_000, 1) if acquired else 0,
+            # 구간 동안 잠금을 잡고 있던 시간의 비율
+            'held_ratio': round((lock1[2] - lock0[2]) / elapsed, 4),
+        }
+        return rates, lock
+
+    def hot_rooms(self, top=10):
+        """최근 구간에 메시지가 가장 많이 오간 방"""
+        if len(self._samples) < 2:
+            return []
+        (t0, _, _, first), (t1, _, _, last) = self._samples[0], self._samples[-1]
+        elapsed = t1 - t0
+        rates = [(round((count - first.get(name, 0)) / elapsed, 1), name) for name, count in last.items()]
+        rates.sort(reverse=True)
+        return [{'room': name, 'messages_per_s': rate} for rate, name in rates[:top] if rate > 0]
+
+    def summary(self):
+        """/stats 명령에 보여 줄 한 줄 요약"""
+        rates, _ = self.rates()
+        if rates['messages_in_per_s'] is None:
+            return f'접속 {self.connections()}명 (처리량은 잠시 후 확인할 수 있습니다.)'
+        return (f"접속 {self.connections()}명, 수신 {rates['messages_in_per_s']}건/s "
+                f"({rates['bytes_in_per_s'] / 1024:.1f}KB/s), 송신 {rates['messages_out_per_s']}건/s "
+                f"({rates['bytes_out_per_s'] / 1024:.1f}KB/s)")
+
+    def report(self):
+        """관리 포트로 보낼 전체 지표"""
+        rates, lock_rates = self.rates()
+        result = {
+            'uptime_s': round(time.time() - self.started, 1),
+            'connections': self.connections(),
+            'window_s': round(self._samples[-1][0] - self._samples[0][0], 1) if len(self._samples) > 1 else 0,
+            'rates': rates,
+            'totals': self.totals(),
+            'broadcast_latency': self.fanout.to_dict(),
+            'hot_rooms': self.hot_rooms(),
+        }
+        if self._clients_lock is not None:
+            result['clients_lock'] = dict(lock_rates, hold_time=self._clients_lock.hold_times.to_dict())
+        if self._collect is not None:
+            # 방, 송신 대기열 등 서버 상태
+            result.update(self._collect())
+        return result
+
+    def start(self, collect=None, clients_lock=None, room_counts=None):
+        """1초마다 표본을 남기는 스레드와 (설정되어 있으면) 관리 포트를 시작
+
+        collect(서버 상태 dict)와 room_counts(방 이름 -> 누적 메시지 수)는
+        엔진이 자기 모듈의 상태를 읽는 함수를 넘긴다.
+        """
+        self._collect = collect
+        self._clients_lock = clients_lock
+        self._room_counts = room_counts
+        self.sample()
+
+        def loop():
+            while True:
+                time.sleep(1.0)
+                self.sample()
+
+        threading.Thread(target=loop, daemon=True).start()
+        if settings['admin_port'] is not None:
+            threading.Thread(target=self._serve_admin,
+                             args=(settings['admin_host'], settings['admin_port']), daemon=True).start()
+
+    def _serve_admin(self, host, port):
+        """접속할 때마다 지표를 JSON으로 한 번 보내고 닫는 관리 포트 (HTTP 응답 형식)"""
+        admin_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        admin_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            admin_socket.bind((host, port))
+            admin_socket.listen(16)
+        except OSError as e:
+            print(f'관리 포트 시작 오류: {e}')
+            return
+        print(f'관리 포트 {port}에서 지표를 제공합니다.')
+        while True:
+            conn, _ = admin_socket.accept()
+            with conn:
+                try:
+                    conn.settimeout(1.0)
+                    try:
+                        # HTTP 요청이면 요청 줄을 읽고 버림
+                        conn.recv(4096)
+                    except socket.timeout:
+                        pass
+                    body = json.dumps(self.report(), ensure_ascii=False, indent=2).encode('utf-8')
+                    header = ('HTTP/1.0 200 OK\r\n'
+                              'Content-Type: application/json; charset=utf-8\r\n'
+                              f'Content-Length: {len(body)}\r\n\r\n').encode('ascii')
+                    conn.sendall(header + body)
+                except Exception as e:
+                    print(f'관리 포트 응답 오류: {e}')
+
+
+metrics = Metrics(settings['window'])
+
+
+def configure(admin_host=None, admin_port=None, window=None):
+    """설정을 바꾸고 지표를 새로 만듦 (연결을 받기 전에 호출)"""
+    global metrics
+    if admin_host is not None:
+        settings['admin_host'] = admin_host
+    if admin_port is not None:
+        settings['admin_port'] = admin_port
+    if window is not None:
+        settings['window'] = window
+    metrics = Metrics(settings['window'])
@@ -0,0 +1,328 @@
+"""클라이언트별 송신 대기열
+
+브로드캐스트가 느린 클라이언트의 send를 기다리지 않도록, 연결마다 크기가 정해진
+대기열을 두고 별도의 송신기(스레드 또는 코루틴)가 비운다.
+대기열이 가득 찼을 때의 처리 방식(느린 소비자 정책)은 다음 중 하나를 고른다.
+
+- drop-oldest: 가장 오래된 메시지를 버리고 새 메시지를 넣음
+- disconnect: 해당 클라이언트의 연결을 끊음
+- block: 자리가 날 때까지 block_timeout초 동안 기다린 뒤, 그래도 가득 차 있으면 연결을 끊음
+  (브로드캐스트는 clients_lock을 잡은 채 대기열에 넣으므로, 서버의 대기열은 생산자를
+  멈추지 않고 가득 찬 상태가 block_timeout초 넘게 이어질 때 연결을 끊는다.)
+
+송신기는 대기열에 쌓인 프레임을 한꺼번에 꺼내 sendmsg(스레드) 또는
+writelines(asyncio) 한 번으로 보낸다. 송신기가 보내는 동안 들어온 메시지는 다음
+시스템 콜에 함께 묶이고, coalesce_delay를 주면 그만큼 더 기다렸다가 꺼낸다.
+
+스레드 엔진은 연결마다 송신 스레드를 두지 않고 SocketWriter 스레드 하나가 selector로
+모든 연결의 대기열을 비운다. 수신 스레드가 블로킹 recv를 쓰므로 소켓은 블로킹 모드로 두고
+send에만 MSG_DONTWAIT를 준다. (MSG_DONTWAIT가 없는 윈도우에서는 send가 블로킹될 수 있음)
+"""
+
+import collections
+import heapq
+import itertools
+import os
+import selectors
+import socket
+import threading
+import time
+
+DROP_OLDEST = 'drop-oldest'
+DISCONNECT = 'disconnect'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, DISCONNECT, BLOCK)
+
+# 새로 만드는 대기열의 기본 설정 (서버 시작 시 configure로 변경)
+settings = {
+    'max_size': 1000,
+    'policy': DROP_OLDEST,
+    'block_timeout': 1.0,
+    'coalesce_delay': 0.0,
+}
+
+# sendmsg 한 번에 넘길 수 있는 버퍼 개수
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0)
+
+
+def configure(max_size=None, policy=None, block_timeout=None, coalesce_delay=None):
+    """이후에 만들어지는 대기열의 기본 설정을 변경"""
+    if max_size is not None:
+        if max_size < 1:
+            raise ValueError('대기열 크기는 1 이상이어야 합니다.')
+        settings['max_size'] = max_size
+    if policy is not None:
+        if policy not in POLICIES:
+            raise ValueError(f'알 수 없는 정책입니다: {policy}')
+        settings['policy'] = policy
+    if block_timeout is not None:
+        settings['block_timeout'] = block_timeout
+    if coalesce_delay is not None:
+        settings['coalesce_delay'] = coalesce_delay
+
+
+class OutboundQueue:
+    """인코딩된 프레임(bytes)을 담는 크기 제한 송신 대기열
+
+    can_block이 False이면(이벤트 루프 안에서 사용하는 경우) block 정책에서도
+    생산자를 멈추지 않는다. 대신 가득 찬 상태가 block_timeout초 넘게 이어지면
+    연결을 끊도록 알린다.
+    """
+
+    def __init__(self, max_size=None, policy=None, block_timeout=None,
+                 coalesce_delay=None, can_block=True, on_ready=None):
+        self.max_size = max_size or settings['max_size']
+        self.policy = policy or settings['policy']
+        self.block_timeout = settings['block_timeout'] if block_timeout is None else block_timeout
+        self.coalesce_delay = settings['coalesce_delay'] if coalesce_delay is None else coalesce_delay
+        self.can_block = can_block
+        self.on_ready = on_ready
+        self.closed = False
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._full_since = None
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, data):
+        """대기열에 data를 넣음. 연결을 끊어야 하면 False를 반환"""
+        with self._cond:
+            if self.closed:
+                return False
+            if len(self._items) >= self.max_size and not self._make_room():
+                return False
+            self._items.append(data)
+            self._cond.notify_all()
+        if self.on_ready is not None:
+            self.on_ready()
+        return True
+
+    def _make_room(self):
+        """가득 찬 대기열에서 정책에 따라 자리를 만듦 (_cond를 잡은 상태에서 호출)"""
+        if self.policy == DROP_OLDEST:
+            self._items.popleft()
+            self.dropped += 1
+            return True
+        if self.policy == DISCONNECT:
+            return False
+
+        # block 정책
+        if not self.can_block:
+            now = time.monotonic()
+            if self._full_since is None:
+                self._full_since = now
+            return now - self._full_since <= self.block_timeout
+
+        deadline = time.monotonic() + self.block_timeout
+        while len(self._items) >= self.max_size and not self.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return not self.closed
+
+    def pop_all(self):
+        """대기 중인 프레임을 모두 꺼냄 (없으면 빈 리스트)"""
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            self._full_since = None
+            self._cond.notify_all()
+        return items
+
+    def get_batch(self):
+        """프레임이 생길 때까지 기다렸다가 모두 꺼냄. 닫히고 비었으면 None"""
+        with self._cond:
+            while not self._items and not self.closed:
+                self._cond.wait()
+            if not self._items:
+                return None
+            gather = self.coalesce_delay > 0 and not self.closed and len(self._items) < self.max_size
+        if gather:
+            # 잠깐 기다려 뒤따라오는 메시지를 같은 시스템 콜로 묶음
+            time.sleep(self.coalesce_delay)
+        return self.pop_all()
+
+    def close(self):
+        """더 이상 넣지 않음. 남은 프레임은 송신기가 마저 보냄"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        if self.on_ready is not None:
+            self.on_ready()
+
+
+class SocketWriter:
+    """여러 연결의 송신 대기열을 스레드 하나로 비우는 송신기
+
+    연결 객체(conn)에는 sock, outbox, prepare_batch(batch) -> 보낼 bytes 목록,
+    abort(), bytes_out이 있어야 한다. 대기열에 프레임이 들어오면 notify(conn)로 알리고,
+    다 보내지 못한 연결은 소켓이 쓰기 가능해질 때까지 selector에 등록해 둔다.
+    소켓은 selector 등록을 해제한 뒤 닫아야 하므로 release(conn)로 이 스레드에 맡긴다.
+    """
+
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        # 보낼 것이 생긴 연결, 닫을 연결
+        self._ready = collections.deque()
+        self._released = collections.deque()
+        # (보낼 시각, 순번, 연결): coalesce_delay만큼 기다렸다 보낼 연결
+        self._delayed = []
+        self._order = 0
+        self._woken = False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        thread = threading.Thread(target=self._run, name='socket-writer', daemon=True)
+        thread.start()
+
+    def attach(self, conn):
+        """연결별 송신 상태를 준비"""
+        # 보내다 만 버퍼, 대기열 알림 중복 방지, selector 등록 여부, 모두 보냄(닫힌 뒤), 소켓을 닫음
+        conn.pending = collections.deque()
+        conn.scheduled = False
+        conn.watched = False
+        conn.flushed = threading.Event()
+        conn.released = False
+
+    def notify(self, conn):
+        """conn의 대기열에 보낼 것이 생김 (어느 스레드에서나 호출)"""
+        with self._lock:
+            if conn.scheduled:
+                return
+            conn.scheduled = True
+            self._ready.append(conn)
+            self._wake()
+
+    def release(self, conn):
+        """selector에서 빼고 소켓을 닫음"""
+        with self._lock:
+            self._released.append(conn)
+            self._wake()
+
+    def _wake(self):
+        # _lock을 잡은 상태에서 호출
+        if not self._woken:
+            self._woken = True
+            try:
+                self._wake_w.send(b'\0')
+            except BlockingIOError:
+                pass
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._delayed:
+                timeout = max(0.0, self._delayed[0][0] - time.monotonic())
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wake_r:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                else:
+                    # 쓰기 가능해진 연결
+                    self._flush(key.data)
+
+            with self._lock:
+                self._woken = False
+                ready = list(self._ready)
+                self._ready.clear()
+                released = list(self._released)
+                self._released.clear()
+                for conn in ready:
+                    conn.scheduled = False
+
+            now = time.monotonic()
+            for conn in ready:
+                outbox = conn.outbox
+                if outbox.coalesce_delay > 0 and not outbox.closed and len(outbox) < outbox.max_size:
+                    # 잠깐 기다려 뒤따라오는 메시지를 같은 시스템 콜로 묶음
+                    self._order += 1
+                    heapq.heappush(self._delayed, (now + outbox.coalesce_delay, self._order, conn))
+                else:
+                    self._flush(conn)
+            while self._delayed and self._delayed[0][0] <= now:
+                self._flush(heapq.heappop(self._delayed)[2])
+            for conn in released:
+                self._close(conn)
+
+    def _flush(self, conn):
+        """보낼 수 있는 만큼 보내고, 소켓 버퍼가 가득 차면 쓰기 가능해질 때까지 등록해 둠"""
+        if conn.released:
+            return
+        pending = conn.pending
+        try:
+            while True:
+                if not pending:
+                    batch = conn.outbox.pop_all()
+                    if not batch:
+                        break
+                    pending.extend(memoryview(data) for data in conn.prepare_batch(batch))
+                    continue
+                try:
+                    sent = self._send(conn.sock, pending)
+                except BlockingIOError:
+                    self._watch(conn, True)
+                    return
+                conn.bytes_out += sent
+                while sent:
+                    size = len(pending[0])
+                    if sent >= size:
+                        sent -= size
+                        pending.popleft()
+                    else:
+                        pending[0] = pending[0][sent:]
+                        sent = 0
+        except OSError:
+            # 상대가 연결을 끊은 경우, 수신 스레드도 깨워서 퇴장 처리를 하게 함
+            pending.clear()
+            conn.abort()
+        self._watch(conn, False)
+        if conn.outbox.closed and not len(conn.outbox):
+            conn.flushed.set()
+
+    @staticmethod
+    def _send(sock, pending):
+        if hasattr(sock, 'sendmsg'):
+            return sock.sendmsg(list(itertools.islice(pending, IOV_MAX)), (), MSG_DONTWAIT)
+        return sock.send(pending[0], MSG_DONTWAIT)
+
+    def _watch(self, conn, writable):
+        """쓰기 가능 이벤트를 기다릴지 정함"""
+        if writable and not conn.watched:
+            self._selector.register(conn.sock, selectors.EVENT_WRITE, conn)
+            conn.watched = True
+        elif not writable and conn.watched:
+            self._selector.unregister(conn.sock)
+            conn.watched = False
+
+    def _close(self, conn):
+        self._watch(conn, False)
+        conn.released = True
+        conn.pending.clear()
+        conn.flushed.set()
+        conn.sock.close()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def socket_writer():
+    """스레드 엔진이 함께 쓰는 SocketWriter (처음 호출할 때 시작)"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SocketWriter()
+        return _writer
@@ -0,0 +1,142 @@
+"""채팅 서버와 클라이언트가 함께 사용하는 메시지 프레이밍
+
+TCP는 메시지 경계를 보장하지 않으므로 recv 한 번을 메시지 하나로 볼 수 없다.
+모든 메시지는 [varint 길이][UTF-8 본문] 형태의 프레임으로 보내고,
+받는 쪽은 FrameDecoder에 받은 바이트를 그대로 넣어 완성된 프레임만 꺼낸다.
+
+varint는 7비트씩 나누어 낮은 자리부터 기록하고, 다음 바이트가 이어지면
+최상위 비트를 1로 둔다. (예: 300 -> b'\\xac\\x02')
+"""
+
+# recv 한 번에 읽어 올 최대 바이트 수
+RECV_SIZE = 65536
+# 비정상적인 길이 값으로 메모리를 모두 쓰는 것을 막기 위한 프레임 최대 크기
+MAX_FRAME_SIZE = 1024 * 1024
+# 길이 값이 MAX_FRAME_SIZE를 넘지 않는다면 varint는 이 길이를 넘을 수 없음
+_MAX_VARINT_BYTES = 5
+
+# 연결 확인용 제어 메시지: 서버가 PING을 보내면 클라이언트는 PONG으로 답함
+PING = '/ping'
+PONG = '/pong'
+
+
+class ProtocolError(ValueError):
+    """프레임 형식이 잘못되었을 때 발생하는 예외"""
+
+
+def encode_varint(value):
+    """0 이상의 정수를 varint 바이트열로 변환"""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data, pos=0):
+    """data[pos:]에서 varint 하나를 읽어 (값, 다음 위치)를 반환"""
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data) or shift >= 7 * _MAX_VARINT_BYTES:
+            raise ProtocolError('길이 값이 잘렸거나 너무 깁니다.')
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_frame(message):
+    """문자열(또는 이미 인코딩된 바이트)을 길이가 붙은 프레임으로 변환"""
+    payload = message.encode('utf-8') if isinstance(message, str) else bytes(message)
+    return encode_varint(len(payload)) + payload
+
+
+class FrameDecoder:
+    """받은 바이트를 누적하며 완성된 프레임을 순서대로 돌려주는 점진적 디코더"""
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+
+    def feed_bytes(self, data):
+        """data를 추가하고 완성된 프레임의 본문(bytes) 목록을 반환"""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        pos = 0
+        end = len(buffer)
+
+        while pos < end:
+            # varint 길이 읽기
+            length = 0
+            shift = 0
+            i = pos
+            while True:
+                if i >= end:
+                    # 길이 값이 아직 다 도착하지 않음
+                    length = None
+                    break
+                byte = buffer[i]
+                i += 1
+                length |= (byte & 0x7F) << shift
+                if not byte & 0x80:
+                    break
+                shift += 7
+                if i - pos >= _MAX_VARINT_BYTES:
+                    raise ProtocolError('길이 값이 너무 깁니다.')
+            if length is None:
+                break
+            if length > self.max_frame_size:
+                raise ProtocolError(f'프레임 크기({length})가 최대 크기를 넘었습니다.')
+            if end - i < length:
+                # 본문이 아직 다 도착하지 않음
+                break
+            frames.append(bytes(buffer[i:i + length]))
+            pos = i + length
+
+        if pos:
+            # 처리한 부분은 recv 한 번당 한 번만 잘라냄
+            del buffer[:pos]
+        return frames
+
+    def feed(self, data):
+        """data를 추가하고 완성된 메시지 문자열 목록을 반환"""
+        return [frame.decode('utf-8') for frame in self.feed_bytes(data)]
+
+    def pending(self):
+        """아직 프레임으로 완성되지 않은 바이트 수"""
+        return len(self._buffer)
+
+
+class MessageReader:
+    """블로킹 소켓에서 프레임 단위로 메시지를 하나씩 읽는 도우미"""
+
+    def __init__(self, sock, recv_size=RECV_SIZE):
+        self.sock = sock
+        self.recv_size = recv_size
+        self.decoder = FrameDecoder()
+        # 지금까지 받은 바이트 수
+        self.received = 0
+        # 압축을 협상하면 받은 바이트를 먼저 풀어 줄 객체 (chat_compress.StreamDecompressor)
+        self.decompressor = None
+        self._messages = []
+        self._index = 0
+
+    def read_message(self):
+        """다음 메시지를 반환하고, 연결이 끊기면 None을 반환"""
+        while self._index >= len(self._messages):
+            data = self.sock.recv(self.recv_size)
+            if not data:
+                return None
+            self.received += len(data)
+            if self.decompressor is not None:
+                data = self.decompressor.decompress(data)
+            self._messages = self.decoder.feed(data)
+            self._index = 0
+        message = self._messages[self._index]
+        self._index += 1
+        return message
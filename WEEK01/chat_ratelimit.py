@@ -0,0 +1,141 @@
+"""토큰 버킷 전송량 제한
+
+메시지 하나는 방 인원 수만큼 복사되어 나가므로, 한 사람이 도배하면 서버 전체가 느려진다.
+브로드캐스트하기 전에 연결별, 방별로 초당 메시지 수와 초당 바이트 수를 확인한다.
+
+- 버킷마다 burst만큼 토큰을 담을 수 있고, 초당 rate만큼 다시 찬다.
+  메시지 하나를 보내려면 메시지 토큰 1개와 바이트 토큰(본문 크기)이 필요하다.
+- 상태는 __slots__ 객체 하나(토큰 2개 + 마지막 갱신 시각)로, 메시지마다 새로 만드는
+  객체가 없다. 남은 토큰은 확인할 때 지난 시간만큼만 계산해 채운다.
+- 연결 제한을 넘으면 [SYSTEM] 경고를 보내고 위반 횟수를 센다. 위반이 max_strikes번
+  쌓이면 연결을 끊는다. strike_window초 동안 위반이 없으면 위반 횟수를 초기화한다.
+- 방 제한은 방 전체의 합계라서, 넘더라도 경고만 하고 위반 횟수는 세지 않는다.
+
+rate가 0이면 그 제한은 사용하지 않는다.
+"""
+
+# check 결과
+ALLOWED = 0
+LIMITED = 1
+DISCONNECT = 2
+
+# 서버 시작 시 configure로 변경
+settings = {
+    'msg_rate': 10.0,
+    'msg_burst': 20,
+    'byte_rate': 32 * 1024,
+    'byte_burst': 64 * 1024,
+    'room_msg_rate': 200.0,
+    'room_msg_burst': 400,
+    'room_byte_rate': 1024 * 1024,
+    'room_byte_burst': 2 * 1024 * 1024,
+    'max_strikes': 10,
+    'strike_window': 10.0,
+}
+
+
+def utf8_length(text):
+    """문자열을 UTF-8로 인코딩했을 때의 길이 (ASCII이면 새 bytes를 만들지 않음)"""
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
+
+
+class BucketState:
+    """메시지 수와 바이트 수 버킷 한 쌍의 상태"""
+
+    __slots__ = ('messages', 'bytes', 'stamp', 'strikes', 'last_violation', 'last_warning')
+
+    def __init__(self, messages, size, now):
+        self.messages = messages
+        self.bytes = size
+        self.stamp = now
+        self.strikes = 0
+        self.last_violation = 0.0
+        self.last_warning = float('-inf')
+
+
+class TokenBucketLimit:
+    """rate/burst 설정 하나 (상태는 BucketState에 따로 둠)"""
+
+    def __init__(self, msg_rate, msg_burst, byte_rate, byte_burst):
+        self.msg_rate = msg_rate
+        self.msg_burst = msg_burst
+        self.byte_rate = byte_rate
+        self.byte_burst = byte_burst
+
+    def new_state(self, now):
+        return BucketState(self.msg_burst, self.byte_burst, now)
+
+    def take(self, state, size, now):
+        """토큰이 충분하면 쓰고 True, 모자라면 그대로 두고 False"""
+        elapsed = now - state.stamp
+        state.stamp = now
+        ok = True
+        if self.msg_rate > 0:
+            state.messages = min(self.msg_burst, state.messages + elapsed * self.msg_rate)
+            ok = state.messages >= 1
+        if self.byte_rate > 0:
+            state.bytes = min(self.byte_burst, state.bytes + elapsed * self.byte_rate)
+            # burst보다 큰 메시지는 버킷이 가득 찼을 때만 보낼 수 있음
+            ok = ok and state.bytes >= min(size, self.byte_burst)
+        if ok:
+            if self.msg_rate > 0:
+                state.messages -= 1
+            if self.byte_rate > 0:
+                state.bytes -= size
+        return ok
+
+
+class RateLimiter:
+    """연결별, 방별 제한을 함께 관리"""
+
+    def __init__(self, config):
+        self.connection = TokenBucketLimit(config['msg_rate'], config['msg_burst'],
+                                           config['byte_rate'], config['byte_burst'])
+        self.room = TokenBucketLimit(config['room_msg_rate'], config['room_msg_burst'],
+                                     config['room_byte_rate'], config['room_byte_burst'])
+        self.max_strikes = config['max_strikes']
+        self.strike_window = config['strike_window']
+        # 방 이름 -> BucketState
+        self.rooms = {}
+
+    def check_connection(self, state, size, now):
+        """연결 하나의 제한을 확인해 ALLOWED, LIMITED, DISCONNECT 중 하나를 반환"""
+        if self.connection.take(state, size, now):
+            if state.strikes and now - state.last_violation > self.strike_window:
+                state.strikes = 0
+            return ALLOWED
+        state.strikes += 1
+        state.last_violation = now
+        if self.max_strikes and state.strikes >= self.max_strikes:
+            return DISCONNECT
+        return LIMITED
+
+    def check_room(self, room_name, size, now):
+        """방 전체의 제한을 확인 (여러 연결이 같은 상태를 쓰므로 clients_lock 안에서 호출)"""
+        state = self.rooms.get(room_name)
+        if state is None:
+            state = self.rooms[room_name] = self.room.new_state(now)
+        return ALLOWED if self.room.take(state, size, now) else LIMITED
+
+    def should_warn(self, state, now, interval=1.0):
+        """경고 메시지도 전송량이므로 연결마다 interval초에 한 번만 보냄"""
+        if now - state.last_warning < interval:
+            return False
+        state.last_warning = now
+        return True
+
+    def forget_room(self, room_name):
+        self.rooms.pop(room_name, None)
+
+
+limiter = RateLimiter(settings)
+
+
+def configure(**changes):
+    """설정을 바꾸고 제한기를 다시 만듦 (연결을 받기 전에 호출)"""
+    global limiter
+    unknown = set(changes) - set(settings)
+    if unknown:
+        raise ValueError(f'알 수 없는 설정입니다: {", ".join(sorted(unknown))}')
+    settings.update(changes)
+    limiter = RateLimiter(settings)
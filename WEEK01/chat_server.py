@@ -1,114 +1,548 @@
+import argparse
 import socket
 import threading
+import time
 
-# 데드락 방지
-clients_lock = threading.RLock()
+import chat_compress
+import chat_files
+import chat_heartbeat
+import chat_history
+import chat_mailbox
+import chat_metrics
+import chat_ratelimit
+import chat_outbox
+from chat_outbox import OutboundQueue
+from chat_protocol import PONG, MessageReader, encode_frame
+
+# 처음 접속하면 들어가는 기본 방
+DEFAULT_ROOM = 'lobby'
+MAX_ROOM_NAME = 30
+
+# 데드락 방지 (RLock처럼 동작하면서 잠금을 잡고 있던 시간을 잼)
+clients_lock = chat_metrics.TimedLock()
+# 연결 -> 닉네임
 clients = {}
+# 닉네임 -> 연결 (귓속말 대상을 바로 찾기 위한 색인)
+nicknames = {}
+# 방 이름 -> 방에 있는 연결 집합
+rooms = {DEFAULT_ROOM: set()}
+# 연결 -> 현재 있는 방 이름
+client_rooms = {}
+# 방 이름 -> 지금까지 전달한 메시지 수 (지표의 방별 처리량 계산용)
+room_messages = {}
+# 클라이언트끼리 주고받는 파일 전송 프레임의 동작 (chat_files.py)
+# (busy는 서버가 조각을 버렸을 때 보낸 쪽에게만 보냄)
+FILE_OPS = frozenset(('offer', 'accept', 'chunk', 'ack', 'done', 'reject', 'cancel', 'error'))
+# 여러 프로세스로 실행할 때 다른 워커와 메시지를 주고받는 버스 (chat_cluster.BusClient)
+bus = None
+
+# 자주 보내는 안내 문구는 한 번만 인코딩해 두고 재사용
+NICKNAME_PROMPT = encode_frame('사용할 닉네임을 입력하세요: ')
+NICKNAME_RETRY = encode_frame('닉네임이 비어있거나 이미 사용 중입니다. 다른 닉네임을 입력하세요: ')
+WHISPER_USAGE = encode_frame("[SYSTEM] 잘못된 귓속말 형식입니다. (사용법: /w 상대닉네임 메시지)")
+HISTORY_USAGE = encode_frame(f'[SYSTEM] 사용법: /history [1~{chat_history.MAX_REQUEST}]')
+HISTORY_END = encode_frame('[SYSTEM] --- 여기까지 ---')
+RATE_WARNING = encode_frame('[SYSTEM] 메시지를 너무 빠르게 보내고 있습니다. 잠시 후 다시 보내세요.')
+ROOM_RATE_WARNING = encode_frame('[SYSTEM] 방에 메시지가 너무 많아 전달하지 못했습니다. 잠시 후 다시 보내세요.')
+RATE_DISCONNECT = encode_frame('[SYSTEM] 전송량 제한을 반복해서 넘어 연결을 끊습니다.')
+FILE_USAGE = encode_frame('[SYSTEM] 잘못된 파일 전송 형식입니다. (파일은 /send 상대닉네임 경로로 보냅니다)')
+JOIN_USAGE = encode_frame(f'[SYSTEM] 방 이름은 공백 없이 {MAX_ROOM_NAME}자 이하로 입력하세요. (사용법: /join 방이름)')
+
+
+class ClientConnection:
+    """클라이언트 소켓과 송신 대기열을 묶은 객체
+
+    수신은 연결마다 스레드 하나가 맡고, 송신은 모든 연결이 함께 쓰는
+    chat_outbox.SocketWriter 스레드가 맡는다. (연결당 스레드 1개)
+    """
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.reader = MessageReader(sock)
+        self.writer = chat_outbox.socket_writer()
+        self.writer.attach(self)
+        # 브로드캐스트는 clients_lock을 잡은 채 넣으므로 block 정책에서도 기다리지 않음
+        self.outbox = OutboundQueue(can_block=False, on_ready=self._notify_writer)
+        # 압축을 협상하면 ACCEPT_FRAME을 보낸 뒤부터 사용
+        self.compressor = None
+        self.compress_pending = False
+        chat_metrics.metrics.track(self)
+        # 오래 조용하면 PING을 보내고, 응답이 없으면 abort로 끊음
+        chat_heartbeat.monitor.watch(self)
+
+    def _notify_writer(self):
+        self.writer.notify(self)
+
+    def enqueue(self, data):
+        """인코딩된 프레임을 송신 대기열에 넣고 바로 반환"""
+        if self.outbox.closed:
+            # 이미 퇴장 중인 연결
+            return
+        if not self.outbox.put(data):
+            self.abort()
+            raise ConnectionError(f'{self.addr} 송신 대기열이 가득 차 연결을 종료합니다.')
+
+    def prepare_batch(self, batch):
+        """대기열에서 꺼낸 프레임들을 실제로 보낼 버퍼 목록으로 바꿈 (송신 스레드에서 호출)"""
+        self.messages_out += len(batch)
+        if self.compress_pending:
+            # 압축 승인 프레임까지는 평문으로 보내고 그 뒤부터 압축
+            plain, rest = chat_compress.split_at_accept(batch)
+            if rest is None:
+                return plain
+            self.compressor = chat_compress.StreamCompressor()
+            self.compress_pending = False
+            return plain + ([self.compressor.compress(rest)] if rest else [])
+        if self.compressor is not None:
+            return [self.compressor.compress(batch)]
+        return batch
+
+    def start_compression(self):
+        """압축 요청을 승인: 이후 받는 데이터는 바로, 보내는 데이터는 승인 프레임 다음부터 압축"""
+        self.reader.decompressor = chat_compress.StreamDecompressor()
+        self.compress_pending = True
+        self.enqueue(chat_compress.ACCEPT_FRAME)
+
+    def read_text(self):
+        """프레임 하나를 읽어 앞뒤 공백을 제거한 문자열로 반환 (연결 종료 시 None)
 
+        PONG을 포함해 프레임을 받을 때마다 마지막 수신 시각을 기록한다.
+        """
+        while True:
+            message = self.reader.read_message()
+            if message is None:
+                return None
+            chat_heartbeat.touch(self)
+            self.messages_in += 1
+            self.bytes_in = self.reader.received
+            message = message.strip()
+            if message != PONG:
+                return message
+
+    def read_nickname(self):
+        """닉네임 프레임을 읽음. 입력 전에 연결이 끊기면 예외 발생"""
+        nickname = self.read_text()
+        if nickname is None:
+            raise ConnectionResetError('닉네임 입력 전에 연결이 종료되었습니다.')
+        return nickname
+
+    def close(self, timeout=5.0):
+        """남은 메시지를 보낸 뒤 연결을 닫음 (timeout초 안에 못 보내면 버림)"""
+        chat_heartbeat.monitor.unwatch(self)
+        self.outbox.close()
+        if not self.flushed.wait(timeout):
+            self.abort()
+        # selector 등록을 해제한 뒤 닫아야 하므로 송신 스레드가 닫음
+        self.writer.release(self)
+        chat_metrics.metrics.retire(self)
+
+    def abort(self):
+        """남은 메시지를 버리고 즉시 연결을 끊음"""
+        self.outbox.close()
+        self.outbox.pop_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def broadcast_message(message, room=None, record=False):
+    """room 방(room이 None이면 접속자 전체)에 메시지를 보내고, 다른 워커에도 알림
 
-def broadcast_message(message):
-    """현재 접속된 모든 클라이언트에게 메시지를 전송"""
+    record가 True이면 방의 대화 기록에도 남긴다.
+    """
+    deliver_message(message, room, record)
+    if bus is not None:
+        bus.publish_message(message, room, record)
+
+
+def deliver_message(message, room=None, record=False):
+    """이 프로세스에 접속한 클라이언트 중 room 방에 있는 사람의 송신 대기열에 메시지를 넣음
+
+    메시지는 한 번만 인코딩하고, 모든 대기열과 대화 기록이 같은 bytes 객체를 공유한다.
+    """
+    started = time.perf_counter()
+    data = encode_frame(message)
     with clients_lock:
-        for client_socket in list(clients.keys()):
+        targets = clients if room is None else rooms.get(room, ())
+        for client in targets:
             try:
-                client_socket.send(message.encode('utf-8'))
+                client.enqueue(data)
             except Exception as e:
                 print(f'브로드캐스트 오류: {e}')
+        if room in rooms:
+            # 이 워커에 있는 방만 셈 (버스로 받은 다른 워커의 방까지 세면 계속 늘어남)
+            room_messages[room] = room_messages.get(room, 0) + 1
+        if room is not None and record:
+            # 잠금 안에서 기록해야 전달 순서와 기록 순서가 같음
+            chat_history.store.append(room, data)
+        chat_metrics.metrics.fanout.record(time.perf_counter() - started)
 
 
 def send_private_message(message, sender_nickname, target_nickname):
-    """특정 클라이언트에게 귓속말 메시지 전송"""
+    """특정 클라이언트에게 귓속말 메시지 전송 (접속해 있지 않으면 보관함에 보관)"""
     with clients_lock:
-        target_socket = None
-        sender_socket = None
+        # 닉네임 색인으로 송신자와 수신자의 연결을 찾음
+        target_client = nicknames.get(target_nickname)
+        sender_client = nicknames.get(sender_nickname)
 
-        # 닉네임을 기반으로 송신자와 수신자의 소켓을 찾음
-        for sock, nick in clients.items():
-            if nick == target_nickname:
-                target_socket = sock
-            if nick == sender_nickname:
-                sender_socket = sock
+        if target_client is None and sender_client and bus is not None:
+            # 다른 워커에 접속한 사용자일 수 있으므로 버스로 보내고, 결과는 버스가 알려 줌
+            bus.send_whisper(sender_nickname, target_nickname, message)
+            return
 
         formatted_message = f'[귓속말] {sender_nickname}> {message}'
 
-        if target_socket and sender_socket:
+        if target_client and sender_client:
             try:
-                target_socket.send(formatted_message.encode('utf-8'))
-                sender_socket.send(formatted_message.encode('utf-8'))
+                data = encode_frame(formatted_message)
+                target_client.enqueue(data)
+                sender_client.enqueue(data)
             except Exception as e:
                 print(f'귓속말 전송 오류: {e}')
-        elif sender_socket:
-            error_message = f"'{target_nickname}'님을 찾을 수 없습니다."
-            try:
-                sender_socket.send(error_message.encode('utf-8'))
-            except Exception as e:
-                print(f'오류 메시지 전송 실패: {e}')
+            return
+
+    if sender_client:
+        # 파일에 쓰는 동안 다른 연결을 막지 않도록 잠금 밖에서 보관
+        store_whisper(sender_client, sender_nickname, target_nickname, message)
+
+
+def store_whisper(sender_client, sender_nickname, target_nickname, message):
+    """접속해 있지 않은 상대에게 보낸 귓속말을 보관하고 보낸 사람에게 결과를 알림"""
+    stamp = time.strftime('%m-%d %H:%M')
+    data = encode_frame(f'[귓속말 {stamp}] {sender_nickname}> {message}')
+    result = chat_mailbox.store.store(target_nickname, data)
+    if result == chat_mailbox.STORED:
+        notice = f"[SYSTEM] '{target_nickname}'님이 접속해 있지 않아 보관했습니다. 다음에 접속하면 전달됩니다."
+    elif result == chat_mailbox.FULL:
+        notice = f"[SYSTEM] '{target_nickname}'님의 보관함이 가득 차 귓속말을 보관하지 못했습니다."
+    else:
+        notice = f"'{target_nickname}'님을 찾을 수 없습니다."
+    try:
+        sender_client.enqueue(encode_frame(notice))
+    except Exception as e:
+        print(f'오류 메시지 전송 실패: {e}')
+
+
+def deliver_whisper(recipient_nickname, sender_nickname, message):
+    """버스로 전달받은 귓속말을 이 프로세스의 recipient에게 보냄"""
+    with clients_lock:
+        client = nicknames.get(recipient_nickname)
+        if client is not None:
+            client.enqueue(encode_frame(f'[귓속말] {sender_nickname}> {message}'))
+
+
+def deliver_whisper_error(sender_nickname, target_nickname, message):
+    """버스에서 귓속말 상대가 어느 워커에도 접속해 있지 않다고 알려 온 경우 보관함에 보관"""
+    with clients_lock:
+        client = nicknames.get(sender_nickname)
+    if client is not None:
+        store_whisper(client, sender_nickname, target_nickname, message)
+
+
+def relay_file_message(client, nickname, message):
+    """파일 전송 프레임('/file 동작 상대 전송ID ...')을 상대에게 전달
+
+    파일 내용은 모아 두지 않고 조각이 올 때마다 상대 닉네임 자리를 보낸 사람 닉네임으로
+    바꿔 상대의 송신 대기열에 넣는다. 흐름 제어와 이어 받기는 양쪽 클라이언트가 맡는다.
+    """
+    parts = message.split(' ', 3)
+    if len(parts) < 4 or parts[1] not in FILE_OPS:
+        client.enqueue(FILE_USAGE)
+        return
+    _, op, target_nickname, rest = parts
+    if not chat_files.limit.take(client.file_rate_state, chat_ratelimit.utf8_length(message), time.monotonic()):
+        # 제한을 넘은 조각은 버리고, 보낸 쪽에 그 위치부터 잠시 뒤 다시 보내라고 알림
+        transfer_id, _, fields = rest.partition(' ')
+        offset = fields.partition(' ')[0]
+        if op == 'chunk' and offset:
+            client.enqueue(encode_frame(f'/file busy {target_nickname} {transfer_id} {offset}'))
+        return
+    with clients_lock:
+        target_client = nicknames.get(target_nickname)
+    if target_client is None or target_client is client:
+        # 다른 워커의 사용자에게는 보내지 않음 (조각마다 버스를 거치지 않도록)
+        transfer_id = rest.split(' ', 1)[0]
+        client.enqueue(encode_frame(f'/file error {target_nickname} {transfer_id} 상대를 찾을 수 없습니다.'))
+        return
+    try:
+        target_client.enqueue(encode_frame(f'/file {op} {nickname} {rest}'))
+    except Exception as e:
+        print(f'파일 전송 프레임 전달 오류: {e}')
+
+
+def register_client(client, nickname):
+    """닉네임이 비어있지 않고 중복되지 않으면 등록하고 기본 방에 넣음"""
+    with clients_lock:
+        if not nickname or nickname in nicknames:
+            return False
+        clients[client] = nickname
+        nicknames[nickname] = client
+        now = time.monotonic()
+        client.rate_state = chat_ratelimit.limiter.connection.new_state(now)
+        client.file_rate_state = chat_files.limit.new_state(now)
+        rooms[DEFAULT_ROOM].add(client)
+        client_rooms[client] = DEFAULT_ROOM
+        return True
+
+
+def _leave_current_room(client, notice):
+    """현재 방에서 빼고 남은 사람들에게 notice를 알림 (clients_lock을 잡은 상태에서 호출)"""
+    room_name = client_rooms.pop(client, None)
+    members = rooms.get(room_name)
+    if members is None:
+        return
+    members.discard(client)
+    if not members and room_name != DEFAULT_ROOM:
+        # 빈 방은 정리
+        del rooms[room_name]
+        room_messages.pop(room_name, None)
+        chat_ratelimit.limiter.forget_room(room_name)
+        chat_history.store.forget(room_name)
+        if bus is not None:
+            # 이 워커에서는 비었지만 다른 워커에는 아직 방에 있는 사람이 있을 수 있음
+            bus.publish_message(notice, room_name)
+    else:
+        broadcast_message(notice, room_name)
+
+
+def join_room(client, room_name):
+    """클라이언트를 room_name 방으로 옮김 (방이 없으면 새로 만듦)"""
+    with clients_lock:
+        nickname = clients.get(client)
+        if nickname is None:
+            return
+        if client_rooms.get(client) == room_name:
+            client.enqueue(encode_frame(f"[SYSTEM] 이미 '{room_name}' 방에 있습니다."))
+            return
+        _leave_current_room(client, f"[SYSTEM] '{nickname}'님이 '{client_rooms[client]}' 방을 나갔습니다.")
+        rooms.setdefault(room_name, set()).add(client)
+        client_rooms[client] = room_name
+        broadcast_message(f"[SYSTEM] '{nickname}'님이 '{room_name}' 방에 들어왔습니다.", room_name)
+    send_history(client, room_name, chat_history.settings['replay'])
+
+
+def leave_room(client):
+    """현재 방을 나가 기본 방으로 돌아감"""
+    if client_rooms.get(client) == DEFAULT_ROOM:
+        client.enqueue(encode_frame(f"[SYSTEM] 기본 방('{DEFAULT_ROOM}')은 나갈 수 없습니다."))
+        return
+    join_room(client, DEFAULT_ROOM)
+
+
+def list_rooms(client):
+    """방 목록과 인원 수를 요청한 클라이언트에게 보냄"""
+    with clients_lock:
+        current = client_rooms.get(client)
+        entries = []
+        for room_name, members in sorted(rooms.items()):
+            mark = '*' if room_name == current else ''
+            entries.append(f'{mark}{room_name}({len(members)})')
+    client.enqueue(encode_frame('[SYSTEM] 방 목록: ' + ', '.join(entries)))
+
+
+def send_history(client, room_name, count):
+    """room_name 방의 최근 메시지 count개를 클라이언트에게 보냄"""
+    if count <= 0:
+        return
+    found, buffers = chat_history.store.read_last(room_name, count)
+    if not found:
+        return
+    client.enqueue(encode_frame(f"[SYSTEM] --- '{room_name}' 방의 최근 대화 {found}개 ---"))
+    # 버퍼 하나에 프레임 여러 개가 이어 붙어 있으므로 그대로 넣으면 됨
+    for data in buffers:
+        client.enqueue(data)
+    client.enqueue(HISTORY_END)
+
+
+def negotiate_compression(client):
+    """닉네임 대신 압축 요청이 온 경우 설정에 따라 승인하거나 거절"""
+    if chat_compress.settings['enabled']:
+        client.start_compression()
+    else:
+        client.enqueue(chat_compress.REJECT_FRAME)
+
+
+def announce_join(client, nickname, addr):
+    """접속을 마친 클라이언트에게 최근 대화를 보여 주고 입장을 알림"""
+    print(f"'{nickname}'님이 {addr}에서 접속했습니다.")
+    send_history(client, DEFAULT_ROOM, chat_history.settings['replay'])
+    broadcast_message(f"'{nickname}'님이 입장하셨습니다.", DEFAULT_ROOM)
+    # 접속하지 않은 동안 받은 귓속말을 한 번에 전달
+    chat_mailbox.store.remember(nickname)
+    count, data = chat_mailbox.store.take(nickname)
+    if count:
+        client.enqueue(encode_frame(f'[SYSTEM] 접속하지 않은 동안 받은 귓속말 {count}개'))
+        client.enqueue(data)
+
+
+def get_queue_depths():
+    """닉네임별 송신 대기열에 쌓여 있는 메시지 수"""
+    with clients_lock:
+        return {nick: len(client.outbox) for client, nick in clients.items()}
+
+
+def room_message_counts():
+    """방 이름별 지금까지 전달한 메시지 수"""
+    with clients_lock:
+        return dict(room_messages)
+
+
+def collect_stats(top=10):
+    """관리 포트로 보여 줄 서버 상태 (접속자, 방별 인원, 송신 대기열 깊이)"""
+    with clients_lock:
+        registered = len(clients)
+        members = {room_name: len(conns) for room_name, conns in rooms.items()}
+        depths = [(len(client.outbox), client.outbox.dropped, nick) for client, nick in clients.items()]
+    depths.sort(reverse=True)
+    return {
+        'registered': registered,
+        'heartbeat_reaped': chat_heartbeat.monitor.reaped,
+        'rooms': dict(sorted(members.items(), key=lambda item: -item[1])[:top]),
+        'room_count': len(members),
+        'outbound_queues': {
+            'total': sum(depth for depth, _, _ in depths),
+            'deepest': [{'nickname': nick, 'depth': depth, 'dropped': dropped}
+                        for depth, dropped, nick in depths[:top]],
+        },
+    }
+
+
+def check_rate(client, size, room=None):
+    """전송량 제한을 확인하고, 넘었으면 경고한 뒤 False를 반환
+
+    room이 None이면 연결별 제한, 아니면 방 전체의 제한을 확인한다.
+    연결별 제한을 반복해서 넘으면 예외를 일으켜 평소처럼 퇴장 처리되게 한다.
+    """
+    limiter = chat_ratelimit.limiter
+    now = time.monotonic()
+    if room is None:
+        verdict = limiter.check_connection(client.rate_state, size, now)
+    else:
+        with clients_lock:
+            verdict = limiter.check_room(room, size, now)
+    if verdict == chat_ratelimit.ALLOWED:
+        return True
+    if verdict == chat_ratelimit.DISCONNECT:
+        client.enqueue(RATE_DISCONNECT)
+        raise ConnectionError(f'{client.addr} 전송량 제한을 반복해서 넘어 연결을 끊습니다.')
+    if limiter.should_warn(client.rate_state, now):
+        client.enqueue(RATE_WARNING if room is None else ROOM_RATE_WARNING)
+    return False
+
+
+def process_message(client, nickname, message):
+    """접속을 마친 클라이언트가 보낸 메시지 한 건을 처리"""
+    if message.startswith('/file '):
+        # 파일 조각은 채팅 제한 대신 파일 전송량 제한만 받음
+        relay_file_message(client, nickname, message)
+        return
+    # 명령도 처리 비용이 있으므로 모든 메시지를 연결별 제한에 포함
+    size = chat_ratelimit.utf8_length(message)
+    if not check_rate(client, size):
+        return
+    # 귓속말 기능 처리
+    if message.startswith('/w '):
+        parts = message.split(' ', 2)
+        if len(parts) == 3:
+            target_nickname, private_msg = parts[1], parts[2]
+            send_private_message(private_msg, nickname, target_nickname)
+        else:
+            # 잘못된 형식일 경우, 보낸 사람에게만 안내 메시지 전송
+            client.enqueue(WHISPER_USAGE)
+    elif message == '/join' or message.startswith('/join '):
+        parts = message.split()
+        if len(parts) == 2 and len(parts[1]) <= MAX_ROOM_NAME:
+            join_room(client, parts[1])
+        else:
+            client.enqueue(JOIN_USAGE)
+    elif message == '/leave':
+        leave_room(client)
+    elif message == '/rooms':
+        list_rooms(client)
+    elif message == '/stats':
+        client.enqueue(encode_frame('[SYSTEM] ' + chat_metrics.metrics.summary()))
+    elif message == '/history' or message.startswith('/history '):
+        parts = message.split()
+        if len(parts) == 1:
+            send_history(client, client_rooms.get(client, DEFAULT_ROOM), chat_history.DEFAULT_REQUEST)
+        elif len(parts) == 2 and parts[1].isdigit() and 1 <= int(parts[1]) <= chat_history.MAX_REQUEST:
+            send_history(client, client_rooms.get(client, DEFAULT_ROOM), int(parts[1]))
+        else:
+            client.enqueue(HISTORY_USAGE)
+    else:
+        # 일반 메시지는 보낸 사람이 있는 방에만 전달하고 대화 기록에 남김
+        room_name = client_rooms.get(client, DEFAULT_ROOM)
+        if not check_rate(client, size, room_name):
+            return
+        formatted_message = f'{nickname}> {message}'
+        broadcast_message(formatted_message, room_name, record=True)
+
+
+def remove_client(client):
+    """클라이언트를 목록에서 제거하고 퇴장 메시지를 알림"""
+    with clients_lock:
+        if client in clients:
+            nickname_to_remove = clients.pop(client)
+            del nicknames[nickname_to_remove]
+            if bus is not None:
+                bus.release(nickname_to_remove)
+            exit_message = f"'{nickname_to_remove}'님이 퇴장하셨습니다."
+            print(exit_message)
+            _leave_current_room(client, exit_message)
 
 
 def handle_client(client_socket, addr):
     """개별 클라이언트와의 통신 처리"""
     nickname = None
+    client = ClientConnection(client_socket, addr)
     try:
-        client_socket.send('사용할 닉네임을 입력하세요: '.encode('utf-8'))
-        nickname = client_socket.recv(1024).decode('utf-8').strip()
+        client.enqueue(NICKNAME_PROMPT)
+        nickname = client.read_nickname()
+        if nickname == chat_compress.REQUEST:
+            negotiate_compression(client)
+            nickname = client.read_nickname()
 
-        with clients_lock:
-            while not nickname or nickname in clients.values():
-                client_socket.send('닉네임이 비어있거나 이미 사용 중입니다. 다른 닉네임을 입력하세요: '.encode('utf-8'))
-                nickname = client_socket.recv(1024).decode('utf-8').strip()
-            clients[client_socket] = nickname
+        # 다른 클라이언트의 입장/퇴장을 막지 않도록 닉네임 입력은 잠금 밖에서 기다림
+        while not register_client(client, nickname):
+            client.enqueue(NICKNAME_RETRY)
+            nickname = client.read_nickname()
 
-        print(f"'{nickname}'님이 {addr}에서 접속했습니다.")
-        broadcast_message(f"'{nickname}'님이 입장하셨습니다.")
+        announce_join(client, nickname, addr)
 
         while True:
-            message = client_socket.recv(1024).decode('utf-8').strip()
-            if not message or message == '/종료':
+            message = client.read_text()
+            if message is None or message == '/종료':
                 break
-
-            # 귓속말 기능 처리
-            if message.startswith('/w '):
-                parts = message.split(' ', 2)
-                if len(parts) == 3:
-                    target_nickname, private_msg = parts[1], parts[2]
-                    send_private_message(private_msg, nickname, target_nickname)
-                else:
-                    # 잘못된 형식일 경우, 보낸 사람에게만 안내 메시지 전송
-                    client_socket.send(
-                        "[SYSTEM] 잘못된 귓속말 형식입니다. (사용법: /w 상대닉네임 메시지)".encode('utf-8')
-                    )
-            else:
-                # 일반 메시지 처리
-                formatted_message = f'{nickname}> {message}'
-                broadcast_message(formatted_message)
+            if not message:
+                # 빈 프레임은 무시
+                continue
+            process_message(client, nickname, message)
 
     except Exception as e:
         print(f"클라이언트 '{nickname}' 처리 중 오류: {e}")
     finally:
-        with clients_lock:
-            if client_socket in clients:
-                nickname_to_remove = clients.pop(client_socket)
-                exit_message = f"'{nickname_to_remove}'님이 퇴장하셨습니다."
-                print(exit_message)
-                broadcast_message(exit_message)
-        client_socket.close()
-
-
-def start_server():
-    """서버를 시작하고 클라이언트의 접속을 기다림"""
-    host = '127.0.0.1'
-    port = 9999
+        remove_client(client)
+        client.close()
+
+
+def start_server(host='127.0.0.1', port=9999):
+    """서버를 시작하고 클라이언트의 접속을 기다림 (클라이언트당 수신 스레드 1개 + 공용 송신 스레드)"""
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     
     try:
         server_socket.bind((host, port))
-        server_socket.listen(5)
+        server_socket.listen(socket.SOMAXCONN)
         print(f'서버가 {port} 포트에서 시작되었습니다.')
     except Exception as e:
         print(f'서버 시작 오류: {e}')
         return
 
+    chat_heartbeat.monitor.run_in_thread()
+    chat_metrics.metrics.start(collect_stats, clients_lock, room_message_counts)
+
     try:
         while True:
             client_socket, addr = server_socket.accept()
@@ -121,5 +555,94 @@ def start_server():
         server_socket.close()
 
 
+def main():
+    """명령행 인자에 따라 서버 엔진을 선택해 실행"""
+    parser = argparse.ArgumentParser(description='멀티 클라이언트 채팅 서버')
+    parser.add_argument('--engine', choices=['thread', 'asyncio'], default='thread',
+                        help='thread: 클라이언트당 스레드, asyncio: 단일 이벤트 루프 (기본값: thread)')
+    parser.add_argument('--host', default='127.0.0.1', help='바인드할 주소 (기본값: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=9999, help='포트 번호 (기본값: 9999)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='asyncio 엔진을 실행할 워커 프로세스 수, 0이면 CPU 코어 수 (기본값: 1, 리눅스 전용)')
+    parser.add_argument('--queue-size', type=int, default=1000,
+                        help='클라이언트별 송신 대기열 크기 (기본값: 1000)')
+    parser.add_argument('--slow-policy', choices=chat_outbox.POLICIES, default=chat_outbox.DROP_OLDEST,
+                        help='송신 대기열이 가득 찼을 때의 처리 방식 (기본값: drop-oldest)')
+    parser.add_argument('--block-timeout', type=float, default=1.0,
+                        help='block 정책에서 자리가 나기를 기다리는 최대 시간(초) (기본값: 1.0)')
+    parser.add_argument('--coalesce-ms', type=float, default=0.0,
+                        help='송신 전에 뒤따르는 메시지를 더 모으는 시간(ms) (기본값: 0, 쌓인 만큼만 묶음)')
+    parser.add_argument('--history-dir', default=None,
+                        help='대화 기록을 저장할 폴더, 지정하지 않으면 메모리에만 보관')
+    parser.add_argument('--history-size', type=int, default=1000,
+                        help='방마다 메모리에 보관할 최근 메시지 수, 0이면 기록하지 않음 (기본값: 1000)')
+    parser.add_argument('--replay', type=int, default=20,
+                        help='방에 들어갈 때 보여 줄 최근 메시지 수 (기본값: 20)')
+    parser.add_argument('--mailbox-dir', default='mailbox',
+                        help='접속한 적이 있지만 지금은 접속하지 않은 사용자에게 보낸 귓속말을 보관할 폴더 (기본값: mailbox)')
+    parser.add_argument('--no-mailbox', action='store_true',
+                        help='접속하지 않은 사용자에게 보낸 귓속말을 보관하지 않음')
+    parser.add_argument('--mailbox-size', type=int, default=100,
+                        help='받는 사람마다 보관할 최대 귓속말 수 (기본값: 100)')
+    parser.add_argument('--mailbox-days', type=float, default=7.0,
+                        help='보관한 귓속말을 전달하지 않고 버리기까지의 기간(일) (기본값: 7)')
+    parser.add_argument('--heartbeat', type=float, default=30.0,
+                        help='이 시간(초) 동안 아무것도 받지 못하면 PING을 보냄, 0이면 사용하지 않음 (기본값: 30)')
+    parser.add_argument('--idle-timeout', type=float, default=10.0,
+                        help='PING을 보낸 뒤 이 시간(초) 안에 응답이 없으면 연결을 끊음 (기본값: 10)')
+    parser.add_argument('--msg-rate', type=float, default=10.0,
+                        help='연결마다 초당 보낼 수 있는 메시지 수 (순간적으로는 두 배까지), 0이면 제한 없음. '
+                             'chat_client.py --script도 기본으로 초당 10개를 보내므로, 이 값을 낮추면 '
+                             '클라이언트의 --rate도 맞춰야 함 (기본값: 10)')
+    parser.add_argument('--byte-rate', type=int, default=32 * 1024,
+                        help='연결마다 초당 보낼 수 있는 바이트 수, 0이면 제한 없음 (기본값: 32768)')
+    parser.add_argument('--room-msg-rate', type=float, default=200.0,
+                        help='방마다 초당 전달할 수 있는 메시지 수, 0이면 제한 없음 (기본값: 200)')
+    parser.add_argument('--room-byte-rate', type=int, default=1024 * 1024,
+                        help='방마다 초당 전달할 수 있는 바이트 수, 0이면 제한 없음 (기본값: 1048576)')
+    parser.add_argument('--file-rate', type=int, default=1024 * 1024,
+                        help='연결마다 초당 전달할 파일 전송 바이트 수, 0이면 제한 없음 (기본값: 1048576)')
+    parser.add_argument('--max-strikes', type=int, default=10,
+                        help='연결별 제한을 넘은 횟수가 이만큼 쌓이면 연결을 끊음, 0이면 끊지 않음. 마지막 위반 뒤 '
+                             f"{chat_ratelimit.settings['strike_window']:g}초 동안 위반이 없어야 0부터 다시 셈 (기본값: 10)")
+    parser.add_argument('--compress-level', type=int, default=6, choices=range(0, 10), metavar='0-9',
+                        help='압축을 요청한 연결에 쓸 zlib 압축 수준 (기본값: 6)')
+    parser.add_argument('--no-compress', action='store_true',
+                        help='클라이언트의 압축 요청을 거절')
+    parser.add_argument('--admin-port', type=int, default=None,
+                        help='실행 중 지표를 JSON으로 보여 줄 관리 포트, 127.0.0.1에서만 접속 가능 '
+                             '(여러 워커로 실행하면 워커 번호만큼 더함)')
+    args = parser.parse_args()
+
+    chat_outbox.configure(args.queue_size, args.slow_policy, args.block_timeout,
+                          args.coalesce_ms / 1000)
+    chat_history.configure(directory=args.history_dir, ring_size=args.history_size,
+                           replay=args.replay)
+    chat_mailbox.configure(directory=None if args.no_mailbox else args.mailbox_dir,
+                           max_messages=args.mailbox_size, ttl=args.mailbox_days * 24 * 3600)
+    chat_heartbeat.configure(args.heartbeat, args.idle_timeout)
+    chat_metrics.configure(admin_port=args.admin_port)
+    chat_files.configure(byte_rate=args.file_rate, byte_burst=args.file_rate * 2)
+    chat_compress.configure(enabled=not args.no_compress, level=args.compress_level)
+    chat_ratelimit.configure(msg_rate=args.msg_rate, msg_burst=max(1, int(args.msg_rate * 2)),
+                             byte_rate=args.byte_rate, byte_burst=args.byte_rate * 2,
+                             room_msg_rate=args.room_msg_rate, room_msg_burst=max(1, int(args.room_msg_rate * 2)),
+                             room_byte_rate=args.room_byte_rate, room_byte_burst=args.room_byte_rate * 2,
+                             max_strikes=args.max_strikes)
+
+    if args.workers < 0:
+        parser.error('--workers는 0 이상이어야 합니다.')
+    if args.workers != 1:
+        if args.engine != 'asyncio':
+            parser.error('--workers는 --engine asyncio와 함께 사용해야 합니다.')
+        import chat_cluster
+        chat_cluster.start_cluster(args.host, args.port, args.workers)
+    elif args.engine == 'asyncio':
+        import chat_server_async
+        chat_server_async.start_server(args.host, args.port)
+    else:
+        start_server(args.host, args.port)
+
+
 if __name__ == '__main__':
-    start_server()
\ No newline at end of file
+    main()
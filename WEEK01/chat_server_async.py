@@ -0,0 +1,247 @@
+"""asyncio 이벤트 루프 기반 채팅 서버 엔진
+
+클라이언트마다 스레드를 만들지 않고 하나의 이벤트 루프에서 모든 연결을 처리한다.
+닉네임 확인, /w 귓속말, /종료 처리는 chat_server.py의 함수를 그대로 사용하므로
+스레드 엔진과 동작이 같다.
+
+실행: python chat_server.py --engine asyncio
+"""
+
+import asyncio
+import os
+
+import chat_compress
+import chat_heartbeat
+import chat_metrics
+import chat_server
+from chat_outbox import OutboundQueue
+from chat_protocol import PONG, RECV_SIZE, FrameDecoder
+
+try:
+    import resource
+except ImportError:
+    # 윈도우에는 resource 모듈이 없음
+    resource = None
+
+# 퇴장 후에도 남은 메시지를 보내는 중인 송신 태스크가 GC되지 않도록 보관
+_writer_tasks = set()
+
+
+class AsyncClient:
+    """스트림과 송신 대기열을 묶어 chat_server의 ClientConnection처럼 쓰는 클래스"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.addr = writer.get_extra_info('peername')
+        self.decoder = FrameDecoder()
+        self._messages = []
+        self._index = 0
+        # 이벤트 루프를 멈출 수 없으므로 block 정책은 유예 시간으로 처리
+        self._wakeup = asyncio.Event()
+        self.outbox = OutboundQueue(can_block=False, on_ready=self._wakeup.set)
+        # 압축을 협상하면 사용 (송신은 ACCEPT_FRAME을 보낸 뒤부터)
+        self.compressor = None
+        self.decompressor = None
+        self.compress_pending = False
+        chat_metrics.metrics.track(self)
+        self.writer_task = asyncio.create_task(self._write_loop())
+        _writer_tasks.add(self.writer_task)
+        self.writer_task.add_done_callback(_writer_tasks.discard)
+        chat_heartbeat.monitor.watch(self)
+
+    def enqueue(self, data):
+        """인코딩된 프레임을 송신 대기열에 넣고 바로 반환"""
+        if self.outbox.closed:
+            # 이미 퇴장 중인 연결
+            return
+        if not self.outbox.put(data):
+            self.abort()
+            raise ConnectionError(f'{self.addr} 송신 대기열이 가득 차 연결을 종료합니다.')
+
+    async def _write_loop(self):
+        try:
+            while True:
+                batch = self.outbox.pop_all()
+                if self.writer.is_closing():
+                    break
+                if batch:
+                    if self.compress_pending:
+                        # 압축 승인 프레임까지는 평문으로 보내고 그 뒤부터 압축
+                        plain, rest = chat_compress.split_at_accept(batch)
+                        if rest is not None:
+                            self._send(plain)
+                            self.compressor = chat_compress.StreamCompressor()
+                            self.compress_pending = False
+                            batch = rest
+                    self._send(batch)
+                    # 소켓 버퍼가 찰 때까지만 쓰고, 나머지는 대기열에 남겨 정책을 적용받게 함
+                    await self.writer.drain()
+                    continue
+                if self.outbox.closed:
+                    break
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                if self.outbox.coalesce_delay > 0:
+                    # 잠깐 기다려 뒤따라오는 메시지를 같은 쓰기로 묶음
+                    await asyncio.sleep(self.outbox.coalesce_delay)
+        except (ConnectionError, OSError):
+            self.abort()
+        finally:
+            self.writer.close()
+            # 남은 메시지까지 보낸 뒤에 합계로 옮김
+            chat_metrics.metrics.retire(self)
+
+    def _send(self, batch):
+        if not batch:
+            return
+        if self.compressor is not None:
+            data = self.compressor.compress(batch)
+            self.writer.write(data)
+            self.bytes_out += len(data)
+        else:
+            self.writer.writelines(batch)
+            self.bytes_out += sum(map(len, batch))
+        self.messages_out += len(batch)
+
+    def start_compression(self):
+        """압축 요청을 승인: 이후 받는 데이터는 바로, 보내는 데이터는 승인 프레임 다음부터 압축"""
+        self.decompressor = chat_compress.StreamDecompressor()
+        self.compress_pending = True
+        self.enqueue(chat_compress.ACCEPT_FRAME)
+
+    async def recv_text(self):
+        """프레임 하나를 읽어 앞뒤 공백을 제거한 문자열로 반환 (연결 종료 시 None)"""
+        while True:
+            while self._index >= len(self._messages):
+                data = await self.reader.read(RECV_SIZE)
+                if not data:
+                    return None
+                self.bytes_in += len(data)
+                if self.decompressor is not None:
+                    data = self.decompressor.decompress(data)
+                # 한 번에 읽은 바이트에 들어 있는 프레임을 모두 디코딩해 둠
+                self._messages = self.decoder.feed(data)
+                self._index = 0
+                chat_heartbeat.touch(self)
+            message = self._messages[self._index].strip()
+            self._index += 1
+            self.messages_in += 1
+            if message != PONG:
+                return message
+
+    async def recv_nickname(self):
+        nickname = await self.recv_text()
+        if nickname is None:
+            raise ConnectionResetError('닉네임 입력 전에 연결이 종료되었습니다.')
+        return nickname
+
+    def close(self, timeout=5.0):
+        """남은 메시지를 보낸 뒤 연결을 닫음 (timeout초 안에 못 보내면 버림)"""
+        chat_heartbeat.monitor.unwatch(self)
+        self.outbox.close()
+        if not self.writer_task.done():
+            # 상대가 읽지 않으면 drain이 끝나지 않으므로 송신 코루틴과 연결이 남지 않게 끊음
+            expiry = asyncio.get_running_loop().call_later(timeout, self._close_expired)
+            self.writer_task.add_done_callback(lambda _: expiry.cancel())
+
+    def _close_expired(self):
+        if not self.writer_task.done():
+            self.abort()
+
+    def abort(self):
+        """남은 메시지를 버리고 즉시 연결을 끊음"""
+        self.outbox.close()
+        self.outbox.pop_all()
+        self.writer.transport.abort()
+
+
+async def claim_nickname(client, nickname):
+    """닉네임을 등록. 여러 워커로 실행 중이면 버스에서 먼저 전체 중복을 확인"""
+    if not nickname or nickname in chat_server.nicknames:
+        return False
+    bus = chat_server.bus
+    if bus is not None and not await bus.claim(nickname):
+        return False
+    if chat_server.register_client(client, nickname):
+        return True
+    if bus is not None:
+        bus.release(nickname)
+    return False
+
+
+async def handle_client(reader, writer):
+    """개별 클라이언트와의 통신 처리 (코루틴)"""
+    client = AsyncClient(reader, writer)
+    addr = client.addr
+    nickname = None
+    try:
+        client.enqueue(chat_server.NICKNAME_PROMPT)
+        nickname = await client.recv_nickname()
+        if nickname == chat_compress.REQUEST:
+            chat_server.negotiate_compression(client)
+            nickname = await client.recv_nickname()
+
+        # 이벤트 루프 안에서는 await 사이에 다른 코루틴이 끼어들 수 있으므로
+        # 중복 확인과 등록은 await 없이 한 번에 처리
+        while not await claim_nickname(client, nickname):
+            client.enqueue(chat_server.NICKNAME_RETRY)
+            nickname = await client.recv_nickname()
+
+        chat_server.announce_join(client, nickname, addr)
+
+        while True:
+            message = await client.recv_text()
+            if message is None or message == '/종료':
+                break
+            if not message:
+                continue
+            chat_server.process_message(client, nickname, message)
+
+    except asyncio.CancelledError:
+        # 서버 종료 중
+        pass
+    except Exception as e:
+        print(f"클라이언트 '{nickname}' 처리 중 오류: {e}")
+    finally:
+        chat_server.remove_client(client)
+        client.close()
+
+
+def raise_open_file_limit():
+    """동시 접속 수만큼 소켓을 열 수 있도록 파일 디스크립터 한도를 올림"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = 65536 if hard == resource.RLIM_INFINITY else hard
+    if soft < target:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError) as e:
+            print(f'파일 디스크립터 한도 변경 실패: {e}')
+
+
+async def serve(host, port, reuse_port=False):
+    server = await asyncio.start_server(handle_client, host, port, backlog=4096,
+                                        reuse_address=True, reuse_port=reuse_port or None)
+    worker = f'[pid {os.getpid()}] ' if reuse_port else ''
+    print(f'{worker}서버가 {port} 포트에서 시작되었습니다. (asyncio 엔진)')
+    heartbeat = asyncio.create_task(chat_heartbeat.monitor.run_async())
+    chat_metrics.metrics.start(chat_server.collect_stats, chat_server.clients_lock,
+                               chat_server.room_message_counts)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        heartbeat.cancel()
+
+
+def start_server(host='127.0.0.1', port=9999):
+    """이벤트 루프 엔진으로 서버를 시작"""
+    raise_open_file_limit()
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        print("\n서버를 종료합니다.")
+    except OSError as e:
+        print(f'서버 시작 오류: {e}')
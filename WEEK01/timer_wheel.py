@@ -0,0 +1,91 @@
+"""계층형 타이머 휠
+
+타이머를 만료 시각별 칸(slot)에 나누어 담아 두고, 시간이 한 칸(tick)씩 지날 때마다
+현재 칸만 확인한다. 등록/취소/만료 처리가 모두 O(1)이라 연결 수만 개의 유휴 시간을
+매번 전부 훑지 않아도 된다.
+
+가장 아래 단계는 slots개의 칸이 각각 tick 하나를 맡고, 위 단계로 갈수록 한 칸이
+맡는 시간이 slots배씩 늘어난다. 위 단계의 칸은 차례가 오면 아래 단계로 내려 보낸다.
+(tick=1초, slots=64, levels=4이면 약 194일까지 표현 가능)
+"""
+
+import math
+
+
+class TimerWheel:
+    """key별로 하나의 타이머를 관리하는 계층형 타이머 휠"""
+
+    def __init__(self, tick=1.0, slots=64, levels=4, start=0.0):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        # 지금까지 처리한 tick 번호
+        self.current = int(start / tick)
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        # key -> (만료 tick, 단계, 칸)
+        self._timers = {}
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def schedule(self, key, when):
+        """key의 타이머를 when 시각에 만료되도록 등록 (이미 있으면 바꿈)"""
+        self.cancel(key)
+        expire = max(int(math.ceil(when / self.tick)), self.current + 1)
+        self._insert(key, expire)
+
+    def cancel(self, key):
+        entry = self._timers.pop(key, None)
+        if entry is not None:
+            _, level, slot = entry
+            self._wheels[level][slot].discard(key)
+
+    def _insert(self, key, expire):
+        delta = expire - self.current
+        level = 0
+        span = self.slots
+        while delta >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        slot = (expire // self.slots ** level) % self.slots
+        self._wheels[level][slot].add(key)
+        self._timers[key] = (expire, level, slot)
+
+    def advance(self, now):
+        """now 시각까지 시간을 진행하고 만료된 key 목록을 반환"""
+        target = int(now / self.tick)
+        expired = []
+        while self.current < target:
+            self.current += 1
+            # 위 단계에서 차례가 된 칸을 아래 단계로 내려 보냄
+            for level in range(1, self.levels):
+                unit = self.slots ** level
+                if self.current % unit:
+                    break
+                self._redistribute(level, (self.current // unit) % self.slots)
+
+            slot = self.current % self.slots
+            bucket = self._wheels[0][slot]
+            if not bucket:
+                continue
+            self._wheels[0][slot] = set()
+            for key in bucket:
+                expire = self._timers[key][0]
+                if expire <= self.current:
+                    del self._timers[key]
+                    expired.append(key)
+                else:
+                    self._insert(key, expire)
+        return expired
+
+    def _redistribute(self, level, slot):
+        bucket = self._wheels[level][slot]
+        if not bucket:
+            return
+        self._wheels[level][slot] = set()
+        for key in bucket:
+            expire = self._timers[key][0]
+            self._insert(key, max(expire, self.current))
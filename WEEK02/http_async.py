@@ -0,0 +1,128 @@
+"""
+asyncio 이벤트 루프로 http_server.MyHttpRequestHandler를 실행하는 엔진
+
+연결마다 스레드를 두지 않고 이벤트 루프 하나가 모든 연결을 기다린다.
+요청 헤더(와 본문)를 모두 받은 뒤에야 핸들러를 실행하므로 느린 클라이언트가
+다른 요청을 막지 않는다. 핸들러는 받은 요청을 메모리 버퍼(rfile)에서 읽고
+응답을 메모리 버퍼(wfile)에 쓰며, 엔진이 그 응답을 한 번에 보낸다.
+
+캐시하지 않는 큰 파일은 핸들러가 파일을 넘겨 두면(defer_file_body) 엔진이 응답 헤더를
+보낸 뒤 loop.sendfile로 보낸다.
+
+핸들러는 이벤트 루프 안에서 실행되므로 오래 걸리는 작업(외부 API 호출 등)을
+핸들러 안에서 기다리면 그동안 다른 요청도 멈춘다.
+"""
+
+import asyncio
+import io
+
+# 요청 줄과 헤더를 합친 최대 크기
+MAX_HEADER_SIZE = 64 * 1024
+# 요청 본문의 최대 크기
+MAX_BODY_SIZE = 1024 * 1024
+
+BAD_REQUEST = (b'HTTP/1.1 400 Bad Request\r\n'
+               b'Content-Length: 0\r\n'
+               b'Connection: close\r\n\r\n')
+
+
+class AsyncHTTPServer:
+    """
+    연결을 받아 요청마다 핸들러를 실행하는 서버 (핸들러가 self.server로 참조)
+    """
+    keep_alive = True
+    # 핸들러가 파일 본문을 직접 보내지 않고 file_body로 넘기게 함
+    defer_file_body = True
+
+    def __init__(self, server_address, handler_class):
+        self.server_address = server_address
+        self.handler_class = handler_class
+        # 핸들러에 정해진 keep-alive 대기 시간을 그대로 사용
+        self.timeout = getattr(handler_class, 'timeout', None) or 5
+
+    def run_handler(self, data, client_address):
+        """
+        요청 하나를 핸들러로 처리하고 (응답 바이트, 연결을 닫을지, 본문 파일)을 반환
+
+        본문 파일은 응답 바이트 뒤에 보낼 (파일, 시작 위치, 바이트 수)이며, 없으면 None이다.
+        """
+        handler = self.handler_class.__new__(self.handler_class)
+        handler.request = None
+        handler.client_address = client_address
+        handler.server = self
+        handler.rfile = io.BytesIO(data)
+        handler.wfile = io.BytesIO()
+        handler.close_connection = True
+        handler.handle_one_request()
+        return handler.wfile.getvalue(), handler.close_connection, handler.file_body
+
+    async def handle_connection(self, reader, writer):
+        client_address = writer.get_extra_info('peername')[:2]
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    # 연결이 끊겼거나 keep-alive 대기 시간이 지남
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(BAD_REQUEST)
+                    break
+                length = content_length(head)
+                if length is None or length > MAX_BODY_SIZE:
+                    writer.write(BAD_REQUEST)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                response, close, file_body = self.run_handler(head + body, client_address)
+                writer.write(response)
+                if file_body is not None:
+                    await self.send_file_body(writer, *file_body)
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send_file_body(self, writer, f, offset, count):
+        """
+        파일 f의 offset부터 count바이트를 보내고 파일을 닫음 (가능하면 os.sendfile 사용)
+        """
+        with f:
+            if count > 0:
+                await writer.drain()
+                await asyncio.get_running_loop().sendfile(writer.transport, f, offset, count)
+
+    async def serve_forever(self):
+        host, port = self.server_address
+        server = await asyncio.start_server(self.handle_connection, host or None, port,
+                                            limit=MAX_HEADER_SIZE, reuse_address=True, backlog=512)
+        async with server:
+            await server.serve_forever()
+
+
+def content_length(head):
+    """
+    요청 헤더의 Content-Length 값 (없으면 0, 잘못되었으면 None)
+    """
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            value = value.strip()
+            return int(value) if value.isdigit() else None
+    return 0
+
+
+def run_server(server_address, handler_class):
+    """
+    이벤트 루프 서버를 실행하는 함수
+    """
+    server = AsyncHTTPServer(server_address, handler_class)
+    port = server_address[1]
+    print(f'{port} 포트에서 웹 서버가 실행 중입니다... (asyncio)')
+    print(f'브라우저에서 http://127.0.0.1:{port} 또는 http://localhost:{port} 으로 접속하세요.')
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\n웹 서버를 종료합니다.")
@@ -0,0 +1,337 @@
+"""
+http_server.py 부하 측정 도구 (localhost 전용)
+
+연결 concurrency개가 duration초 동안 쉬지 않고 요청을 보내고, 초당 요청 수,
+지연 시간 백분위, 오류 수, 서버 CPU 사용량을 출력한다.
+
+- 클라이언트는 asyncio로 소켓에 요청을 직접 쓰고 응답을 읽는다. (http.client보다 가벼움)
+  클라이언트가 먼저 CPU를 다 쓰면 서버가 아니라 클라이언트를 재게 되므로,
+  그럴 때는 --processes로 여러 프로세스에 연결을 나눈다.
+- --no-keep-alive이면 요청마다 새로 연결한다. (연결 시간도 지연 시간에 포함)
+- --path를 여러 번 주면 '경로:비율'대로 섞어서 요청한다.
+- 서버 CPU는 /proc/<pid>/stat으로 잰다. (리눅스, 서버 PID를 알 때만)
+
+사용법:
+- 실행 중인 서버 측정: python http_bench.py --url http://127.0.0.1:8080 --server-pid 1234
+- 엔진과 캐시 켜기/끄기 비교: python http_bench.py --compare --duration 5 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import collections
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+
+DEFAULT_URL = 'http://127.0.0.1:8080'
+# 응답 하나를 기다리는 최대 시간(초)
+REQUEST_TIMEOUT = 10.0
+# 서버를 띄운 뒤 연결을 받을 때까지 기다리는 최대 시간(초)
+SERVER_START_TIMEOUT = 10.0
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http_server.py')
+ENGINES = ('single', 'threads', 'asyncio')
+
+
+def parse_paths(specs):
+    """
+    '경로:비율' 목록을 (경로 목록, 비율 목록)으로 바꿈 (비율을 생략하면 1)
+    """
+    paths, weights = [], []
+    for spec in specs or ['/']:
+        path, _, weight = spec.rpartition(':')
+        if not path or not weight.isdigit():
+            path, weight = spec, '1'
+        if not path.startswith('/'):
+            raise ValueError(f'경로는 /로 시작해야 합니다: {spec}')
+        paths.append(path)
+        weights.append(int(weight))
+    return paths, weights
+
+
+async def read_response(reader):
+    """
+    응답 하나를 읽고 (상태 코드, 본문 크기, 서버가 연결을 닫는지)를 반환
+    """
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.split(b'\r\n')
+    status = int(lines[0].split(None, 2)[1])
+    length = None
+    close = lines[0].startswith(b'HTTP/1.0')
+    for line in lines[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection':
+            close = value.strip().lower() == b'close'
+    if status in (204, 304) or 100 <= status < 200:
+        return status, 0, close
+    if length is None:
+        # 길이를 알 수 없으면 서버가 연결을 닫을 때까지가 본문
+        body = await reader.read()
+        return status, len(body), True
+    await reader.readexactly(length)
+    return status, length, close
+
+
+async def connection_loop(host, port, paths, weights, keep_alive, extra_headers, deadline, result, seed):
+    """
+    deadline까지 한 연결로(keep-alive가 아니면 요청마다 새 연결로) 요청을 반복
+    """
+    rng = random.Random(seed)
+    headers = [f'Host: {host}:{port}'] + list(extra_headers)
+    if not keep_alive:
+        headers.append('Connection: close')
+    requests = {path: '\r\n'.join([f'GET {path} HTTP/1.1'] + headers + ['', '']).encode() for path in paths}
+    reader = writer = None
+    while time.monotonic() < deadline:
+        path = rng.choices(paths, weights)[0] if len(paths) > 1 else paths[0]
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), REQUEST_TIMEOUT)
+            writer.write(requests[path])
+            status, size, close = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            result['errors']['timeout'] += 1
+            close = True
+        except (ConnectionError, asyncio.IncompleteReadError, OSError, ValueError, IndexError) as e:
+            result['errors'][type(e).__name__] += 1
+            close = True
+        else:
+            result['latencies'].append(time.perf_counter() - started)
+            result['bytes'] += size
+            if status >= 400:
+                result['errors'][f'HTTP {status}'] += 1
+            else:
+                result['statuses'][status] += 1
+        if close or not keep_alive:
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+def run_worker(job):
+    """
+    한 프로세스에서 연결 여러 개를 실행하고 결과를 반환 (multiprocessing으로 호출)
+    """
+    host, port, paths, weights, keep_alive, extra_headers, connections, duration, index = job
+    result = {'latencies': [], 'bytes': 0, 'statuses': collections.Counter(), 'errors': collections.Counter()}
+
+    async def run():
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(connection_loop(host, port, paths, weights, keep_alive, extra_headers,
+                                               deadline, result, index * 100000 + i)
+                               for i in range(connections)))
+
+    asyncio.run(run())
+    return result
+
+
+def run_load(url, concurrency, duration, keep_alive=True, path_specs=None, processes=1, gzip=False):
+    """
+    부하를 걸고 모든 프로세스의 결과를 합쳐 반환
+    """
+    parsed = urllib.parse.urlsplit(url)
+    host, port = parsed.hostname or '127.0.0.1', parsed.port or 80
+    paths, weights = parse_paths(path_specs)
+    extra_headers = ['Accept-Encoding: gzip'] if gzip else []
+    processes = max(1, min(processes, concurrency))
+    jobs = []
+    for index in range(processes):
+        # 연결 수를 프로세스마다 고르게 나눔
+        connections = concurrency // processes + (1 if index < concurrency % processes else 0)
+        jobs.append((host, port, paths, weights, keep_alive, extra_headers, connections, duration, index))
+
+    started = time.perf_counter()
+    if processes == 1:
+        results = [run_worker(jobs[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(run_worker, jobs)
+    elapsed = time.perf_counter() - started
+
+    merged = {'latencies': [], 'bytes': 0, 'statuses': collections.Counter(),
+              'errors': collections.Counter(), 'elapsed': elapsed}
+    for result in results:
+        merged['latencies'].extend(result['latencies'])
+        merged['bytes'] += result['bytes']
+        merged['statuses'].update(result['statuses'])
+        merged['errors'].update(result['errors'])
+    merged['latencies'].sort()
+    return merged
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def process_cpu_seconds(pid):
+    """
+    프로세스가 지금까지 쓴 CPU 시간(초) (/proc에서 읽을 수 없으면 None)
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # 프로세스 이름에 공백이 있을 수 있으므로 ')' 뒤부터 나눔 (utime, stime은 14, 15번째 값)
+    fields = data.rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def summarize(result, cpu_seconds=None):
+    """
+    결과를 출력하기 좋은 값으로 정리
+    """
+    latencies = result['latencies']
+    elapsed = result['elapsed']
+    summary = {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p90': percentile(latencies, 90) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': (latencies[-1] if latencies else 0.0) * 1000,
+        'mb_per_sec': result['bytes'] / elapsed / 1024 / 1024 if elapsed else 0.0,
+        'errors': sum(result['errors'].values()),
+        'cpu': None if cpu_seconds is None else cpu_seconds / elapsed * 100,
+    }
+    return summary
+
+
+def print_report(result, cpu_seconds=None):
+    summary = summarize(result, cpu_seconds)
+    print(f"요청 {summary['requests']}개 / {result['elapsed']:.1f}초 = {summary['rps']:.0f} req/s "
+          f"({summary['mb_per_sec']:.1f} MiB/s)")
+    print(f"지연 시간(ms): p50 {summary['p50']:.2f}  p90 {summary['p90']:.2f}  "
+          f"p99 {summary['p99']:.2f}  max {summary['max']:.2f}")
+    statuses = ', '.join(f'{status}: {count}' for status, count in sorted(result['statuses'].items()))
+    print(f'응답 코드: {statuses or "-"}')
+    errors = ', '.join(f'{kind}: {count}' for kind, count in result['errors'].most_common())
+    print(f'오류: {errors or "없음"}')
+    if summary['cpu'] is not None:
+        print(f"서버 CPU: {summary['cpu']:.0f}% (CPU 코어 하나 = 100%)")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(engine, cache=True, root=None, workers=None):
+    """
+    http_server.py를 새 프로세스로 실행하고 연결을 받을 때까지 기다려 (프로세스, 포트)를 반환
+    """
+    port = free_port()
+    command = [sys.executable, SERVER_SCRIPT, '--engine', engine, '--port', str(port), '--no-access-log']
+    if not cache:
+        command.append('--no-cache')
+    if root is not None:
+        command += ['--root', root]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    # 서버는 HTML_FILE을 현재 폴더에서 찾으므로 서버 스크립트가 있는 폴더에서 실행
+    server = subprocess.Popen(command, cwd=os.path.dirname(SERVER_SCRIPT),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'서버가 바로 종료되었습니다: {" ".join(command)}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return server, port
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('서버가 시작되지 않았습니다.')
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(5)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def measure(url, args, server_pid=None):
+    """
+    부하를 걸고 (결과, 서버가 그동안 쓴 CPU 시간)을 반환
+    """
+    cpu_before = process_cpu_seconds(server_pid) if server_pid else None
+    result = run_load(url, args.concurrency, args.duration, keep_alive=not args.no_keep_alive,
+                      path_specs=args.path, processes=args.processes, gzip=args.gzip)
+    cpu_after = process_cpu_seconds(server_pid) if server_pid else None
+    cpu_seconds = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    return result, cpu_seconds
+
+
+def compare(args):
+    """
+    엔진마다 캐시를 켜고 끈 서버를 차례로 띄워 같은 부하를 걸고 결과를 표로 출력
+    """
+    rows = []
+    for engine in args.engines:
+        for cache in (True, False):
+            name = f'{engine}, 캐시 {"켬" if cache else "끔"}'
+            print(f'--- {name} ---')
+            server, port = start_server(engine, cache, args.root, args.workers)
+            try:
+                result, cpu_seconds = measure(f'http://127.0.0.1:{port}', args, server.pid)
+            finally:
+                stop_server(server)
+            print_report(result, cpu_seconds)
+            rows.append((name, summarize(result, cpu_seconds)))
+            print()
+
+    print(f'{"서버":<20}{"req/s":>10}{"p50 ms":>10}{"p99 ms":>10}{"오류":>8}{"CPU %":>8}')
+    for name, summary in rows:
+        cpu = '-' if summary['cpu'] is None else f"{summary['cpu']:.0f}"
+        print(f"{name:<20}{summary['rps']:>10.0f}{summary['p50']:>10.2f}{summary['p99']:>10.2f}"
+              f"{summary['errors']:>8}{cpu:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='http_server.py 부하 측정 도구')
+    parser.add_argument('--url', default=DEFAULT_URL, help=f'측정할 서버 주소 (기본값: {DEFAULT_URL})')
+    parser.add_argument('--concurrency', '-c', type=int, default=50, help='동시 연결 수 (기본값: 50)')
+    parser.add_argument('--duration', '-d', type=float, default=10.0, help='측정 시간(초) (기본값: 10)')
+    parser.add_argument('--no-keep-alive', action='store_true', help='요청마다 새로 연결')
+    parser.add_argument('--path', action='append',
+                        help="요청할 경로와 비율 '경로:비율' (여러 번 지정 가능, 기본값: /)")
+    parser.add_argument('--processes', '-p', type=int, default=1, help='부하를 만들 프로세스 수 (기본값: 1)')
+    parser.add_argument('--gzip', action='store_true', help='Accept-Encoding: gzip을 보냄')
+    parser.add_argument('--server-pid', type=int, default=None, help='CPU 사용량을 잴 서버 프로세스 ID')
+    parser.add_argument('--compare', action='store_true',
+                        help='서버를 직접 띄워 엔진과 캐시 켜기/끄기를 차례로 비교')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=list(ENGINES),
+                        help='--compare에서 비교할 엔진 (기본값: 전부)')
+    parser.add_argument('--root', default=None, help='--compare에서 띄우는 서버의 문서 루트')
+    parser.add_argument('--workers', type=int, default=None, help='--compare에서 threads 엔진의 작업 스레드 수')
+    args = parser.parse_args()
+
+    hostname = urllib.parse.urlsplit(args.url).hostname
+    if not args.compare and hostname not in ('127.0.0.1', 'localhost', '::1'):
+        parser.error('localhost 서버만 측정할 수 있습니다.')
+    if args.compare:
+        compare(args)
+        return
+    result, cpu_seconds = measure(args.url, args, args.server_pid)
+    print_report(result, cpu_seconds)
+
+
+if __name__ == '__main__':
+    main()
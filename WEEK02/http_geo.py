@@ -0,0 +1,191 @@
+"""
+IP 위치 조회를 응답 경로 밖에서 처리하는 백그라운드 조회기
+
+- 요청을 처리하는 스레드는 submit으로 조회를 맡기기만 하고 바로 응답을 보낸다.
+  결과는 작업 스레드가 조회를 마친 뒤 콜백으로 넘긴다. (캐시에 있으면 바로 호출)
+- 결과는 IP별로 LRU + TTL 캐시에 둔다. 찾지 못했거나 조회에 실패한 결과도
+  negative_ttl 동안 캐시해서 같은 IP로 외부 서비스를 반복 호출하지 않는다.
+- 같은 IP의 조회가 이미 진행 중이면 새로 조회하지 않고 콜백만 추가해 함께 받는다.
+- 진행 중인 조회가 max_pending개를 넘으면 조회하지 않고 UNKNOWN으로 바로 응답한다.
+"""
+
+import collections
+import ipaddress
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+LOOKUP_URL = 'http://ip-api.com/json/{ip}'
+# 조회기가 바쁘거나 결과를 알 수 없을 때의 위치 정보
+UNKNOWN = 'Unknown'
+
+
+def fetch_location(ip_address, timeout=2.0):
+    """
+    외부 API로 IP 위치를 조회해 (위치 문자열, 찾았는지)를 반환
+    """
+    try:
+        with urllib.request.urlopen(LOOKUP_URL.format(ip=ip_address), timeout=timeout) as response:
+            data = json.loads(response.read().decode())
+    except Exception as e:
+        # API 요청 실패 시 오류 메시지 반환
+        return f'Could not retrieve location: {e}', False
+    if data.get('status') != 'success':
+        return 'Location not found', False
+    country = data.get('country', 'N/A')
+    city = data.get('city', 'N/A')
+    region = data.get('regionName', 'N/A')
+    return f'{country}, {region}, {city}', True
+
+
+def local_location(ip_address):
+    """
+    조회할 필요가 없는 주소(로컬호스트, 사설망)의 위치 정보, 해당하지 않으면 None
+    """
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return 'Invalid address'
+    if address.is_loopback:
+        return 'Localhost'
+    if address.is_private or address.is_link_local:
+        return 'Private network'
+    return None
+
+
+class GeoResolver:
+    """
+    캐시와 진행 중인 조회를 관리하는 위치 조회기
+    """
+
+    def __init__(self, lookup=fetch_location, workers=4, max_entries=10000,
+                 ttl=3600.0, negative_ttl=300.0, max_pending=1000):
+        # lookup(ip) -> (위치 문자열, 찾았는지)
+        self.lookup = lookup
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_pending = max_pending
+        # IP -> (위치, 만료 시각), 최근에 쓴 IP가 뒤쪽
+        self._cache = collections.OrderedDict()
+        # 조회 중인 IP -> 결과를 기다리는 콜백 목록
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='geo')
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def cached(self, ip_address):
+        """
+        캐시에 있는 위치 정보 (없거나 만료되었으면 None)
+        """
+        with self._lock:
+            return self._cached(ip_address, time.monotonic())
+
+    def _cached(self, ip_address, now):
+        item = self._cache.get(ip_address)
+        if item is None:
+            return None
+        location, expires = item
+        if now >= expires:
+            del self._cache[ip_address]
+            return None
+        self._cache.move_to_end(ip_address)
+        return location
+
+    def submit(self, ip_address, callback):
+        """
+        ip_address의 위치를 callback(위치)으로 넘김 (캐시에 없으면 작업 스레드에서 나중에 호출)
+        """
+        location = local_location(ip_address)
+        if location is None:
+            with self._lock:
+                location = self._cached(ip_address, time.monotonic())
+                if location is not None:
+                    self.hits += 1
+                elif ip_address in self._pending:
+                    # 이미 조회 중이면 결과를 함께 받음
+                    self._pending[ip_address].append(callback)
+                    self.coalesced += 1
+                    return
+                elif len(self._pending) >= self.max_pending:
+                    location = UNKNOWN
+                else:
+                    self._pending[ip_address] = [callback]
+                    self.misses += 1
+                    self._executor.submit(self._resolve, ip_address)
+                    return
+        callback(location)
+
+    def resolve(self, ip_address, timeout=None):
+        """
+        결과가 나올 때까지 기다려 위치를 반환 (timeout초가 지나면 UNKNOWN)
+        """
+        done = threading.Event()
+        result = []
+
+        def callback(location):
+            result.append(location)
+            done.set()
+
+        self.submit(ip_address, callback)
+        done.wait(timeout)
+        return result[0] if result else UNKNOWN
+
+    def _resolve(self, ip_address):
+        try:
+            location, found = self.lookup(ip_address)
+        except Exception as e:
+            location, found = f'Could not retrieve location: {e}', False
+        expires = time.monotonic() + (self.ttl if found else self.negative_ttl)
+        with self._lock:
+            self._cache[ip_address] = (location, expires)
+            self._cache.move_to_end(ip_address)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            callbacks = self._pending.pop(ip_address, [])
+        for callback in callbacks:
+            try:
+                callback(location)
+            except Exception as e:
+                print(f'위치 정보 처리 중 오류: {e}')
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._cache), 'pending': len(self._pending),
+                    'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class DatabaseResolver:
+    """
+    오프라인 IP 데이터베이스(ip_db.IpDatabase)로 바로 조회하는 조회기
+
+    조회가 mmap 이진 탐색 한 번이라 캐시나 작업 스레드 없이 요청 스레드에서 처리한다.
+    GeoResolver와 같은 방법(submit, resolve, stats)으로 쓴다.
+    """
+
+    def __init__(self, database):
+        self.database = database
+        self.lookups = 0
+
+    def submit(self, ip_address, callback):
+        callback(self.resolve(ip_address))
+
+    def resolve(self, ip_address, timeout=None):
+        location = local_location(ip_address)
+        if location is None:
+            self.lookups += 1
+            location = self.database.lookup(ip_address) or 'Location not found'
+        return location
+
+    def stats(self):
+        return {'lookups': self.lookups}
+
+    def close(self):
+        self.database.close()
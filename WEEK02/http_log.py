@@ -0,0 +1,156 @@
+"""
+요청 처리 경로 밖에서 기록하는 접근 로그 (JSON lines)
+
+- 요청을 처리하는 스레드는 기록할 dict를 대기열에 넣기만 한다.
+  JSON 변환과 파일 쓰기는 작업 스레드 하나가 모아서 한다.
+- 작업 스레드는 대기열에 쌓인 기록을 batch_size개까지 한 번에 쓰고,
+  파일은 flush_interval초에 한 번(또는 대기열이 비었을 때) flush한다.
+- 파일이 max_bytes를 넘으면 이름 뒤에 .1, .2, ...를 붙여 backup_count개까지 남기고 새 파일에 쓴다.
+- 대기열이 sample_above개 넘게 쌓이면 sample_every개 중 하나만 기록하고,
+  가득 차면 버린다. 버리거나 건너뛴 개수는 다음에 쓸 때 한 줄로 남긴다.
+"""
+
+import datetime
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+# 접근 로그 파일 경로를 '-'로 주면 표준 출력에 씀
+STDOUT = '-'
+
+
+class AccessLog:
+    """
+    대기열과 작업 스레드로 접근 로그를 쓰는 기록기
+    """
+
+    def __init__(self, path=STDOUT, max_queue=10000, sample_above=None, sample_every=10,
+                 batch_size=256, flush_interval=1.0, max_bytes=10 * 1024 * 1024, backup_count=5):
+        self.path = path
+        self.sample_above = max_queue * 3 // 4 if sample_above is None else sample_above
+        self.sample_every = sample_every
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.dropped = 0
+        self.sampled_out = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._sample_counter = itertools.count()
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._open()
+        self._thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+        self._thread.start()
+
+    def log(self, record):
+        """
+        기록 하나를 대기열에 넣음 (기다리지 않음, 밀려 있으면 건너뛰거나 버림)
+        """
+        if self._queue.qsize() >= self.sample_above and next(self._sample_counter) % self.sample_every:
+            with self._lock:
+                self.sampled_out += 1
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _open(self):
+        if self.path == STDOUT:
+            self._file = sys.stdout
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8', buffering=64 * 1024)
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                older = f'{self.path}.{i}'
+                if os.path.exists(older):
+                    os.replace(older, f'{self.path}.{i + 1}')
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        reported = (0, 0)
+        running = True
+        while running:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                # close()가 넣은 종료 표시 (그 앞의 기록까지 씀)
+                running = False
+                batch = batch[:batch.index(None)]
+
+            lines = [format_record(record) for record in batch]
+            with self._lock:
+                lost = (self.dropped, self.sampled_out)
+            if lost != reported:
+                lines.append(json.dumps({'time': format_time(time.time()), 'event': 'overload',
+                                         'dropped': lost[0] - reported[0],
+                                         'sampled_out': lost[1] - reported[1]}) + '\n')
+                reported = lost
+            try:
+                if lines:
+                    data = ''.join(lines)
+                    self._file.write(data)
+                    self._size += len(data.encode('utf-8'))
+                now = time.monotonic()
+                if not running or now - last_flush >= self.flush_interval or self._queue.empty():
+                    self._file.flush()
+                    last_flush = now
+                if self.path != STDOUT and self._size >= self.max_bytes:
+                    self._rotate()
+            except OSError as e:
+                print(f'접근 로그를 쓰는 중 오류: {e}', file=sys.stderr)
+
+    def stats(self):
+        with self._lock:
+            return {'queued': self._queue.qsize(), 'dropped': self.dropped, 'sampled_out': self.sampled_out}
+
+    def close(self, timeout=5.0):
+        """
+        대기열에 남은 기록을 모두 쓰고 작업 스레드를 끝냄
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).astimezone().isoformat(timespec='milliseconds')
+
+
+def format_record(record):
+    """
+    기록 하나를 JSON 한 줄로 바꿈 ('time'은 time.time() 값이면 ISO 8601 문자열로 바꿈)
+    """
+    timestamp = record.get('time')
+    if isinstance(timestamp, float):
+        record = dict(record, time=format_time(timestamp))
+    return json.dumps(record, ensure_ascii=False) + '\n'
@@ -1,82 +1,416 @@
+import argparse
 import http.server
+import queue
 import socketserver
-import datetime
-import urllib.request
-import json
+import os
+import threading
+import time
+
+import http_geo
+import http_log
+import http_static
 
 PORT = 8080
 HTML_FILE = 'index.html'
+# keep-alive 연결에서 다음 요청을 기다리는 최대 시간(초)
+KEEP_ALIVE_TIMEOUT = 5
+# 스레드 풀 엔진의 작업 스레드 수와 처리를 기다릴 수 있는 연결 수
+DEFAULT_WORKERS = 32
+DEFAULT_BACKLOG = 256
+ENGINES = ('single', 'threads', 'asyncio')
+
+# 위치 조회를 기다리는 최대 시간(초)
+GEO_TIMEOUT = 2.0
+
+# IP 위치 조회기 (결과를 IP별로 캐시하고, 같은 IP의 조회는 한 번만 함)
+geo_resolver = http_geo.GeoResolver(lambda ip: http_geo.fetch_location(ip, GEO_TIMEOUT))
+# 정적 파일 캐시 (run_server에서 캐시를 끄면 None, 요청마다 파일을 읽음)
+static_cache = http_static.StaticCache()
+# 파일을 보낼 문서 루트의 실제 경로 (None이면 모든 경로에 index.html을 보냄)
+document_root = None
+# 접근 로그 기록기 (run_server에서 만듦, None이면 기록하지 않음)
+access_log = None
+
+# 스레드 풀의 대기열이 가득 찼을 때 바로 보내는 응답
+SERVICE_UNAVAILABLE = (b'HTTP/1.1 503 Service Unavailable\r\n'
+                       b'Content-Type: text/plain; charset=utf-8\r\n'
+                       b'Content-Length: 20\r\n'
+                       b'Retry-After: 1\r\n'
+                       b'Connection: close\r\n\r\n'
+                       b'Server is too busy.\n')
 
 def get_location_info(ip_address):
     """
     IP 주소를 기반으로 위치 정보를 조회하는 함수 (보너스 과제)
+
+    결과가 나올 때까지 기다린다. 요청 처리 중에는 geo_resolver.submit으로
+    기다리지 않고 조회를 맡긴다.
     """
-    # 로컬호스트 주소는 위치 조회를 건너뜁니다.
-    if ip_address == '127.0.0.1':
-        return 'Localhost'
-    
-    try:
-        # 외부 API를 사용하여 IP 위치 정보 조회
-        url = f'http://ip-api.com/json/{ip_address}'
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read().decode())
-            if data['status'] == 'success':
-                country = data.get('country', 'N/A')
-                city = data.get('city', 'N/A')
-                region = data.get('regionName', 'N/A')
-                return f'{country}, {region}, {city}'
-            else:
-                return 'Location not found'
-    except Exception as e:
-        # API 요청 실패 시 오류 메시지 반환
-        return f'Could not retrieve location: {e}'
+    return geo_resolver.resolve(ip_address, GEO_TIMEOUT)
 
 
 class MyHttpRequestHandler(http.server.BaseHTTPRequestHandler):
     """
     HTTP 요청을 처리하는 커스텀 핸들러 클래스
     """
+    # 응답마다 Content-Length를 보내므로 한 연결에서 여러 요청을 처리할 수 있음 (keep-alive)
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+    # 헤더와 본문을 따로 보낼 때 Nagle 알고리즘 때문에 응답이 늦어지지 않도록 함
+    disable_nagle_algorithm = True
+    # asyncio 엔진이 보낼 응답 본문 파일 (파일, 시작 위치, 바이트 수)
+    file_body = None
+    # 접근 로그에 남길 응답 상태 코드와 본문 크기
+    status_code = None
+    response_bytes = 0
+
+    def end_headers(self):
+        # 연결을 계속 붙잡아 두면 안 되는 서버(단일 스레드, 대기 중인 연결이 있는 스레드 풀)이면 응답 후 닫음
+        if not getattr(self.server, 'keep_alive', True):
+            self.send_header('Connection', 'close')
+        super().end_headers()
+
+    def send_header(self, keyword, value):
+        if keyword == 'Content-Length':
+            self.response_bytes = int(value)
+        super().send_header(keyword, value)
+
+    def log_request(self, code='-', size='-'):
+        # 요청마다 표준 오류에 출력하지 않고 상태 코드만 기억해 두었다가 접근 로그에 남김
+        if isinstance(code, int):
+            self.status_code = int(code)
+
     def do_GET(self):
-        # 1. 서버 콘솔에 접속 정보 출력
-        current_time = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # 1. 응답을 보낸 뒤 접근 로그에 기록
+        requested = time.time()
+        started = time.perf_counter()
+        self.status_code = None
+        self.response_bytes = 0
+        try:
+            self.send_get_response()
+        finally:
+            self.log_access(requested, started)
+
+    def log_access(self, requested, started):
+        """
+        위치 조회는 백그라운드에 맡기고, 조회가 끝나면 접근 로그에 기록
+        """
+        if access_log is None:
+            return
         client_ip = self.client_address[0]
-        location = get_location_info(client_ip)
-        
-        print(f'접속 시간: {current_time}')
-        print(f'클라이언트 IP: {client_ip}')
-        print(f'위치 정보: {location}\n')
+        record = {
+            'time': requested,
+            'ip': client_ip,
+            'location': None,
+            'method': self.command,
+            'path': self.path,
+            'status': self.status_code,
+            'bytes': self.response_bytes,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+        def write(location):
+            record['location'] = location
+            access_log.log(record)
+
+        geo_resolver.submit(client_ip, write)
 
+    def send_get_response(self):
+        if document_root is not None:
+            self.send_document()
+            return
+        if static_cache is None:
+            self.send_file_uncached()
+            return
         try:
-            # 2. index.html 파일 읽기
+            # 2. 캐시에서 index.html 응답 가져오기 (파일이 바뀌었으면 다시 읽음)
+            entry = static_cache.get(HTML_FILE)
+        except FileNotFoundError:
+            self.send_not_found()
+            return
+        if entry is None:
+            self.send_file_uncached()
+        else:
+            self.send_cached(entry)
+
+    def send_document(self):
+        """
+        문서 루트에서 요청 경로의 파일을 보냄 (작은 파일은 캐시에서, 큰 파일은 sendfile로)
+        """
+        path = http_static.resolve_path(document_root, self.path)
+        try:
+            if path is None:
+                raise FileNotFoundError(self.path)
+            entry = static_cache.get(path) if static_cache is not None else None
+            if entry is None:
+                self.send_large_file(path)
+            else:
+                self.send_cached(entry)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            self.send_not_found('요청한 파일을 찾을 수 없습니다.')
+
+    def requested_range(self, size, etag, mtime):
+        """
+        Range 요청이면 보낼 (시작, 끝) 또는 http_static.UNSATISFIABLE, 아니면 None
+
+        If-Range가 현재 파일과 맞지 않으면 (그 사이 파일이 바뀌었으면) 전체를 보낸다.
+        """
+        range_header = self.headers.get('Range')
+        if range_header is None:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range is not None:
+            if_range = if_range.strip()
+            if if_range.startswith(('"', 'W/')):
+                # 약한 ETag는 맞는 것으로 보지 않음 (강한 비교)
+                if if_range != etag:
+                    return None
+            elif http_static.parse_http_date(if_range) != mtime:
+                return None
+        return http_static.parse_range(range_header, size)
+
+    def send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+    def send_range_not_satisfiable(self, size):
+        self.send_response(416)
+        self.send_header('Content-Range', f'bytes */{size}')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_cached(self, entry):
+        """
+        캐시된 응답을 보냄 (클라이언트의 사본이 최신이면 304, gzip을 허용하면 압축본)
+        """
+        if entry.not_modified(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since')):
+            self.send_not_modified(entry.etag)
+            return
+
+        byte_range = self.requested_range(len(entry.body), entry.etag, entry.mtime)
+        if byte_range == http_static.UNSATISFIABLE:
+            self.send_range_not_satisfiable(len(entry.body))
+            return
+        # 범위 요청에는 압축하지 않은 본문의 일부를 보냄
+        use_gzip = (byte_range is None and entry.gzip_body is not None
+                    and http_static.accepts_gzip(self.headers.get('Accept-Encoding')))
+        body = entry.gzip_body if use_gzip else entry.body
+        if byte_range is None:
+            self.send_response(200)
+        else:
+            start, end = byte_range
+            body = memoryview(body)[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(entry.body)}')
+        self.send_header('Content-type', entry.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', entry.gzip_etag if use_gzip else entry.etag)
+        self.send_header('Last-Modified', entry.last_modified)
+        # 브라우저가 저장해 두되 매번 ETag로 최신인지 확인하게 함
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Accept-Ranges', 'bytes')
+        if entry.gzip_body is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_large_file(self, path):
+        """
+        캐시하지 않는 큰 파일을 보냄 (내용은 파이썬으로 읽지 않고 sendfile로 소켓에 바로 보냄)
+        """
+        f = open(path, 'rb')
+        try:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            mtime = int(stat.st_mtime)
+            etag = http_static.file_etag(stat)
+            if http_static.not_modified(self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since'),
+                                        (etag,), mtime):
+                self.send_not_modified(etag)
+                return
+
+            byte_range = self.requested_range(size, etag, mtime)
+            if byte_range == http_static.UNSATISFIABLE:
+                self.send_range_not_satisfiable(size)
+                return
+            if byte_range is None:
+                start, end = 0, size - 1
+                self.send_response(200)
+            else:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-type', http_static.content_type_for(path))
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', self.date_time_string(mtime))
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+            # 파일은 send_file_body가 닫음
+            self.send_file_body(f, start, end - start + 1)
+            f = None
+        finally:
+            if f is not None:
+                f.close()
+
+    def send_file_body(self, f, offset, count):
+        """
+        파일 f의 offset부터 count바이트를 응답 본문으로 보내고 파일을 닫음
+
+        응답 헤더는 end_headers에서 이미 소켓으로 보냈으므로, 본문은 socket.sendfile
+        (리눅스에서는 os.sendfile)로 커널이 파일에서 소켓으로 바로 복사한다.
+        asyncio 엔진에서는 소켓을 엔진이 다루므로 파일을 넘겨 두고 엔진이 보낸다.
+        """
+        if getattr(self.server, 'defer_file_body', False):
+            self.file_body = (f, offset, count)
+            return
+        with f:
+            if count > 0:
+                self.connection.sendfile(f, offset, count)
+
+    def send_file_uncached(self):
+        """
+        캐시 없이 요청마다 파일을 읽어 보냄
+        """
+        try:
+            # index.html 파일 읽기
             with open(HTML_FILE, 'r', encoding='utf-8') as file:
                 html_content = file.read()
             
-            # 3. 클라이언트에 200 OK 응답 및 헤더 전송
+            # 클라이언트에 200 OK 응답 및 헤더 전송
+            body = html_content.encode('utf-8')
             self.send_response(200)
             self.send_header('Content-type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
             
-            # 4. HTML 내용을 인코딩하여 클라이언트에 전송
-            self.wfile.write(html_content.encode('utf-8'))
+            # HTML 내용을 인코딩하여 클라이언트에 전송
+            self.wfile.write(body)
 
         except FileNotFoundError:
-            error_message = '<h1>404 Not Found</h1><p>index.html 파일을 찾을 수 없습니다.</p>'
-            
-            self.send_response(404)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(error_message.encode('utf-8'))
+            self.send_not_found()
+
+    def send_not_found(self, message=None):
+        error_message = f'<h1>404 Not Found</h1><p>{message or "index.html 파일을 찾을 수 없습니다."}</p>'
+        body = error_message.encode('utf-8')
+        
+        self.send_response(404)
+        self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if message is None:
             print(f'오류: {HTML_FILE} 파일을 찾을 수 없습니다.')
 
 
-def run_server():
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """
+    정해진 수의 작업 스레드가 연결을 나누어 처리하는 서버
+
+    accept한 연결은 크기가 정해진 대기열에 넣고, 작업 스레드가 하나씩 꺼내 처리한다.
+    대기열이 가득 차면 연결을 쌓아 두지 않고 바로 503으로 거절한다.
+    다른 연결이 기다리고 있으면 keep-alive 연결은 응답 후 닫아 작업 스레드를 넘겨준다.
+    """
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, backlog=DEFAULT_BACKLOG):
+        super().__init__(server_address, handler_class)
+        self._pending = queue.Queue(maxsize=backlog)
+        self._workers = []
+        for _ in range(workers):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @property
+    def keep_alive(self):
+        return self._pending.empty()
+
+    def process_request(self, request, client_address):
+        try:
+            self._pending.put_nowait((request, client_address))
+        except queue.Full:
+            try:
+                request.sendall(SERVICE_UNAVAILABLE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._workers:
+            self._pending.put(None)
+
+
+def run_server(port=PORT, engine='single', workers=DEFAULT_WORKERS, cache=True, ip_db=None, root=None,
+               log_path=http_log.STDOUT, cache_bytes=http_static.MAX_CACHE_BYTES):
     """
     웹 서버를 실행하는 함수
+
+    engine이 'single'이면 요청을 하나씩 처리하고(keep-alive 사용 안 함),
+    'threads'이면 작업 스레드 workers개로, 'asyncio'이면 이벤트 루프 하나로 처리한다.
+    cache가 False이면 정적 파일 캐시 없이 요청마다 파일을 읽고, 켜져 있으면 캐시가
+    cache_bytes바이트까지만 메모리를 쓴다.
+    ip_db가 주어지면 외부 API 대신 오프라인 IP 데이터베이스 파일로 위치를 조회한다.
+    root가 주어지면 그 폴더를 문서 루트로 삼아 요청 경로의 파일을 보낸다.
+    접근 로그는 log_path 파일에 JSON lines로 쓴다. ('-'이면 표준 출력, None이면 쓰지 않음)
     """
-    # TCPServer를 사용하여指定된 포트와 핸들러로 서버 생성
-    with socketserver.TCPServer(('', PORT), MyHttpRequestHandler) as httpd:
-        print(f'{PORT} 포트에서 웹 서버가 실행 중입니다...')
-        print('브라우저에서 http://127.0.0.1:8080 또는 http://localhost:8080 으로 접속하세요.')
+    global static_cache, geo_resolver, document_root, access_log
+    static_cache = http_static.StaticCache(max_bytes=cache_bytes) if cache else None
+    if root is not None:
+        document_root = os.path.realpath(root)
+        print(f'문서 루트: {document_root}')
+    if ip_db is not None:
+        import ip_db as ip_database
+        geo_resolver = http_geo.DatabaseResolver(ip_database.IpDatabase(ip_db))
+    if log_path is not None:
+        access_log = http_log.AccessLog(log_path)
+    try:
+        if engine == 'asyncio':
+            import http_async
+            http_async.run_server(('', port), MyHttpRequestHandler)
+        else:
+            serve(port, engine, workers)
+    finally:
+        if access_log is not None:
+            # 남은 접근 로그를 모두 쓰고 종료
+            access_log.close()
+
+
+def serve(port, engine, workers):
+    """
+    single 또는 threads 엔진으로 서버를 실행
+    """
+    if engine == 'threads':
+        httpd = ThreadPoolHTTPServer(('', port), MyHttpRequestHandler, workers)
+    else:
+        # TCPServer를 사용하여 지정된 포트와 핸들러로 서버 생성
+        socketserver.TCPServer.allow_reuse_address = True
+        httpd = socketserver.TCPServer(('', port), MyHttpRequestHandler)
+        # 한 연결이 서버 전체를 붙잡지 않도록 응답마다 연결을 닫음
+        httpd.keep_alive = False
+    with httpd:
+        print(f'{port} 포트에서 웹 서버가 실행 중입니다... ({engine})')
+        print(f'브라우저에서 http://127.0.0.1:{port} 또는 http://localhost:{port} 으로 접속하세요.')
         try:
             # 서버를 계속 실행
             httpd.serve_forever()
@@ -85,5 +419,35 @@ def run_server():
             print("\n웹 서버를 종료합니다.")
             httpd.server_close()
 
+
+def main():
+    """
+    명령행 인자에 따라 서버 엔진을 선택해 실행
+    """
+    parser = argparse.ArgumentParser(description='웹 서버')
+    parser.add_argument('--port', type=int, default=PORT, help=f'포트 번호 (기본값: {PORT})')
+    parser.add_argument('--engine', choices=ENGINES, default='single',
+                        help='single: 요청을 하나씩 처리, threads: 스레드 풀, asyncio: 이벤트 루프 (기본값: single)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'threads 엔진의 작업 스레드 수 (기본값: {DEFAULT_WORKERS})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='정적 파일 캐시를 끄고 요청마다 파일을 읽음 (성능 비교용)')
+    parser.add_argument('--cache-mb', type=int, default=http_static.MAX_CACHE_BYTES // (1024 * 1024),
+                        help='정적 파일 캐시가 쓸 최대 메모리(MB), 넘으면 오래 쓰지 않은 파일부터 내보냄 '
+                             f'(기본값: {http_static.MAX_CACHE_BYTES // (1024 * 1024)})')
+    parser.add_argument('--ip-db', default=None,
+                        help='위치 조회에 쓸 오프라인 IP 데이터베이스 파일 (ip_db.py compile로 생성)')
+    parser.add_argument('--root', default=None,
+                        help='파일을 보낼 문서 루트 폴더 (지정하지 않으면 모든 경로에 index.html을 보냄)')
+    parser.add_argument('--access-log', default=http_log.STDOUT,
+                        help='접근 로그(JSON lines)를 쓸 파일, 크기가 커지면 번호를 붙여 넘김 (기본값: - 표준 출력)')
+    parser.add_argument('--no-access-log', action='store_true', help='접근 로그를 쓰지 않음')
+    args = parser.parse_args()
+    if args.cache_mb < 1:
+        parser.error('--cache-mb는 1 이상이어야 합니다.')
+    run_server(args.port, args.engine, args.workers, cache=not args.no_cache, ip_db=args.ip_db, root=args.root,
+               log_path=None if args.no_access_log else args.access_log, cache_bytes=args.cache_mb * 1024 * 1024)
+
+
 if __name__ == '__main__':
-    run_server()
\ No newline at end of file
+    main()
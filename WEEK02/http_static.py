@@ -0,0 +1,264 @@
+"""
+정적 파일 캐시
+
+파일마다 응답에 쓸 바이트와 gzip으로 압축한 바이트, ETag, Last-Modified를 한 번만
+만들어 두고 요청마다 그대로 보낸다. 파일이 바뀌었는지는 check_interval초에 한 번만
+os.stat으로 mtime과 크기를 비교해 확인하므로, 그 사이의 요청은 파일을 전혀 건드리지 않는다.
+캐시가 쓰는 메모리(원본과 압축본 바이트의 합)는 max_bytes로 제한하고, 넘으면 가장 오래
+쓰지 않은 파일부터 내보낸다.
+
+문서 루트의 요청 경로를 파일 경로로 바꾸는 resolve_path와 Range 헤더를 해석하는
+parse_range도 여기에 둔다.
+"""
+
+import email.utils
+import gzip
+import collections
+import hashlib
+import mimetypes
+import os
+import stat
+import threading
+import time
+import urllib.parse
+
+# 이 크기보다 큰 파일은 캐시하지 않음
+MAX_ENTRY_SIZE = 1024 * 1024
+# 캐시 전체가 쓸 수 있는 최대 바이트 수 (기본값)
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# gzip으로 압축해 둘 Content-Type
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+# 압축 결과가 이보다 크게 줄지 않으면 압축본을 쓰지 않음
+MIN_GZIP_SAVING = 0.9
+# parse_range: 요청한 범위가 파일 밖이라 보낼 수 없음 (416)
+UNSATISFIABLE = 'unsatisfiable'
+
+
+class StaticEntry:
+    """
+    파일 하나의 캐시된 응답
+    """
+    __slots__ = ('path', 'body', 'gzip_body', 'content_type', 'etag', 'gzip_etag', 'last_modified',
+                 'mtime', 'mtime_ns', 'size', 'checked', 'cost')
+
+    def __init__(self, path, body, stat):
+        self.path = path
+        self.body = body
+        self.content_type = content_type_for(path)
+        self.mtime = int(stat.st_mtime)
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.checked = time.monotonic()
+        # 내용이 같으면 같은 ETag (서버를 다시 시작하거나 여러 서버여도 같음)
+        self.etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        # 압축본은 바이트가 다른 표현이므로 ETag를 구분
+        self.gzip_etag = self.etag[:-1] + '-gz"'
+        self.last_modified = email.utils.formatdate(self.mtime, usegmt=True)
+        self.gzip_body = None
+        if self.content_type.startswith(COMPRESSIBLE_TYPES):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body) * MIN_GZIP_SAVING:
+                self.gzip_body = compressed
+        # 캐시에서 차지하는 바이트 수
+        self.cost = len(body) + len(self.gzip_body or b'')
+
+    def not_modified(self, if_none_match, if_modified_since):
+        """
+        조건부 요청 헤더로 보아 클라이언트가 가진 사본을 그대로 써도 되는지
+        """
+        return not_modified(if_none_match, if_modified_since, (self.etag, self.gzip_etag), self.mtime)
+
+
+class StaticCache:
+    """
+    경로별 StaticEntry 캐시 (전체 크기가 max_bytes를 넘으면 가장 오래 쓰지 않은 항목부터 내보냄)
+    """
+
+    def __init__(self, check_interval=1.0, max_entry_size=MAX_ENTRY_SIZE, max_bytes=MAX_CACHE_BYTES):
+        self.check_interval = check_interval
+        self.max_entry_size = max_entry_size
+        self.max_bytes = max_bytes
+        # 최근에 쓴 항목이 뒤쪽
+        self._entries = collections.OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        path의 캐시된 응답을 반환
+
+        파일이 없으면 FileNotFoundError를 일으키고, 캐시하기에 너무 크면 None을 반환한다.
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked < self.check_interval:
+            return entry
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._remove(path)
+            raise
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            entry.checked = now
+            return entry
+        if stat.st_size > self.max_entry_size:
+            return None
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        # 읽는 도중 파일이 바뀌었을 수 있으므로 읽은 뒤의 정보를 기록
+        entry = StaticEntry(path, body, os.stat(path))
+        with self._lock:
+            self._remove(path)
+            if entry.cost <= self.max_bytes:
+                self._entries[path] = entry
+                self._total += entry.cost
+                while self._total > self.max_bytes:
+                    _, oldest = self._entries.popitem(last=False)
+                    self._total -= oldest.cost
+        return entry
+
+    def _remove(self, path):
+        # _lock을 잡은 상태에서 호출
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._total -= entry.cost
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+
+def content_type_for(path):
+    """
+    파일 이름으로 Content-Type을 정함 (텍스트는 UTF-8로 가정)
+    """
+    content_type, _ = mimetypes.guess_type(path)
+    if content_type is None:
+        return 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        return content_type + '; charset=utf-8'
+    return content_type
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Accept-Encoding 헤더가 gzip을 허용하는지 (q=0이면 허용하지 않음)
+    """
+    if not accept_encoding:
+        return False
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        if coding.strip().lower() in ('gzip', '*'):
+            name, _, value = params.strip().partition('=')
+            if name.strip() != 'q':
+                return True
+            try:
+                return float(value) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def not_modified(if_none_match, if_modified_since, etags, mtime):
+    """
+    조건부 요청 헤더로 보아 ETag가 etags 중 하나이고 수정 시각이 mtime인 사본을 그대로 써도 되는지
+    """
+    if if_none_match is not None:
+        # If-None-Match가 있으면 If-Modified-Since는 보지 않음 (RFC 9110)
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag == '*' or tag in etags:
+                return True
+        return False
+    if if_modified_since is not None:
+        since = parse_http_date(if_modified_since)
+        return since is not None and mtime <= since
+    return False
+
+
+def parse_http_date(value):
+    """
+    HTTP 날짜 헤더 값을 타임스탬프로 바꿈 (잘못된 형식이면 None)
+    """
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def file_etag(stat):
+    """
+    캐시하지 않는 큰 파일의 ETag (내용 대신 크기와 수정 시각으로 만듦)
+    """
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def resolve_path(root, url_path):
+    """
+    요청 경로를 문서 루트 root 아래의 파일 경로로 바꿈 (루트 밖을 가리키면 None)
+
+    '..'이나 숨김 파일('.'로 시작하는 이름) 조각이 있으면 거절하고, 심볼릭 링크를 따라간
+    실제 경로가 루트 밖이어도 거절한다. 디렉터리를 가리키면 그 안의 index.html을 쓴다.
+    root는 os.path.realpath로 정리한 절대 경로여야 한다.
+    """
+    path = urllib.parse.unquote(url_path.split('?', 1)[0].split('#', 1)[0])
+    if '\0' in path or '\\' in path:
+        return None
+    parts = [part for part in path.split('/') if part and part != '.']
+    if any(part.startswith('.') for part in parts):
+        return None
+    real = os.path.realpath(os.path.join(root, *parts))
+    if real != root and not real.startswith(root.rstrip(os.sep) + os.sep):
+        return None
+    try:
+        mode = os.stat(real).st_mode
+    except OSError:
+        # 없는 파일은 여는 쪽에서 FileNotFoundError로 처리
+        return real
+    if stat.S_ISDIR(mode):
+        return os.path.join(real, 'index.html')
+    if not stat.S_ISREG(mode):
+        # FIFO나 장치 파일은 열기만 해도 멈출 수 있으므로 보내지 않음
+        return None
+    return real
+
+
+def parse_range(range_header, size):
+    """
+    Range 헤더를 해석해 보낼 (시작, 끝) 바이트 위치를 반환 (끝 포함)
+
+    범위가 하나인 'bytes=' 요청만 처리한다. 헤더가 없거나, 형식이 잘못되었거나,
+    여러 범위를 요청하면 None을 반환하고 파일 전체를 보낸다. (RFC 9110에서 허용)
+    범위가 파일 밖이면 UNSATISFIABLE을 반환한다.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash or not (first.isdigit() or last.isdigit()) or \
+            (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # 'bytes=-n': 마지막 n바이트
+        length = int(last)
+        if length == 0 or size == 0:
+            return UNSATISFIABLE
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        return UNSATISFIABLE
+    return start, min(end, size - 1)
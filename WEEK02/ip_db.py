@@ -0,0 +1,257 @@
+"""
+오프라인 IP 대역 -> 위치 데이터베이스
+
+CSV(시작 IP, 끝 IP, ..., 국가, 지역, 도시, ...)를 한 번 컴파일해 정렬된 배열 파일로 만들고,
+서버는 그 파일을 mmap으로 열어 bisect로 찾는다. 표 전체를 파이썬 객체로 읽지 않으므로
+행이 수백만 개여도 시작이 빠르고, 조회 한 번은 이진 탐색 한 번(수 마이크로초)이다.
+
+파일 구조 (모든 구역은 8바이트 단위로 정렬):
+- 헤더: MAGIC, IPv4 대역 수, IPv6 대역 수, 위치 수, 위치 문자열 크기
+- IPv4: 시작 주소 uint32 배열, 끝 주소 uint32 배열, 위치 번호 uint32 배열
+- IPv6: 시작 주소 16바이트(빅 엔디언) 배열, 끝 주소 16바이트 배열, 위치 번호 uint32 배열
+- 위치: 문자열 시작 위치 uint32 배열(위치 수 + 1개), UTF-8 문자열을 이어 붙인 바이트
+
+uint32 배열은 리틀 엔디언으로 저장하고, 16바이트 주소는 빅 엔디언이라 바이트 비교가
+곧 숫자 비교다.
+
+위치 문자열은 '국가, 지역, 도시'이고, 세 값을 읽을 열 번호(0부터)는 --columns로 정한다.
+기본값 3,4,5는 DB-IP의 dbip-city-lite.csv 형식(시작 IP, 끝 IP, 대륙, 국가, 지역, 도시, ...)에
+맞춘 것이다.
+
+사용법:
+- python ip_db.py compile dbip-city-lite.csv geo.ipdb
+- python ip_db.py compile 다른형식.csv geo.ipdb --columns 2,3,4
+- python ip_db.py lookup geo.ipdb 8.8.8.8
+- python http_server.py --ip-db geo.ipdb
+"""
+
+import array
+import bisect
+import csv
+import ipaddress
+import mmap
+import socket
+import struct
+import sys
+
+MAGIC = b'IPDB\x01\x00\x00\x00'
+# IPv4-mapped IPv6 주소(::ffff:a.b.c.d)의 앞 12바이트
+_V4_MAPPED_PREFIX = b'\x00' * 10 + b'\xff\xff'
+_HEADER = struct.Struct('<8sQQQQ')
+# CSV에서 국가, 지역, 도시를 읽을 열 번호 (dbip-city-lite.csv 형식)
+DEFAULT_COLUMNS = (3, 4, 5)
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+def _u32_array(values):
+    data = array.array('I', values)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def compile_csv(csv_path, db_path, columns=DEFAULT_COLUMNS):
+    """
+    CSV를 읽어 데이터베이스 파일을 만들고 (IPv4 대역 수, IPv6 대역 수, 건너뛴 행 수)를 반환
+
+    위치는 columns 열들의 값을 ', '로 이어 만든다. (없는 열은 N/A)
+    시작 주소 순으로 정렬한 뒤 앞 대역과 겹치는 대역은 건너뛴다.
+    """
+    ranges4 = []
+    ranges6 = []
+    locations = {}
+    skipped = 0
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                start = ipaddress.ip_address(row[0].strip())
+                end = ipaddress.ip_address(row[1].strip())
+            except ValueError:
+                # 머리글 행이나 잘못된 주소
+                skipped += 1
+                continue
+            if start.version != end.version or start > end:
+                skipped += 1
+                continue
+            fields = [(row[column].strip() if column < len(row) else '') or 'N/A' for column in columns]
+            location = ', '.join(fields) if fields else 'N/A'
+            index = locations.setdefault(location, len(locations))
+            (ranges4 if start.version == 4 else ranges6).append((int(start), int(end), index))
+
+    ranges4 = _without_overlaps(ranges4)
+    ranges6 = _without_overlaps(ranges6)
+    skipped += ranges4[3] + ranges6[3]
+    names = [name.encode('utf-8') for name in locations]
+
+    with open(db_path, 'wb') as out:
+        out.write(_HEADER.pack(MAGIC, len(ranges4[0]), len(ranges6[0]), len(names),
+                               sum(len(name) for name in names)))
+        starts, ends, indexes, _ = ranges4
+        for data in (_u32_array(starts), _u32_array(ends), _u32_array(indexes)):
+            _write_aligned(out, data)
+        starts, ends, indexes, _ = ranges6
+        _write_aligned(out, b''.join(value.to_bytes(16, 'big') for value in starts))
+        _write_aligned(out, b''.join(value.to_bytes(16, 'big') for value in ends))
+        _write_aligned(out, _u32_array(indexes))
+        offsets = [0]
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+        _write_aligned(out, _u32_array(offsets))
+        _write_aligned(out, b''.join(names))
+    return len(ranges4[0]), len(ranges6[0]), skipped
+
+
+def _without_overlaps(ranges):
+    """
+    정렬한 뒤 겹치는 대역을 뺀 (시작 목록, 끝 목록, 위치 번호 목록, 뺀 개수)
+    """
+    ranges.sort()
+    starts, ends, indexes = [], [], []
+    dropped = 0
+    for start, end, index in ranges:
+        if ends and start <= ends[-1]:
+            dropped += 1
+            continue
+        starts.append(start)
+        ends.append(end)
+        indexes.append(index)
+    return starts, ends, indexes, dropped
+
+
+def _write_aligned(out, data):
+    out.write(data)
+    padding = _align(len(data)) - len(data)
+    if padding:
+        out.write(b'\0' * padding)
+
+
+class _Keys128:
+    """
+    mmap 안의 16바이트 주소 배열을 bisect가 쓸 수 있는 시퀀스로 보여 줌
+    """
+
+    def __init__(self, view, count):
+        self._view = view
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return bytes(self._view[i * 16:i * 16 + 16])
+
+
+class IpDatabase:
+    """
+    compile_csv로 만든 파일을 mmap으로 열어 조회
+    """
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            # uint32 배열을 변환 없이 그대로 읽기 위해 리틀 엔디언으로 저장함
+            raise ValueError('빅 엔디언 시스템에서는 IP 데이터베이스를 열 수 없습니다.')
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count4, count6, count_locations, names_size = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f'IP 데이터베이스 파일이 아닙니다: {path}')
+        view = memoryview(self._map)
+        self._views = []
+        pos = _HEADER.size
+
+        def section(size, fmt=None):
+            nonlocal pos
+            part = view[pos:pos + size]
+            pos += _align(size)
+            if fmt is not None:
+                part = part.cast(fmt)
+            self._views.append(part)
+            return part
+
+        u32 = 'I'
+        self._starts4 = section(4 * count4, u32)
+        self._ends4 = section(4 * count4, u32)
+        self._indexes4 = section(4 * count4, u32)
+        self._starts6 = _Keys128(section(16 * count6), count6)
+        self._ends6 = _Keys128(section(16 * count6), count6)
+        self._indexes6 = section(4 * count6, u32)
+        self._offsets = section(4 * (count_locations + 1), u32)
+        self._names = section(names_size)
+        self._views.append(view)
+        self.count4 = count4
+        self.count6 = count6
+
+    def _location(self, index):
+        return bytes(self._names[self._offsets[index]:self._offsets[index + 1]]).decode('utf-8')
+
+    def lookup(self, ip_address):
+        """
+        IP 주소 문자열이 속한 대역의 위치 (없으면 None, 주소 형식이 잘못되면 OSError)
+        """
+        # ipaddress 객체를 만들지 않고 inet_pton으로 바로 바이트로 바꿈 (조회 시간 대부분이 주소 해석)
+        try:
+            packed = socket.inet_pton(socket.AF_INET, ip_address)
+        except OSError:
+            packed = socket.inet_pton(socket.AF_INET6, ip_address.split('%', 1)[0])
+            if packed.startswith(_V4_MAPPED_PREFIX):
+                packed = packed[12:]
+        if len(packed) == 4:
+            key = int.from_bytes(packed, 'big')
+            i = bisect.bisect_right(self._starts4, key) - 1
+            if i >= 0 and key <= self._ends4[i]:
+                return self._location(self._indexes4[i])
+            return None
+        i = bisect.bisect_right(self._starts6, packed) - 1
+        if i >= 0 and packed <= self._ends6[i]:
+            return self._location(self._indexes6[i])
+        return None
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self._map.close()
+
+
+def _parse_columns(text):
+    """
+    '3,4,5' 꼴의 열 번호 목록을 튜플로 바꿈 (잘못된 형식이면 None)
+    """
+    parts = text.split(',')
+    if not all(part.strip().isdigit() for part in parts):
+        return None
+    columns = tuple(int(part) for part in parts)
+    # 앞의 두 열은 시작 IP와 끝 IP
+    return columns if min(columns) >= 2 else None
+
+
+def main():
+    if len(sys.argv) in (4, 6) and sys.argv[1] == 'compile':
+        columns = DEFAULT_COLUMNS
+        if len(sys.argv) == 6:
+            columns = _parse_columns(sys.argv[5]) if sys.argv[4] == '--columns' else None
+            if columns is None:
+                print('--columns는 2 이상의 열 번호를 쉼표로 이은 값이어야 합니다. (예: 3,4,5)')
+                return
+        count4, count6, skipped = compile_csv(sys.argv[2], sys.argv[3], columns)
+        print(f'IPv4 대역 {count4}개, IPv6 대역 {count6}개를 기록했습니다. (건너뛴 행 {skipped}개)')
+    elif len(sys.argv) >= 4 and sys.argv[1] == 'lookup':
+        database = IpDatabase(sys.argv[2])
+        try:
+            for ip_address in sys.argv[3:]:
+                print(f'{ip_address}: {database.lookup(ip_address) or "Location not found"}')
+        finally:
+            database.close()
+    else:
+        print('사용법: python ip_db.py compile 입력.csv 출력.ipdb [--columns 국가열,지역열,도시열]')
+        print('        python ip_db.py lookup 파일.ipdb IP주소 [IP주소 ...]')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,18 @@
 2) HTML 내 제목 성격의 태그(h1/h2/h3/strong 등) 휴리스틱 추출
 3) 부족할 경우 RSS 피드로 보강
 
+속도:
+- 기본은 홈페이지 후보 주소와 RSS 피드를 한꺼번에 요청하고, 먼저 헤드라인을
+  충분히 돌려준 홈페이지 결과를 쓴다. (전체 시간이 요청 한 번 정도)
+  결과를 정하면 남은 요청은 응답을 닫고 더 받지도, 캐시에 쓰지도 않는다.
+- get_kbs_headlines(parallel=False)는 주소를 하나씩 차례로 요청한다.
+- 모든 요청은 연결 풀을 가진 세션 하나로 보내 같은 호스트의 연결을 재사용한다.
+- 응답의 ETag/Last-Modified와 본문, 추출한 헤드라인을 URL별로 CACHE_DIR에 저장하고,
+  다음 실행에서는 If-None-Match/If-Modified-Since로 요청한다. 304이면 본문을 다시
+  받거나 파싱하지 않고 저장된 추출 결과를 쓴다.
+- 홈페이지는 받는 대로 조각별로 한 번만 파싱하고(JSON-LD와 제목 태그를 함께),
+  중복을 뺀 헤드라인이 HEADLINE_LIMIT개 모이면 나머지는 받지 않는다.
+
 실행: 
 - python codyssey-2/WEEK03/crawling_KBS.py
 - 네트워크 연결이 가능하면 1~20개의 헤드라인이 번호와 함께 출력됨
@@ -19,140 +31,360 @@
 '''
 
 from collections import OrderedDict
+import codecs
+import hashlib
 from html.parser import HTMLParser
 import json
+import os
+import queue
 import re
-from typing import Iterable, List
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 import xml.etree.ElementTree as ET
 
 import requests
-
-
-class ScriptCollector(HTMLParser):
-    '''<script type="application/ld+json"> 블록을 수집하는 파서'''
+from requests.adapters import HTTPAdapter
+
+HOMEPAGE_URLS = [
+    'https://news.kbs.co.kr/news/pc/main/main.html',
+    'https://news.kbs.co.kr/news/mobile/main/main.html',
+    'https://news.kbs.co.kr',
+    'http://news.kbs.co.kr',
+]
+RSS_URLS = [
+    # Known sitemap feeds (stable fallback)
+    'https://news.kbs.co.kr/sitemap/recentNewsList.xml',
+    'https://news.kbs.co.kr/sitemap/dailyNewsList.xml',
+]
+# 홈페이지에서 이보다 적게 찾으면 RSS로 보강
+MIN_HOMEPAGE_HEADLINES = 3
+# JSON-LD에서 이보다 적게 찾으면 제목 태그 후보를 함께 사용
+MIN_JSONLD_HEADLINES = 5
+# 출력할 헤드라인 수
+HEADLINE_LIMIT = 20
+# 응답 본문을 읽는 조각 크기
+CHUNK_SIZE = 16 * 1024
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/124.0.0.0 Safari/537.36'
+)
+# 조건부 요청용 응답 캐시 폴더 (None이면 캐시하지 않음)
+CACHE_DIR: Optional[str] = os.path.join(os.path.expanduser('~'), '.cache', 'crawling_kbs')
+
+
+def _make_session() -> requests.Session:
+    '''호스트별 연결을 재사용하는 세션 (병렬 요청 수만큼 연결을 유지)'''
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+_SESSION = _make_session()
+
+
+class FetchCancelled(Exception):
+    '''다른 요청이 먼저 결과를 내서 이 요청을 그만둠'''
+
+
+class Cancellation:
+    '''여러 요청을 한꺼번에 그만두게 하는 신호
+
+    요청은 받는 중인 응답을 track으로 등록하고, cancel이 호출되면 등록된 응답의 연결을
+    모두 끊는다. 본문을 읽는 쪽은 조각마다 is_set을 확인해 FetchCancelled를 일으킨다.
+    '''
 
     def __init__(self) -> None:
-        super().__init__()
-        self._in_jsonld = False
-        self._buffer: List[str] = []
-        self.snippets: List[str] = []
-
-    def handle_starttag(self, tag: str, attrs: Iterable) -> None:
-        if tag.lower() == 'script':
-            attr_dict = {k.lower(): v for k, v in attrs}
-            if attr_dict.get('type', '').lower() == 'application/ld+json':
-                self._in_jsonld = True
-                self._buffer = []
-
-    def handle_endtag(self, tag: str) -> None:
-        if tag.lower() == 'script' and self._in_jsonld:
-            snippet = ''.join(self._buffer).strip()
-            if snippet:
-                self.snippets.append(snippet)
-        self._in_jsonld = False
-
-    def handle_data(self, data: str) -> None:
-        if self._in_jsonld:
-            self._buffer.append(data)
-
-
-class HeadlineTagCollector(HTMLParser):
-    '''제목 성격의 태그에서 텍스트를 수집하는 파서'''
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._responses: set = set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def track(self, resp: requests.Response) -> None:
+        with self._lock:
+            if self._event.is_set():
+                _abort(resp)
+                raise FetchCancelled()
+            self._responses.add(resp)
+
+    def untrack(self, resp: requests.Response) -> None:
+        with self._lock:
+            self._responses.discard(resp)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._event.set()
+            responses = list(self._responses)
+            self._responses.clear()
+        for resp in responses:
+            _abort(resp)
+
+
+def _abort(resp: requests.Response) -> None:
+    '''받는 중인 응답의 연결을 끊음 (남은 본문이 있는 연결을 풀에 돌려주지 않음)'''
+    raw = resp.raw
+    shutdown = getattr(raw, 'shutdown', None)
+    if shutdown is not None:
+        # 다른 스레드에서 막혀 있는 읽기를 바로 깨움 (urllib3 2.3 이상)
+        shutdown()
+    connection = getattr(raw, 'connection', None)
+    if connection is not None:
+        connection.close()
+    resp.close()
+
+ARTICLE_HREF = re.compile(r"/news/(pc/)?view/?.*\.do|/news/view\.do")
+JSON_OBJECT = re.compile(r'\{.*?\}', flags=re.S)
+WHITESPACE = re.compile(r'\s+')
+
+
+class HeadlineCollector(HTMLParser):
+    '''JSON-LD 블록과 제목 성격의 태그 후보를 한 번에 수집하는 파서
+
+    HTML을 조각으로 나누어 feed해도 되고, enough()가 참이면 더 읽지 않아도 된다.
+    JSON-LD가 부족해 태그 후보로 멈춘 경우에는 그 뒤(본문 끝 등)에 나오는 JSON-LD는
+    보지 못한다. 헤드라인용 JSON-LD는 보통 <head>에 있으므로 이 정도는 감수한다.
+    '''
 
     title_tags = {'h1', 'h2', 'h3', 'strong', 'p', 'a'}
+    title_keys = ('headline', 'head', 'title', 'tit', 'news', 'top', 'main')
 
-    def __init__(self) -> None:
+    def __init__(self, limit: int = HEADLINE_LIMIT) -> None:
         super().__init__()
+        self.limit = limit
+        self._in_jsonld = False
+        self._script_buffer: List[str] = []
         self._stack: List[dict] = []
         self._buffer: List[str] = []
-        self.candidates: List[str] = []
         self._article_link_depth: int = 0
+        self.jsonld: List[str] = []
+        self.tags: List[str] = []
+        # 중복을 뺀 헤드라인 (JSON-LD만, JSON-LD와 태그 전체)
+        self._jsonld_titles: set = set()
+        self._all_titles: set = set()
+
+    @classmethod
+    def _looks_like_title(cls, attrs: dict) -> bool:
+        hay = ' '.join([attrs.get('class', ''), attrs.get('aria-label', ''), attrs.get('id', '')]).lower()
+        return any(key in hay for key in cls.title_keys)
+
+    def candidates(self) -> List[str]:
+        '''JSON-LD 후보 (부족하면 태그 후보를 뒤에 붙임)'''
+        if len(self.jsonld) < MIN_JSONLD_HEADLINES:
+            return self.jsonld + self.tags
+        return list(self.jsonld)
+
+    def enough(self) -> bool:
+        '''지금까지 모은 후보로 중복을 뺀 헤드라인이 limit개 이상인지'''
+        if len(self.jsonld) < MIN_JSONLD_HEADLINES:
+            return len(self._all_titles) >= self.limit
+        return len(self._jsonld_titles) >= self.limit
+
+    def _add_jsonld(self, value: str) -> None:
+        value = (value or '').strip()
+        if value:
+            self.jsonld.append(value)
+            title = _normalize_title(value)
+            self._jsonld_titles.add(title)
+            self._all_titles.add(title)
 
-    @staticmethod
-    def _looks_like_title(attrs: dict) -> bool:
-        cls = attrs.get('class', '')
-        aria_label = attrs.get('aria-label', '')
-        id_attr = attrs.get('id', '')
-        hay = ' '.join([cls, aria_label, id_attr]).lower()
-        keys = ['headline', 'head', 'title', 'tit', 'news', 'top', 'main']
-        return any(key in hay for key in keys)
+    def _parse_jsonld(self, raw: str) -> None:
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            for m in JSON_OBJECT.findall(raw):
+                try:
+                    obj = json.loads(m)
+                except json.JSONDecodeError:
+                    continue
+                _collect_headlines_from_json(obj, self._add_jsonld)
+            return
+        _collect_headlines_from_json(data, self._add_jsonld)
 
     def handle_starttag(self, tag: str, attrs: Iterable) -> None:
         tag = tag.lower()
         attr_dict = {k.lower(): v for k, v in attrs}
+        if tag == 'script' and (attr_dict.get('type') or '').lower() == 'application/ld+json':
+            self._in_jsonld = True
+            self._script_buffer = []
         # Track when inside an article link
         if tag == 'a':
             href = (attr_dict.get('href') or '').lower()
-            if re.search(r"/news/(pc/)?view/?.*\.do|/news/view\.do", href):
+            if ARTICLE_HREF.search(href):
                 self._article_link_depth += 1
 
         capture = (
             tag in self.title_tags
+            and self._article_link_depth > 0
             and self._looks_like_title(attr_dict)
-            and (self._article_link_depth > 0)
         )
         self._stack.append({'tag': tag, 'capture': capture})
         if capture:
             self._buffer = []
 
     def handle_endtag(self, tag: str) -> None:
+        tag = tag.lower()
+        if tag == 'script' and self._in_jsonld:
+            snippet = ''.join(self._script_buffer).strip()
+            if snippet:
+                self._parse_jsonld(snippet)
+        self._in_jsonld = False
+
         if not self._stack:
-            if tag.lower() == 'a' and self._article_link_depth > 0:
+            if tag == 'a' and self._article_link_depth > 0:
                 self._article_link_depth -= 1
             return
         top = self._stack.pop()
         if top.get('capture'):
-            text = ''.join(self._buffer).strip()
-            text = re.sub(r'\s+', ' ', text)
-            if text:
-                self.candidates.append(text)
+            text = WHITESPACE.sub(' ', ''.join(self._buffer).strip())
+            if len(text) >= 8:
+                self.tags.append(text)
+                self._all_titles.add(_normalize_title(text))
             self._buffer = []
-        if tag.lower() == 'a' and self._article_link_depth > 0:
+        if tag == 'a' and self._article_link_depth > 0:
             self._article_link_depth -= 1
 
     def handle_data(self, data: str) -> None:
+        if self._in_jsonld:
+            self._script_buffer.append(data)
         if self._stack and self._stack[-1].get('capture'):
             self._buffer.append(data)
 
 
-def _request(url: str, timeout: int = 10) -> requests.Response:
-    headers = {
-        'User-Agent': (
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-            'AppleWebKit/537.36 (KHTML, like Gecko) '
-            'Chrome/124.0.0.0 Safari/537.36'
-        )
-    }
-    resp = requests.get(url, headers=headers, timeout=timeout)
-    resp.raise_for_status()
+def _request(url: str, timeout: float = 10, cached: Optional[dict] = None) -> requests.Response:
+    '''GET 요청 (cached가 있으면 그 검증자로 조건부 요청, 304도 그대로 반환)'''
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    resp = _SESSION.get(url, headers=headers, timeout=timeout, stream=True)
+    try:
+        resp.raise_for_status()
+    except requests.HTTPError:
+        resp.close()
+        raise
     return resp
 
 
-def _extract_from_jsonld(html: str) -> List[str]:
-    parser = ScriptCollector()
-    parser.feed(html)
-    headlines: List[str] = []
+def _iter_text(resp: requests.Response, received: List[str],
+               cancel: Optional[Cancellation] = None) -> Iterator[str]:
+    '''응답 본문을 CHUNK_SIZE씩 받아 디코딩한 조각을 차례로 내보냄 (내보낸 조각은 received에 모음)
 
-    def add_headline(value: str) -> None:
-        value = (value or '').strip()
-        if value:
-            headlines.append(value)
-
-    for raw in parser.snippets:
+    cancel이 설정되면 다음 조각을 받기 전에 FetchCancelled를 일으킨다.
+    '''
+    encoding = 'utf-8'
+    if 'charset' in resp.headers.get('Content-Type', '').lower() and resp.encoding:
+        encoding = resp.encoding
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    try:
+        for data in resp.iter_content(CHUNK_SIZE):
+            if cancel is not None and cancel.is_set():
+                raise FetchCancelled()
+            text = decoder.decode(data)
+            if text:
+                received.append(text)
+                yield text
+    except Exception:
+        # 다른 스레드가 연결을 끊어 읽기가 실패한 경우
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled() from None
+        raise
+    text = decoder.decode(b'', final=True)
+    if text:
+        received.append(text)
+        yield text
+
+
+def _cache_path(url: str) -> str:
+    return os.path.join(CACHE_DIR, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_cached(url: str) -> Optional[dict]:
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(_cache_path(url), encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return entry if isinstance(entry, dict) and entry.get('url') == url else None
+
+
+def _save_cached(entry: dict) -> None:
+    if not CACHE_DIR:
+        return
+    path = _cache_path(entry['url'])
+    temp = f'{path}.{threading.get_ident()}.tmp'
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp, path)
+    except OSError:
+        # 캐시는 보조 수단이므로 쓰지 못해도 수집은 계속함
+        pass
+
+
+def _fetch_extracted(url: str, kind: str, extract: Callable[[Iterable[str]], List[str]],
+                     timeout: float = 10, cancel: Optional[Cancellation] = None) -> List[str]:
+    '''url을 받아 extract로 뽑은 후보를 반환 (304이면 저장된 추출 결과를 재사용)
+
+    extract는 본문 조각을 차례로 받으며, 필요한 만큼만 읽고 멈춰도 된다.
+    (저장되는 본문도 읽은 데까지다.) kind는 같은 본문에서 서로 다른 방법으로
+    뽑은 결과를 구분하는 이름이다. cancel이 설정되면 응답을 닫고 캐시에 쓰지 않은 채
+    FetchCancelled를 일으킨다.
+    '''
+    cached = _load_cached(url)
+    with _request(url, timeout, cached) as resp:
+        if cancel is not None:
+            cancel.track(resp)
         try:
-            data = json.loads(raw)
-        except json.JSONDecodeError:
-            matches = re.findall(r'\{.*?\}', raw, flags=re.S)
-            for m in matches:
-                try:
-                    obj = json.loads(m)
-                except json.JSONDecodeError:
-                    continue
-                _collect_headlines_from_json(obj, add_headline)
-            continue
-        _collect_headlines_from_json(data, add_headline)
-
-    return headlines
+            if resp.status_code == 304 and cached is not None:
+                extracted = cached.setdefault('extracted', {})
+                if kind in extracted:
+                    return list(extracted[kind])
+                candidates = extract([cached['body']])
+                body = None
+            else:
+                received: List[str] = []
+                candidates = extract(_iter_text(resp, received, cancel))
+                body = ''.join(received)
+        finally:
+            if cancel is not None:
+                cancel.untrack(resp)
+    if cancel is not None and cancel.is_set():
+        raise FetchCancelled()
+    if body is not None:
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if not (etag or last_modified):
+            # 검증자가 없으면 조건부 요청을 할 수 없으므로 저장하지 않음
+            return candidates
+        cached = {'url': url, 'etag': etag, 'last_modified': last_modified,
+                  'body': body, 'extracted': {}}
+    cached['extracted'][kind] = candidates
+    _save_cached(cached)
+    return list(candidates)
+
+
+def _normalize_title(title: str) -> str:
+    '''공백을 정리하고 '제목 | 사이트' 꼴이면 제목만 남김'''
+    title = WHITESPACE.sub(' ', (title or '').strip())
+    if '|' in title:
+        parts = [p.strip() for p in title.split('|')]
+        if parts and len(parts[0]) >= 8:
+            title = parts[0]
+    return title
 
 
 def _collect_headlines_from_json(data, add_headline) -> None:
@@ -175,13 +407,6 @@ def _collect_headlines_from_json(data, add_headline) -> None:
             _collect_headlines_from_json(node, add_headline)
 
 
-def _extract_from_html_tags(html: str) -> List[str]:
-    parser = HeadlineTagCollector()
-    parser.feed(html)
-    texts = [t for t in parser.candidates if len(t) >= 8]
-    return texts
-
-
 def _extract_from_rss(xml_text: str) -> List[str]:
     titles: List[str] = []
     try:
@@ -196,55 +421,116 @@ def _extract_from_rss(xml_text: str) -> List[str]:
     return titles
 
 
-def get_kbs_headlines() -> List[str]:
-    '''KBS 헤드라인 문자열 리스트를 반환'''
-    candidates: List[str] = []
+def _extract_from_homepage(chunks: Iterable[str]) -> List[str]:
+    '''HTML 조각을 받는 대로 파싱하고, 헤드라인이 충분히 모이면 나머지는 읽지 않음'''
+    parser = HeadlineCollector()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.enough():
+            break
+    return parser.candidates()
+
+
+def _homepage_candidates(url: str, timeout: float = 10, cancel: Optional[Cancellation] = None) -> List[str]:
+    return _fetch_extracted(url, 'home', _extract_from_homepage, timeout, cancel)
+
+
+def _rss_candidates(url: str, timeout: float = 10, cancel: Optional[Cancellation] = None) -> List[str]:
+    return _fetch_extracted(url, 'rss', lambda chunks: _extract_from_rss(''.join(chunks)), timeout, cancel)
 
-    homepage_urls = [
-        'https://news.kbs.co.kr/news/pc/main/main.html',
-        'https://news.kbs.co.kr/news/mobile/main/main.html',
-        'https://news.kbs.co.kr',
-        'http://news.kbs.co.kr',
-    ]
-    for url in homepage_urls:
+
+def _sequential_candidates(timeout: float = 10) -> List[str]:
+    '''홈페이지 주소와 RSS를 하나씩 차례로 요청해 후보를 모음'''
+    candidates: List[str] = []
+    for url in HOMEPAGE_URLS:
         try:
-            resp = _request(url)
+            candidates.extend(_homepage_candidates(url, timeout))
         except requests.RequestException:
             continue
-        html = resp.text
-        candidates.extend(_extract_from_jsonld(html))
-        if len(candidates) < 5:
-            candidates.extend(_extract_from_html_tags(html))
         if candidates:
             break
 
-    if len(candidates) < 3:
-        rss_urls = [
-            # Known sitemap feeds (stable fallback)
-            'https://news.kbs.co.kr/sitemap/recentNewsList.xml',
-            'https://news.kbs.co.kr/sitemap/dailyNewsList.xml',
-        ]
-        for url in rss_urls:
+    if len(candidates) < MIN_HOMEPAGE_HEADLINES:
+        for url in RSS_URLS:
             try:
-                resp = _request(url)
+                candidates.extend(_rss_candidates(url, timeout))
             except requests.RequestException:
                 continue
-            candidates.extend(_extract_from_rss(resp.text))
             if candidates:
                 break
+    return candidates
+
+
+def _parallel_candidates(timeout: float = 10) -> List[str]:
+    '''홈페이지 주소와 RSS를 한꺼번에 요청하고 먼저 쓸 만한 결과로 후보를 정함
+
+    홈페이지 결과 중 MIN_HOMEPAGE_HEADLINES개 이상을 찾은 것이 오면 바로 반환한다.
+    그런 결과가 없으면 먼저 찾은 홈페이지 결과에 먼저 온 RSS 결과를 더한다.
+    요청은 데몬 스레드에서 실행하고, 결과를 정하면 남은 요청의 응답을 닫아 그만두게 한다.
+    (기다리지는 않는다.)
+    '''
+    results: 'queue.Queue[Tuple[str, List[str]]]' = queue.Queue()
+    cancel = Cancellation()
+
+    def fetch(kind: str, extract: Callable[[str, float, Cancellation], List[str]], url: str) -> None:
+        candidates: List[str] = []
+        try:
+            if not cancel.is_set():
+                candidates = extract(url, timeout, cancel)
+        except (requests.RequestException, FetchCancelled):
+            pass
+        finally:
+            results.put((kind, candidates))
+
+    jobs = [('home', _homepage_candidates, url) for url in HOMEPAGE_URLS]
+    jobs += [('rss', _rss_candidates, url) for url in RSS_URLS]
+    for job in jobs:
+        threading.Thread(target=fetch, args=job, daemon=True).start()
+    try:
+        return _first_candidates(results, timeout)
+    finally:
+        cancel.cancel()
+
+
+def _first_candidates(results: 'queue.Queue[Tuple[str, List[str]]]', timeout: float) -> List[str]:
+    '''요청 결과를 도착하는 대로 받아 _parallel_candidates의 규칙으로 후보를 정함'''
+    pending = {'home': len(HOMEPAGE_URLS), 'rss': len(RSS_URLS)}
+    homepage: List[str] = []
+    rss: List[str] = []
+    deadline = time.monotonic() + timeout
+    while pending['home'] or (pending['rss'] and not rss):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            kind, candidates = results.get(timeout=remaining)
+        except queue.Empty:
+            break
+        pending[kind] -= 1
+        if kind == 'home':
+            if len(candidates) >= MIN_HOMEPAGE_HEADLINES:
+                return candidates
+            if candidates and not homepage:
+                homepage = candidates
+        elif candidates and not rss:
+            rss = candidates
+    return homepage + rss
+
+
+def get_kbs_headlines(parallel: bool = True) -> List[str]:
+    '''KBS 헤드라인 문자열 리스트를 반환 (parallel이 False이면 주소를 차례로 요청)'''
+    if parallel:
+        candidates = _parallel_candidates()
+    else:
+        candidates = _sequential_candidates()
 
     seen = OrderedDict()
     for title in candidates:
-        title = re.sub(r'\s+', ' ', (title or '').strip())
-        if not title:
-            continue
-        if '|' in title:
-            parts = [p.strip() for p in title.split('|')]
-            if parts and len(parts[0]) >= 8:
-                title = parts[0]
-        seen[title] = None
+        title = _normalize_title(title)
+        if title:
+            seen[title] = None
 
-    return list(seen.keys())[:20]
+    return list(seen.keys())[:HEADLINE_LIMIT]
 
 
 def _print_headlines(titles: List[str]) -> None: